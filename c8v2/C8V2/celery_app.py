@@ -1,6 +1,8 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 from django.conf import settings
+from investments.market_schedule import MarketSessionSchedule
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'C8V2.settings')
@@ -32,15 +34,70 @@ app.conf.update(
 
 # Periodic tasks configuration
 app.conf.beat_schedule = {
-    'daily-price-and-data-update': {
+    # Daily data update per exchange, once after each of its trading days closes; not on holidays
+    'daily-price-and-data-update-nse': {
         'task': 'investments.tasks.daily_price_and_data_update',
-        'schedule': 60.0 * 60.0 * 24.0,  # Run daily (24 hours)
-        # 'schedule': crontab(hour=9, minute=0),  # Run at 9 AM daily
+        'schedule': MarketSessionSchedule('NSE', intraday=False),
+        'args': ('NSE',),
+    },
+    'daily-price-and-data-update-bse': {
+        'task': 'investments.tasks.daily_price_and_data_update',
+        'schedule': MarketSessionSchedule('BSE', intraday=False),
+        'args': ('BSE',),
+    },
+    'daily-price-and-data-update-nyse': {
+        'task': 'investments.tasks.daily_price_and_data_update',
+        'schedule': MarketSessionSchedule('NYSE', intraday=False),
+        'args': ('NYSE',),
+    },
+    'daily-price-and-data-update-nasdaq': {
+        'task': 'investments.tasks.daily_price_and_data_update',
+        'schedule': MarketSessionSchedule('NASDAQ', intraday=False),
+        'args': ('NASDAQ',),
+    },
+    'daily-price-and-data-update-crypto': {
+        'task': 'investments.tasks.daily_price_and_data_update',
+        'schedule': crontab(hour=0, minute=15),  # Crypto never closes; once per UTC day
+        'args': ('CRYPTO',),
+    },
+    # Price ticks per exchange while it is open, plus one settle run after its close
+    'refresh-prices-nse': {
+        'task': 'investments.tasks.refresh_exchange_prices_task',
+        'schedule': MarketSessionSchedule('NSE'),
+        'args': ('NSE',),
+    },
+    'refresh-prices-bse': {
+        'task': 'investments.tasks.refresh_exchange_prices_task',
+        'schedule': MarketSessionSchedule('BSE'),
+        'args': ('BSE',),
+    },
+    'refresh-prices-nyse': {
+        'task': 'investments.tasks.refresh_exchange_prices_task',
+        'schedule': MarketSessionSchedule('NYSE'),
+        'args': ('NYSE',),
+    },
+    'refresh-prices-nasdaq': {
+        'task': 'investments.tasks.refresh_exchange_prices_task',
+        'schedule': MarketSessionSchedule('NASDAQ'),
+        'args': ('NASDAQ',),
+    },
+    'refresh-prices-crypto': {
+        'task': 'investments.tasks.refresh_exchange_prices_task',
+        'schedule': MarketSessionSchedule('CRYPTO', settle=False, interval_setting='CRYPTO_REFRESH_INTERVAL'),
+        'args': ('CRYPTO',),
     },
     'refresh-precious-metals': {
         'task': 'investments.tasks.refresh_precious_metals_task',
         'schedule': 60.0 * 60.0 * 6.0,  # Run every 6 hours
     },
+    'record-portfolio-values': {
+        'task': 'investments.tasks.record_portfolio_values_task',
+        'schedule': crontab(hour=23, minute=45),  # Nightly, end of day UTC
+    },
+    'rebuild-portfolio-snapshots': {
+        'task': 'investments.tasks.rebuild_portfolio_snapshots_task',
+        'schedule': crontab(hour=2, minute=30),  # Nightly reconciliation of the running portfolio totals
+    },
 }
 
 app.conf.timezone = 'UTC'
@@ -5,6 +5,7 @@ from django.http import JsonResponse
 from django.db import connection
 from django.core.cache import cache
 import logging
+from .http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +54,9 @@ def health_check(request):
         health_status['checks']['cache'] = f'error: {str(e)}'
         health_status['status'] = 'unhealthy'
     
+    # Outbound connection pool reuse for this worker process
+    health_status['http_pools'] = http_clients.get_stats()
+    
     # Determine HTTP status code
     status_code = 200 if health_status['status'] == 'healthy' else 503
     
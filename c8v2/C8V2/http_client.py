@@ -0,0 +1,140 @@
+"""
+Shared pooled HTTP client for external APIs.
+
+Every provider (FMP, Finnhub, Perplexity, Gemini, Serper, ...) gets one
+long-lived requests.Session with its own keep-alive connection pool, retry
+policy (jittered exponential backoff on connection errors, 429 and 5xx) and
+default timeout, so repeated calls reuse TCP/TLS connections instead of doing
+a fresh handshake per request.
+"""
+
+import logging
+import threading
+from typing import Dict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# timeout in seconds, pool_maxsize = keep-alive connections per host,
+# retries = attempts after the first one, backoff = base backoff factor in seconds
+DEFAULT_HTTP_PROVIDERS = {
+    'default': {'timeout': 10, 'pool_connections': 4, 'pool_maxsize': 10, 'retries': 2, 'backoff': 0.5},
+    'fmp': {'timeout': 10, 'pool_maxsize': 16},
+    'finnhub': {'timeout': 10, 'pool_maxsize': 16},
+    'perplexity': {'timeout': 30, 'retries': 1},
+    'gemini': {'timeout': 10, 'retries': 1},
+    'serper': {'timeout': 10},
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout and reports connection reuse"""
+
+    def __init__(self, timeout: float, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+    def get_stats(self) -> Dict:
+        """Requests sent vs. new connections opened across this adapter's pools"""
+        with self.poolmanager.pools.lock:
+            pools = list(self.poolmanager.pools._container.values())
+        requests_sent = sum(pool.num_requests for pool in pools)
+        connections = sum(pool.num_connections for pool in pools)
+        return {
+            'requests': requests_sent,
+            'connections': connections,
+            'reuse_ratio': round(1 - connections / requests_sent, 4) if requests_sent else 0,
+        }
+
+
+class HTTPClientRegistry:
+    """One pooled session per provider, created lazily and shared across threads"""
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, PooledHTTPAdapter] = {}
+        self._lock = threading.RLock()
+
+    def get_config(self, provider: str) -> Dict:
+        overrides = getattr(settings, 'HTTP_CLIENT_PROVIDERS', {})
+        return {
+            **DEFAULT_HTTP_PROVIDERS['default'],
+            **overrides.get('default', {}),
+            **DEFAULT_HTTP_PROVIDERS.get(provider, {}),
+            **overrides.get(provider, {}),
+        }
+
+    def build_adapter(self, provider: str) -> PooledHTTPAdapter:
+        config = self.get_config(provider)
+        retry = Retry(
+            total=config['retries'],
+            connect=config['retries'],
+            read=0,  # a read timeout already cost the full timeout; don't multiply it
+            status=config['retries'],
+            backoff_factor=config['backoff'],
+            backoff_jitter=config['backoff'],
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # LLM/search APIs use POST for reads
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        return PooledHTTPAdapter(
+            timeout=config['timeout'],
+            pool_connections=config['pool_connections'],
+            pool_maxsize=config['pool_maxsize'],
+            max_retries=retry,
+        )
+
+    def mount(self, session: requests.Session, provider: str) -> requests.Session:
+        """Mount the provider's pooled adapter on an existing session (e.g. a vendor SDK's)"""
+        with self._lock:
+            adapter = self._adapters.get(provider)
+            if adapter is None:
+                adapter = self._adapters[provider] = self.build_adapter(provider)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session(self, provider: str) -> requests.Session:
+        """Shared session for a provider"""
+        session = self._sessions.get(provider)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(provider)
+                if session is None:
+                    session = self.mount(requests.Session(), provider)
+                    self._sessions[provider] = session
+        return session
+
+    def get(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.session(provider).get(url, **kwargs)
+
+    def post(self, provider: str, url: str, **kwargs) -> requests.Response:
+        return self.session(provider).post(url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-provider connection reuse metrics"""
+        return {provider: adapter.get_stats() for provider, adapter in self._adapters.items()}
+
+    def close_all(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._sessions.clear()
+            self._adapters.clear()
+
+
+http_clients = HTTPClientRegistry()
@@ -267,10 +267,82 @@ PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY')
 
 # FMP API settings
 FMP_API_KEY = os.getenv('FMP_API_KEY')
+FMP_BATCH_SIZE = int(os.getenv('FMP_BATCH_SIZE', '100'))  # symbols per batch quote/profile request
 
 # Finnhub API settings
 FINNHUB_API_KEY = os.getenv('FINNHUB_API_KEY')
 
+# Market data refresh settings
+# Per-provider limits: concurrency = max in-flight calls, rate = calls per second, burst = bucket size
+PRICE_REFRESH_MAX_WORKERS = int(os.getenv('PRICE_REFRESH_MAX_WORKERS', '8'))
+MARKET_DATA_PROVIDER_LIMITS = {
+    'bharatsm': {'concurrency': 4, 'rate': 2.0, 'burst': 4},
+    'finnhub': {'concurrency': 5, 'rate': 1.0, 'burst': 5},  # 60 calls/minute
+    'fmp': {'concurrency': 4, 'rate': 4.0, 'burst': 8},
+    'perplexity': {'concurrency': 2, 'rate': 50 / 60, 'burst': 5},  # 50 calls/minute
+}
+
+# Pooled HTTP sessions for external APIs (see C8V2/http_client.py for defaults):
+# timeout (s), pool_connections/pool_maxsize, retries and jittered backoff factor per provider
+HTTP_CLIENT_PROVIDERS = {
+    'default': {'timeout': 10, 'pool_maxsize': int(os.getenv('HTTP_POOL_MAXSIZE', '10')), 'retries': 2, 'backoff': 0.5},
+    'perplexity': {'timeout': 30, 'retries': 1},
+}
+
+# Provider circuit breakers (shared via the cache): rolling window and cooldown in seconds,
+# thresholds as error rates, slow_call as average latency in seconds
+MARKET_DATA_CIRCUIT_BREAKER = {
+    'window': 300,
+    'min_calls': 5,
+    'error_threshold': 0.5,
+    'degraded_threshold': 0.2,
+    'slow_call': 10.0,
+    'cooldown': int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '60')),
+    'probe_timeout': 30,
+}
+
+# How long whole-market NSE tables (turnover, F&O equities index) are reused, in seconds
+NSE_SNAPSHOT_TTL = int(os.getenv('NSE_SNAPSHOT_TTL', '300'))
+
+# Deadline (seconds) for each concurrent BharatSM fetch leg of a symbol, counted from when the leg starts
+BHARATSM_SYMBOL_DEADLINE = float(os.getenv('BHARATSM_SYMBOL_DEADLINE', '20'))
+
+# Real-time prices endpoint: overall deadline (seconds), concurrent lookups per request
+# and the size of the thread pool shared by all requests
+REAL_TIME_PRICES_DEADLINE = float(os.getenv('REAL_TIME_PRICES_DEADLINE', '8'))
+REAL_TIME_PRICES_CONCURRENCY = int(os.getenv('REAL_TIME_PRICES_CONCURRENCY', '10'))
+REAL_TIME_PRICES_POOL_SIZE = int(os.getenv('REAL_TIME_PRICES_POOL_SIZE', '32'))
+
+# Ticker lookup cache: in-process LRU (size/TTL) in front of Redis (TTL), in seconds
+TICKER_CACHE_TTL = int(os.getenv('TICKER_CACHE_TTL', str(60 * 60 * 24 * 7)))
+TICKER_CACHE_NEGATIVE_TTL = int(os.getenv('TICKER_CACHE_NEGATIVE_TTL', '3600'))
+TICKER_CACHE_LOCAL_SIZE = int(os.getenv('TICKER_CACHE_LOCAL_SIZE', '2048'))
+TICKER_CACHE_LOCAL_TTL = int(os.getenv('TICKER_CACHE_LOCAL_TTL', '3600'))
+
+# How often each process rebuilds its in-memory symbol master snapshot, in seconds
+SYMBOL_MASTER_RELOAD_INTERVAL = int(os.getenv('SYMBOL_MASTER_RELOAD_INTERVAL', '300'))
+
+# How long resampled chart series (per symbol, interval and range) are cached, in seconds
+CHART_SERIES_CACHE_TTL = int(os.getenv('CHART_SERIES_CACHE_TTL', '3600'))
+
+# Minimum seconds between background refreshes of one symbol's stale chart history
+CHART_REFRESH_INTERVAL = int(os.getenv('CHART_REFRESH_INTERVAL', '300'))
+
+# Chart backfill for new holdings: seconds to wait so a burst of creates shares one run,
+# and tickers per yfinance multi-ticker download
+CHART_BACKFILL_DELAY = int(os.getenv('CHART_BACKFILL_DELAY', '5'))
+CHART_BACKFILL_BATCH_SIZE = int(os.getenv('CHART_BACKFILL_BATCH_SIZE', '50'))
+
+# Portfolio value history: points served per range at most, and rows per upsert in the nightly job
+PORTFOLIO_HISTORY_MAX_POINTS = int(os.getenv('PORTFOLIO_HISTORY_MAX_POINTS', '180'))
+PORTFOLIO_HISTORY_BATCH_SIZE = int(os.getenv('PORTFOLIO_HISTORY_BATCH_SIZE', '1000'))
+
+# Market-paced refreshes: seconds between price ticks while an exchange is open (crypto never closes)
+# and minutes after each close for the settle run
+MARKET_SESSION_REFRESH_INTERVAL = int(os.getenv('MARKET_SESSION_REFRESH_INTERVAL', '60'))
+CRYPTO_REFRESH_INTERVAL = int(os.getenv('CRYPTO_REFRESH_INTERVAL', '300'))
+MARKET_SETTLE_DELAY_MINUTES = int(os.getenv('MARKET_SETTLE_DELAY_MINUTES', '15'))
+
 # Redis Cache Configuration
 # Note: Using Django's built-in RedisCache backend (Django 4.0+)
 # For advanced connection pooling, consider using django-redis package
@@ -1,8 +1,8 @@
 import os
-import requests
 import logging
 import json
 from django.conf import settings
+from C8V2.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -266,7 +266,7 @@ RESPONSE FORMAT:
             }
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = http_clients.post('gemini', url, headers=headers, json=data)
         
         if response.status_code == 200:
             result = response.json()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Investment, ChartData, PriceAlert
+from .models import Investment, ChartData, PriceAlert, SymbolQuote, SymbolSession, SymbolMaster, PriceHistory, PortfolioSnapshot, PortfolioValueHistory
 
 
 @admin.register(Investment)
@@ -14,7 +14,7 @@ class InvestmentAdmin(admin.ModelAdmin):
     readonly_fields = [
         'total_value', 'daily_change', 'daily_change_percent',
         'total_gain_loss', 'total_gain_loss_percent', 'last_updated',
-        'created_at', 'updated_at'
+        'price_updated_at', 'created_at', 'updated_at'
     ]
     
     fieldsets = (
@@ -37,7 +37,7 @@ class InvestmentAdmin(admin.ModelAdmin):
             'fields': ('sector', 'market_cap', 'dividend_yield', 'logo_url')
         }),
         ('Timestamps', {
-            'fields': ('last_updated', 'created_at', 'updated_at')
+            'fields': ('last_updated', 'price_updated_at', 'created_at', 'updated_at')
         })
     )
 
@@ -52,6 +52,35 @@ class ChartDataAdmin(admin.ModelAdmin):
     search_fields = ['investment__symbol', 'investment__name']
     date_hierarchy = 'date'
 
+    # Frozen legacy table (see ChartData): browse and delete only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ['symbol', 'exchange', 'interval', 'date', 'open', 'high', 'low', 'close', 'volume']
+    list_filter = ['interval', 'exchange']
+    search_fields = ['symbol']
+    date_hierarchy = 'date'
+
+
+@admin.register(PortfolioSnapshot)
+class PortfolioSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'investment_count', 'total_value', 'total_gain_loss', 'daily_change', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(PortfolioValueHistory)
+class PortfolioValueHistoryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'total_value', 'total_cost']
+    search_fields = ['user__username']
+    date_hierarchy = 'date'
+
 
 @admin.register(PriceAlert)
 class PriceAlertAdmin(admin.ModelAdmin):
@@ -61,4 +90,27 @@ class PriceAlertAdmin(admin.ModelAdmin):
     ]
     list_filter = ['alert_type', 'is_active', 'created_at', 'triggered_at']
     search_fields = ['user__username', 'investment__symbol']
-    readonly_fields = ['triggered_at', 'created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['triggered_at', 'created_at', 'updated_at']
+
+
+@admin.register(SymbolQuote)
+class SymbolQuoteAdmin(admin.ModelAdmin):
+    list_display = ['symbol', 'asset_type', 'source', 'fetched_at']
+    list_filter = ['asset_type', 'source']
+    search_fields = ['symbol']
+    readonly_fields = ['fetched_at']
+
+
+@admin.register(SymbolSession)
+class SymbolSessionAdmin(admin.ModelAdmin):
+    list_display = ['symbol', 'session_date', 'previous_close', 'open', 'high', 'low', 'captured_on']
+    list_filter = ['captured_on']
+    search_fields = ['symbol']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(SymbolMaster)
+class SymbolMasterAdmin(admin.ModelAdmin):
+    list_display = ['symbol', 'name', 'exchange', 'country', 'asset_class', 'route', 'is_active']
+    list_filter = ['route', 'asset_class', 'exchange', 'is_active']
+    search_fields = ['symbol', 'name']
@@ -0,0 +1,120 @@
+"""
+Set-based price alert evaluation.
+
+Every alert type is expressed as one ``Q`` condition over the alert joined to
+its investment, and all pending alerts that meet it are marked triggered by a
+single ``UPDATE ... RETURNING`` (on backends without UPDATE RETURNING the
+matching ids are locked and updated in two statements instead). The engine is
+run for the holdings of each price batch right after it is written, so alerts
+fire with the prices that tripped them instead of on a separate polling cycle.
+Frequent ticks go through the in-memory threshold index (alert_index.py)
+first, so a tick that crosses no threshold costs no query at all.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Tuple
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .alert_index import alert_index
+from .models import PriceAlert
+
+logger = logging.getLogger(__name__)
+
+
+class PriceAlertEngine:
+    """Evaluate and trigger price alerts in bulk"""
+
+    # above/below compare the current price, change_percent the absolute daily move
+    TRIGGER_CONDITION = (
+        Q(alert_type='above', investment__current_price__gte=F('target_value'))
+        | Q(alert_type='below', investment__current_price__lte=F('target_value'))
+        | Q(alert_type='change_percent') & (
+            Q(investment__daily_change_percent__gte=F('target_value'))
+            | Q(investment__daily_change_percent__lte=-F('target_value'))
+        )
+    )
+
+    @staticmethod
+    def pending(alerts=None):
+        """Active, not yet triggered alerts (optionally within a queryset)"""
+        alerts = PriceAlert.objects.all() if alerts is None else alerts
+        return alerts.filter(is_active=True, triggered_at__isnull=True)
+
+    @staticmethod
+    def _supports_update_returning() -> bool:
+        # MySQL and MariaDB have no UPDATE ... RETURNING
+        return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert
+
+    @classmethod
+    def trigger(cls, alerts=None) -> List[int]:
+        """Mark every pending alert whose condition holds as triggered; returns their ids"""
+        matching = cls.pending(alerts).filter(cls.TRIGGER_CONDITION).order_by()
+        now = timezone.now()
+
+        if not cls._supports_update_returning():
+            with transaction.atomic():
+                ids = list(matching.select_for_update().values_list('id', flat=True))
+                PriceAlert.objects.filter(id__in=ids).update(is_active=False, triggered_at=now, updated_at=now)
+            return ids
+
+        subquery, params = matching.values('id').query.sql_with_params()
+        quote = connection.ops.quote_name
+        # Re-checking the pending state on the updated row keeps concurrent runs from triggering twice
+        sql = (
+            f"UPDATE {quote(PriceAlert._meta.db_table)} "
+            f"SET {quote('is_active')} = %s, {quote('triggered_at')} = %s, {quote('updated_at')} = %s "
+            f"WHERE {quote('id')} IN ({subquery}) AND {quote('is_active')} AND {quote('triggered_at')} IS NULL "
+            f"RETURNING {quote('id')}"
+        )
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [False, timestamp, timestamp, *params])
+            return [row[0] for row in cursor.fetchall()]
+
+    @classmethod
+    def evaluate(cls, alerts=None) -> List[PriceAlert]:
+        """Trigger matching alerts and return them with their investment and user loaded"""
+        ids = cls.trigger(alerts)
+        if not ids:
+            return []
+
+        alert_index.discard(ids)
+        transaction.on_commit(lambda: alert_index.publish_discard(ids))
+        triggered = list(PriceAlert.objects.filter(id__in=ids).select_related('investment', 'user'))
+        for alert in triggered:
+            # Here you could send notifications to users
+            logger.info(
+                f"Price alert triggered for {alert.user.username}: "
+                f"{alert.investment.symbol} {alert.alert_type} {alert.target_value}"
+            )
+        return triggered
+
+    @classmethod
+    def evaluate_ticks(cls, updates: Dict[str, Tuple[object, object]]) -> List[PriceAlert]:
+        """Evaluate {symbol: (price, daily change percent)} ticks.
+
+        Candidates come from the in-memory threshold index in O(log n + k) per
+        symbol; the database is only touched when some threshold was crossed.
+        """
+        try:
+            candidates = alert_index.resolve_many(updates)
+        except Exception as e:
+            logger.error(f"Error resolving price alerts from the threshold index: {e}")
+            return []
+        if not candidates:
+            return []
+        return cls.evaluate(PriceAlert.objects.filter(id__in=candidates))
+
+    @classmethod
+    def evaluate_investments(cls, investment_ids: Iterable[int]) -> List[PriceAlert]:
+        """Evaluate the alerts on the holdings a price batch just updated"""
+        investment_ids = list(set(investment_ids))
+        if not investment_ids:
+            return []
+        try:
+            return cls.evaluate(PriceAlert.objects.filter(investment_id__in=investment_ids))
+        except Exception as e:
+            # A failed evaluation must not fail the price write; the periodic check catches up
+            logger.error(f"Error evaluating price alerts for {len(investment_ids)} investments: {e}")
+            return []
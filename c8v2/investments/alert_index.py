@@ -0,0 +1,225 @@
+"""
+In-memory threshold index for price alerts.
+
+Per symbol, pending alert thresholds are kept in sorted arrays: 'above'
+alerts fire for every threshold <= price (a prefix), 'below' alerts for every
+threshold >= price (a suffix) and 'change_percent' alerts for every threshold
+<= the absolute daily move (a prefix). With bisect each price update resolves
+its candidates in O(log n + k) instead of scanning the alert table.
+
+The index only nominates candidates: they are confirmed and marked triggered
+by PriceAlertEngine against the database, so an index entry that is stale
+(an alert triggered or deleted by another process) costs an id in the UPDATE
+and nothing else. Changes made elsewhere reach the other processes through
+a change log in the shared cache: every add or discard is stored under a
+sequence number taken with an atomic increment, and each process applies the
+entries it has not seen on its next lookup. The full reload from the database
+only runs on a cold start, or when a process fell behind further than the
+log reaches (entries expired or evicted).
+"""
+
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.core.cache import cache
+from .symbol_master import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+
+class SortedThresholds:
+    """Thresholds in ascending order with the alert id of each"""
+
+    __slots__ = ('values', 'ids')
+
+    def __init__(self, pairs: Iterable[Tuple[float, int]] = ()):
+        pairs = sorted(pairs)
+        self.values = [value for value, _ in pairs]
+        self.ids = [alert_id for _, alert_id in pairs]
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value: float, alert_id: int):
+        position = bisect_right(self.values, value)
+        self.values.insert(position, value)
+        self.ids.insert(position, alert_id)
+
+    def remove(self, value: float, alert_id: int) -> bool:
+        position = bisect_left(self.values, value)
+        while position < len(self.values) and self.values[position] == value:
+            if self.ids[position] == alert_id:
+                del self.values[position]
+                del self.ids[position]
+                return True
+            position += 1
+        return False
+
+    def at_most(self, value: float) -> List[int]:
+        """Ids of thresholds <= value"""
+        return self.ids[:bisect_right(self.values, value)]
+
+    def at_least(self, value: float) -> List[int]:
+        """Ids of thresholds >= value"""
+        return self.ids[bisect_left(self.values, value):]
+
+
+class AlertThresholdIndex:
+    """Per-symbol sorted 'above', 'below' and 'change_percent' thresholds of pending alerts"""
+
+    SEQUENCE_KEY = 'price_alert_index_seq'
+    CHANGE_KEY = 'price_alert_index_change_{seq}'
+    CHANGE_TIMEOUT = 24 * 60 * 60
+    MAX_REPLAY = 1000  # further behind than this, reloading is cheaper than replaying
+
+    ALERT_TYPES = ('above', 'below', 'change_percent')
+
+    def __init__(self):
+        self._symbols: Dict[str, Dict[str, SortedThresholds]] = {}
+        self._alerts: Dict[int, Tuple[str, str, float]] = {}  # alert id -> (symbol, alert type, threshold)
+        self._seq = 0  # last change log entry applied
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def build(self, alerts: Iterable[Tuple[int, str, str, float]]) -> int:
+        """Replace the index with (alert id, symbol, alert type, threshold) rows"""
+        grouped = defaultdict(lambda: defaultdict(list))
+        entries = {}
+        for alert_id, symbol, alert_type, threshold in alerts:
+            symbol = normalize_symbol(symbol)
+            if not symbol or alert_type not in self.ALERT_TYPES:
+                continue
+            threshold = float(threshold)
+            grouped[symbol][alert_type].append((threshold, alert_id))
+            entries[alert_id] = (symbol, alert_type, threshold)
+
+        symbols = {
+            symbol: {alert_type: SortedThresholds(by_type.get(alert_type, ())) for alert_type in self.ALERT_TYPES}
+            for symbol, by_type in grouped.items()
+        }
+        with self._lock:
+            self._symbols = symbols
+            self._alerts = entries
+            self._loaded = True
+        return len(entries)
+
+    def reload(self) -> int:
+        """Rebuild from the pending alerts in the database"""
+        from .models import PriceAlert
+
+        # Read before the query: changes logged while it runs are replayed (idempotently) afterwards
+        seq = cache.get(self.SEQUENCE_KEY) or 0
+        rows = PriceAlert.objects.filter(is_active=True, triggered_at__isnull=True).values_list(
+            'id', 'investment__symbol', 'alert_type', 'target_value'
+        )
+        count = self.build(rows.iterator(chunk_size=10000))
+        self._seq = seq
+        logger.info(f"Loaded {count} pending price alerts into the threshold index")
+        return count
+
+    def ensure_current(self):
+        """Load on first use, then apply the changes other processes published since"""
+        if self._loaded and (cache.get(self.SEQUENCE_KEY) or 0) == self._seq:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.reload()
+                return
+            latest = cache.get(self.SEQUENCE_KEY) or 0
+            if latest < self._seq or latest - self._seq > self.MAX_REPLAY:
+                # The log was reset or we fell too far behind
+                self.reload()
+                return
+            self._replay(latest)
+
+    def _replay(self, latest: int):
+        first = self._seq + 1
+        keys = [self.CHANGE_KEY.format(seq=seq) for seq in range(first, latest + 1)]
+        changes = cache.get_many(keys)
+        for position, key in enumerate(keys):
+            change = changes.get(key)
+            if change is None:
+                if any(later in changes for later in keys[position + 1:]):
+                    # A missing entry ahead of present ones expired or was evicted: it is lost
+                    self.reload()
+                    return
+                # Not written yet by its publisher; pick it up on the next lookup
+                break
+            self._apply(change)
+            self._seq = first + position
+
+    def _apply(self, change: Tuple):
+        operation, *args = change
+        if operation == 'add':
+            self.add(*args)
+        elif operation == 'discard':
+            self.discard(*args)
+
+    def add(self, alert_id: int, symbol: str, alert_type: str, threshold):
+        """Index a pending alert (replacing its previous threshold, if any)"""
+        symbol = normalize_symbol(symbol)
+        if not symbol or alert_type not in self.ALERT_TYPES:
+            return
+        with self._lock:
+            self.discard([alert_id])
+            threshold = float(threshold)
+            by_type = self._symbols.get(symbol)
+            if by_type is None:
+                by_type = self._symbols[symbol] = {t: SortedThresholds() for t in self.ALERT_TYPES}
+            by_type[alert_type].add(threshold, alert_id)
+            self._alerts[alert_id] = (symbol, alert_type, threshold)
+
+    def discard(self, alert_ids: Iterable[int]):
+        """Drop alerts that were triggered, deactivated or deleted"""
+        with self._lock:
+            for alert_id in alert_ids:
+                entry = self._alerts.pop(alert_id, None)
+                if entry is None:
+                    continue
+                symbol, alert_type, threshold = entry
+                self._symbols[symbol][alert_type].remove(threshold, alert_id)
+
+    def resolve(self, symbol: str, price=None, change_percent=None) -> List[int]:
+        """Ids of the alerts a price (and daily change percent) update crosses for one symbol"""
+        by_type = self._symbols.get(normalize_symbol(symbol))
+        if by_type is None:
+            return []
+        triggered = []
+        if price is not None:
+            price = float(price)
+            triggered += by_type['above'].at_most(price)
+            triggered += by_type['below'].at_least(price)
+        if change_percent is not None:
+            triggered += by_type['change_percent'].at_most(abs(float(change_percent)))
+        return triggered
+
+    def resolve_many(self, updates: Dict[str, Tuple[Optional[object], Optional[object]]]) -> Set[int]:
+        """Candidate alert ids for {symbol: (price, daily change percent)}"""
+        self.ensure_current()
+        candidates = set()
+        for symbol, (price, change_percent) in updates.items():
+            candidates.update(self.resolve(symbol, price, change_percent))
+        return candidates
+
+    def publish(self, change: Tuple):
+        """Append an ('add', id, symbol, type, threshold) or ('discard', ids) change to the shared log"""
+        try:
+            cache.add(self.SEQUENCE_KEY, 0, None)
+            seq = cache.incr(self.SEQUENCE_KEY)
+            cache.set(self.CHANGE_KEY.format(seq=seq), change, self.CHANGE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to publish price alert index change: {e}")
+
+    def publish_add(self, alert_id: int, symbol: str, alert_type: str, threshold):
+        self.publish(('add', alert_id, symbol, alert_type, float(threshold)))
+
+    def publish_discard(self, alert_ids: Iterable[int]):
+        self.publish(('discard', list(alert_ids)))
+
+
+alert_index = AlertThresholdIndex()
@@ -8,13 +8,19 @@ Includes fallback mechanisms: BharatSM -> Perplexity -> FMP API
 import logging
 import pandas as pd
 import re
-import requests
 import json
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Callable, Dict, Optional, List, Tuple, Union
 from datetime import datetime, timedelta
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from functools import lru_cache
 from django.conf import settings
+from C8V2.http_client import http_clients
+from .circuit_breaker import is_provider_failure, provider_breakers
+from .rate_limits import provider_limits
+from .symbol_master import symbol_registry
+from .ticker_cache import TickerCache
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +45,7 @@ class FMPAPIService:
     """
     
     BASE_URL = "https://financialmodelingprep.com/api/v3"
+    DEFAULT_BATCH_SIZE = 100  # symbols per comma-separated batch request
     
     @classmethod
     def get_api_key(cls) -> Optional[str]:
@@ -61,7 +68,7 @@ class FMPAPIService:
         try:
             # Get company profile
             profile_url = f"{cls.BASE_URL}/profile/{symbol}?apikey={api_key}"
-            profile_response = requests.get(profile_url, timeout=10)
+            profile_response = http_clients.get('fmp', profile_url)
             profile_response.raise_for_status()
             profile_data = profile_response.json()
             
@@ -72,32 +79,18 @@ class FMPAPIService:
             
             # Get quote data for real-time info
             quote_url = f"{cls.BASE_URL}/quote/{symbol}?apikey={api_key}"
-            quote_response = requests.get(quote_url, timeout=10)
+            quote_response = http_clients.get('fmp', quote_url)
             quote_response.raise_for_status()
             quote_data = quote_response.json()
             
             if not quote_data:
                 return {}
             
-            quote_info = quote_data[0]
-            
-            # Format volume in readable format
-            volume = quote_info.get('volume', 0)
-            formatted_volume = cls._format_volume_indian(volume)
-            
-            return {
-                'volume': formatted_volume,
-                'market_cap': company_data.get('mktCap'),
-                'pe_ratio': quote_info.get('pe'),
-                'growth_rate': None,  # Would need financial statements for this
-                'company_name': company_data.get('companyName'),
-                'sector': company_data.get('sector'),
-                'current_price': quote_info.get('price'),
-                'exchange': company_data.get('exchangeShortName'),
-                'currency': company_data.get('currency', 'USD')
-            }
+            return cls._build_stock_data(company_data, quote_data[0])
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"FMP API error for {symbol}: {e}")
             return {}
     
@@ -122,24 +115,15 @@ class FMPAPIService:
             for crypto_symbol in crypto_symbols:
                 try:
                     crypto_url = f"{cls.BASE_URL}/quote/{crypto_symbol}?apikey={api_key}"
-                    response = requests.get(crypto_url, timeout=10)
+                    response = http_clients.get('fmp', crypto_url)
                     response.raise_for_status()
                     data = response.json()
                     
                     if data and len(data) > 0:
-                        crypto_data = data[0]
-                        
-                        return {
-                            'volume': cls._format_volume_indian(crypto_data.get('volume', 0)),
-                            'market_cap': crypto_data.get('marketCap'),
-                            'pe_ratio': None,  # Not applicable for crypto
-                            'growth_rate': crypto_data.get('changesPercentage'),
-                            'company_name': crypto_data.get('name', f"{clean_symbol} Cryptocurrency"),
-                            'current_price': crypto_data.get('price'),
-                            'exchange': 'CRYPTO',
-                            'currency': 'USD'
-                        }
+                        return cls._build_crypto_data(data[0], clean_symbol)
                 except Exception as e:
+                    if is_provider_failure(e):
+                        raise
                     logger.debug(f"Failed to fetch {crypto_symbol}: {e}")
                     continue
             
@@ -148,9 +132,112 @@ class FMPAPIService:
             return {}
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"FMP crypto API error for {symbol}: {e}")
             return {}
     
+    @classmethod
+    def _build_stock_data(cls, company_data: Dict, quote_info: Dict) -> Dict:
+        """Map FMP profile + quote rows to the frontend display fields"""
+        return {
+            'volume': cls._format_volume_indian(quote_info.get('volume', 0)),
+            'market_cap': company_data.get('mktCap'),
+            'pe_ratio': quote_info.get('pe'),
+            'growth_rate': None,  # Would need financial statements for this
+            'company_name': company_data.get('companyName'),
+            'sector': company_data.get('sector'),
+            'current_price': quote_info.get('price'),
+            'daily_change_percent': quote_info.get('changesPercentage'),
+            'exchange': company_data.get('exchangeShortName'),
+            'currency': company_data.get('currency', 'USD')
+        }
+    
+    @classmethod
+    def _build_crypto_data(cls, crypto_data: Dict, clean_symbol: str) -> Dict:
+        """Map an FMP crypto quote row to the frontend display fields"""
+        return {
+            'volume': cls._format_volume_indian(crypto_data.get('volume', 0)),
+            'market_cap': crypto_data.get('marketCap'),
+            'pe_ratio': None,  # Not applicable for crypto
+            'growth_rate': crypto_data.get('changesPercentage'),
+            'company_name': crypto_data.get('name', f"{clean_symbol} Cryptocurrency"),
+            'current_price': crypto_data.get('price'),
+            'daily_change_percent': crypto_data.get('changesPercentage'),
+            'exchange': 'CRYPTO',
+            'currency': 'USD'
+        }
+    
+    @classmethod
+    def _get_batch(cls, endpoint: str, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Call a comma-separated batch endpoint (quote, profile) in chunks.
+        Returns rows keyed by upper-case symbol; failed chunks are skipped.
+        """
+        api_key = cls.get_api_key()
+        if not api_key or not symbols:
+            return {}
+        
+        batch_size = getattr(settings, 'FMP_BATCH_SIZE', cls.DEFAULT_BATCH_SIZE)
+        symbols = list(dict.fromkeys(symbols))
+        rows = {}
+        for start in range(0, len(symbols), batch_size):
+            chunk = symbols[start:start + batch_size]
+            if not provider_breakers.allow('fmp'):
+                logger.warning(f"Skipping FMP batch {endpoint} for {len(chunk)} symbols: circuit open")
+                continue
+            
+            started = time.monotonic()
+            try:
+                with provider_limits.throttle('fmp'):
+                    response = http_clients.get('fmp', f"{cls.BASE_URL}/{endpoint}/{','.join(chunk)}?apikey={api_key}")
+                response.raise_for_status()
+                data = response.json() or []
+            except Exception as e:
+                provider_breakers.record('fmp', not is_provider_failure(e), time.monotonic() - started)
+                logger.error(f"FMP batch {endpoint} error for {len(chunk)} symbols: {e}")
+                continue
+            
+            provider_breakers.record_success('fmp', time.monotonic() - started)
+            for row in data:
+                if row.get('symbol'):
+                    rows[row['symbol'].upper()] = row
+        return rows
+    
+    @classmethod
+    def get_stock_data_batch(cls, symbols: List[str]) -> Dict[str, Dict]:
+        """Stock data for many symbols with one quote + one profile request per chunk"""
+        symbols = [symbol.upper() for symbol in symbols]
+        quotes = cls._get_batch('quote', symbols)
+        profiles = cls._get_batch('profile', [symbol for symbol in symbols if symbol in quotes])
+        
+        return {
+            symbol: cls._build_stock_data(profiles[symbol], quotes[symbol])
+            for symbol in symbols if symbol in quotes and symbol in profiles
+        }
+    
+    @classmethod
+    def get_crypto_data_batch(cls, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Crypto data for many symbols. Each candidate format (BTCUSD, BTC-USD, BTC)
+        is tried as one batch, only for the symbols still missing.
+        """
+        results = {}
+        pending = {symbol: symbol.upper().replace('USD', '') for symbol in symbols}
+        for template in ('{}USD', '{}-USD', '{}'):
+            if not pending:
+                break
+            candidates = {template.format(clean): symbol for symbol, clean in pending.items()}
+            rows = cls._get_batch('quote', list(candidates))
+            for candidate, row in rows.items():
+                symbol = candidates.get(candidate)
+                if symbol in pending:
+                    results[symbol] = cls._build_crypto_data(row, pending.pop(symbol))
+        
+        if pending:
+            logger.warning(f"No FMP crypto data for {len(pending)} symbols: {', '.join(list(pending)[:10])}")
+        return results
+    
     @classmethod
     def search_symbol(cls, query: str) -> List[Dict]:
         """Search for symbols using FMP API"""
@@ -160,7 +247,7 @@ class FMPAPIService:
         
         try:
             search_url = f"{cls.BASE_URL}/search?query={query}&limit=10&apikey={api_key}"
-            response = requests.get(search_url, timeout=10)
+            response = http_clients.get('fmp', search_url)
             response.raise_for_status()
             return response.json()
             
@@ -264,11 +351,11 @@ class PerplexityFallbackService:
         }
         
         try:
-            response = requests.post(
+            response = http_clients.post(
+                'perplexity',
                 f"{cls.BASE_URL}/chat/completions",
                 headers=headers,
-                json=payload,
-                timeout=30
+                json=payload
             )
             response.raise_for_status()
             
@@ -290,6 +377,8 @@ class PerplexityFallbackService:
                 return {}
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"Perplexity API error: {e}")
             return {}
 
@@ -311,6 +400,26 @@ class FinnhubAPIService:
         """Check if Finnhub API is available"""
         return cls.get_api_key() is not None
     
+    _clients = {}
+    _clients_lock = threading.Lock()
+    
+    @classmethod
+    def get_client(cls, api_key: str):
+        """Shared finnhub.Client per API key, backed by the pooled 'finnhub' HTTP adapter"""
+        client = cls._clients.get(api_key)
+        if client is None:
+            # Import finnhub here to avoid import errors if not installed
+            import finnhub
+            
+            with cls._clients_lock:
+                client = cls._clients.get(api_key)
+                if client is None:
+                    client = finnhub.Client(api_key=api_key)
+                    if hasattr(client, '_session'):
+                        http_clients.mount(client._session, 'finnhub')
+                    cls._clients[api_key] = client
+        return client
+    
     @classmethod
     def get_stock_data(cls, symbol: str) -> Dict:
         """Get comprehensive stock data from Finnhub API using free tier endpoints"""
@@ -320,11 +429,7 @@ class FinnhubAPIService:
             return {}
         
         try:
-            # Import finnhub here to avoid import errors if not installed
-            import finnhub
-            
-            # Initialize Finnhub client
-            finnhub_client = finnhub.Client(api_key=api_key)
+            finnhub_client = cls.get_client(api_key)
             
             # Get quote data (free tier)
             quote_data = cls.get_quote_data(finnhub_client, symbol)
@@ -356,6 +461,8 @@ class FinnhubAPIService:
             logger.error("finnhub-python package not installed")
             return {}
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"Finnhub API error for {symbol}: {e}")
             return {}
     
@@ -380,6 +487,8 @@ class FinnhubAPIService:
             }
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"Finnhub quote error for {symbol}: {e}")
             return {}
     
@@ -407,6 +516,8 @@ class FinnhubAPIService:
             }
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"Finnhub profile error for {symbol}: {e}")
             return {}
     
@@ -447,6 +558,8 @@ class FinnhubAPIService:
             }
             
         except Exception as e:
+            if is_provider_failure(e):
+                raise
             logger.error(f"Finnhub financials error for {symbol}: {e}")
             return {}
     
@@ -458,8 +571,7 @@ class FinnhubAPIService:
             return []
         
         try:
-            import finnhub
-            finnhub_client = finnhub.Client(api_key=api_key)
+            finnhub_client = cls.get_client(api_key)
             
             search_result = finnhub_client.symbol_lookup(query)
             
@@ -500,6 +612,80 @@ class FinnhubAPIService:
             return str(int(volume))
 
 
+class NSEMarketSnapshotCache:
+    """
+    Whole-market NSE tables (turnover, F&O equities index) fetched once per
+    interval and indexed by symbol, so per-symbol volume lookups are dict hits
+    instead of full-table downloads.
+    """
+    
+    DEFAULT_TTL = 300  # 5 minutes
+    FAILURE_TTL = 60   # Retry failed downloads after a minute
+    
+    def __init__(self, nse, ttl: Optional[int] = None):
+        self.nse = nse
+        self.ttl = ttl if ttl is not None else getattr(settings, 'NSE_SNAPSHOT_TTL', self.DEFAULT_TTL)
+        self._snapshots = {}  # name -> (expires_at, {key: row_dict})
+        self._lock = threading.Lock()
+        self.fetch_count = 0
+    
+    @staticmethod
+    def _index_frame(df: Optional[pd.DataFrame], key_columns: Tuple[str, ...]) -> Dict[str, Dict]:
+        """Index a DataFrame by the first available key column (first row wins)"""
+        if df is None or df.empty:
+            return {}
+        key_column = next((col for col in key_columns if col in df.columns), None)
+        if key_column is None:
+            return {}
+        
+        indexed = {}
+        for row in df.to_dict('records'):
+            key = str(row.get(key_column, '')).strip().upper()
+            if key and key not in indexed:
+                indexed[key] = row
+        return indexed
+    
+    def _get_snapshot(self, name: str, loader, key_columns: Tuple[str, ...]) -> Dict[str, Dict]:
+        now = time.monotonic()
+        cached = self._snapshots.get(name)
+        if cached and now < cached[0]:
+            return cached[1]
+        
+        # Hold the lock while loading so concurrent lookups share one download
+        with self._lock:
+            cached = self._snapshots.get(name)
+            if cached and time.monotonic() < cached[0]:
+                return cached[1]
+            
+            try:
+                self.fetch_count += 1
+                indexed = self._index_frame(loader(), key_columns)
+                ttl = self.ttl if indexed else min(self.ttl, self.FAILURE_TTL)
+                logger.debug(f"Loaded NSE {name} snapshot with {len(indexed)} rows")
+            except Exception as e:
+                logger.debug(f"Error loading NSE {name} snapshot: {e}")
+                indexed = {}
+                ttl = min(self.ttl, self.FAILURE_TTL)
+            
+            self._snapshots[name] = (time.monotonic() + ttl, indexed)
+            return indexed
+    
+    def get_turnover_row(self, key: str) -> Optional[Dict]:
+        """Row from the NSE turnover table (keyed by symbol, or by segment for segment-level tables)"""
+        snapshot = self._get_snapshot('turnover', self.nse.get_nse_turnover, ('symbol', 'segment'))
+        return snapshot.get(key.upper())
+    
+    def get_equities_row(self, symbol: str) -> Optional[Dict]:
+        """Row for a symbol from the SECURITIES IN F&O equities index"""
+        snapshot = self._get_snapshot('equities_index', self.nse.get_equities_data_from_index, ('symbol',))
+        return snapshot.get(symbol.upper())
+    
+    def invalidate(self):
+        """Drop all snapshots so the next lookup refetches"""
+        with self._lock:
+            self._snapshots = {}
+
+
 class FinalOptimizedBharatSMService:
     """
     Enhanced service with multiple fallback mechanisms:
@@ -510,6 +696,42 @@ class FinalOptimizedBharatSMService:
     Fetches: Volume, P/E Ratio, Market Cap, Growth Rate for UI display.
     """
     
+    DEFAULT_SYMBOL_DEADLINE = 20  # seconds each BharatSM leg of one symbol may run
+
+    # Routing heuristics for symbols missing from the symbol master
+    INDIAN_SUFFIXES = ('.NS', '.BO', '.NSE', '.BSE')
+    US_EXCHANGE_SUFFIXES = ('.NYSE', '.NASDAQ', '.AMEX')
+    US_NAME_SUFFIXES = ('INC', 'CORP', 'CO', 'LTD')
+    CRYPTO_SUFFIXES = ('USD', 'USDT', 'USDC', 'BUSD')
+    CRYPTO_TOKENS = ('BTC', 'ETH', 'ADA', 'DOT', 'SOL', 'MATIC', 'DOGE', 'LTC', 'XRP', 'LINK')
+    US_STOCK_SYMBOLS = frozenset({
+        # Tech giants
+        'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
+        'NFLX', 'ADBE', 'CRM', 'ORCL', 'IBM', 'INTC', 'AMD', 'QCOM',
+        # Financial
+        'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'V', 'MA', 'PYPL', 'BRK.A', 'BRK.B',
+        # Healthcare & Pharma
+        'JNJ', 'PFE', 'UNH', 'ABBV', 'MRK', 'TMO', 'DHR', 'ABT', 'LLY', 'BMY',
+        # Consumer
+        'KO', 'PEP', 'WMT', 'PG', 'HD', 'MCD', 'DIS', 'NKE', 'SBUX', 'TGT',
+        # Energy & Industrial
+        'XOM', 'CVX', 'GE', 'CAT', 'BA', 'MMM', 'HON', 'UPS', 'FDX',
+        # Telecom & Media
+        'VZ', 'T', 'CMCSA', 'CHTR', 'TMUS',
+        # ETFs (common ones)
+        'SPY', 'QQQ', 'IWM', 'VTI', 'VOO', 'VEA', 'VWO', 'AGG', 'BND',
+    })
+    INDIAN_STOCK_SYMBOLS = frozenset({
+        'TCS', 'RELIANCE', 'INFY', 'HDFCBANK', 'ICICIBANK',
+        'SBIN', 'BHARTIARTL', 'ITC', 'KOTAKBANK', 'LT',
+        'ASIANPAINT', 'MARUTI', 'BAJFINANCE', 'HCLTECH',
+        'WIPRO', 'ULTRACEMCO', 'AXISBANK', 'TITAN', 'NESTLEIND',
+        'HINDUNILVR', 'POWERGRID', 'NTPC', 'COALINDIA', 'ONGC',
+        'TATAMOTORS', 'TATASTEEL', 'JSWSTEEL', 'HINDALCO', 'VEDL',
+        'ADANIPORTS', 'ADANIENT', 'GODREJCP', 'BRITANNIA', 'DABUR',
+        'TATA', 'BAJAJ',
+    })
+
     def __init__(self):
         # Initialize BharatSM if available
         self.bharatsm_available = BHARATSM_AVAILABLE
@@ -520,6 +742,9 @@ class FinalOptimizedBharatSMService:
             self.mc = None
             self.nse = None
         
+        # Whole-market NSE tables shared by all volume lookups
+        self.market_snapshot = NSEMarketSnapshotCache(self.nse) if self.nse else None
+        
         # Initialize fallback services
         self.perplexity_service = PerplexityFallbackService()
         self.fmp_service = FMPAPIService()
@@ -549,10 +774,8 @@ class FinalOptimizedBharatSMService:
             re.compile(r'Sales', re.IGNORECASE)
         ]
         
-        # Cache for ticker lookups (5 minute expiry)
-        self._ticker_cache = {}
-        self._cache_expiry = {}
-        self._cache_duration = 300  # 5 minutes
+        # Two-tier ticker cache (local LRU in front of the shared cache)
+        self.ticker_cache = TickerCache(self._load_ticker)
     
     @classmethod
     def is_available(cls) -> bool:
@@ -569,40 +792,16 @@ class FinalOptimizedBharatSMService:
         symbol_upper = symbol.upper()
         
         # Check for Indian exchange suffixes
-        indian_suffixes = ['.NS', '.BO', '.NSE', '.BSE']
-        if any(symbol_upper.endswith(suffix) for suffix in indian_suffixes):
+        if symbol_upper.endswith(self.INDIAN_SUFFIXES):
             return True
         
-        # Known US stock symbols (common ones)
-        us_stock_patterns = [
-            'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
-            'NFLX', 'ADBE', 'CRM', 'ORCL', 'IBM', 'INTC', 'AMD', 'QCOM',
-            'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'V', 'MA', 'PYPL',
-            'JNJ', 'PFE', 'UNH', 'ABBV', 'MRK', 'TMO', 'DHR', 'ABT',
-            'KO', 'PEP', 'WMT', 'PG', 'HD', 'MCD', 'DIS', 'NKE'
-        ]
-        
         # If it's a known US stock, definitely not Indian
-        if symbol_upper in us_stock_patterns:
+        if symbol_upper in self.US_STOCK_SYMBOLS:
             return False
         
-        # Check for common Indian stock patterns
         # Most Indian stocks are 3-10 characters without dots
         if '.' not in symbol and 3 <= len(symbol) <= 10:
-            # Common Indian stock symbols
-            indian_patterns = [
-                'TCS', 'RELIANCE', 'INFY', 'HDFCBANK', 'ICICIBANK',
-                'SBIN', 'BHARTIARTL', 'ITC', 'KOTAKBANK', 'LT',
-                'ASIANPAINT', 'MARUTI', 'BAJFINANCE', 'HCLTECH',
-                'WIPRO', 'ULTRACEMCO', 'AXISBANK', 'TITAN', 'NESTLEIND',
-                'HINDUNILVR', 'POWERGRID', 'NTPC', 'COALINDIA', 'ONGC',
-                'TATAMOTORS', 'TATASTEEL', 'JSWSTEEL', 'HINDALCO', 'VEDL',
-                'ADANIPORTS', 'ADANIENT', 'GODREJCP', 'BRITANNIA', 'DABUR',
-                'TATA', 'BAJAJ'  # Added common Indian company prefixes
-            ]
-            
-            # If it matches known Indian stocks
-            if symbol_upper in indian_patterns:
+            if symbol_upper in self.INDIAN_STOCK_SYMBOLS:
                 return True
             
             # For other symbols, use heuristics
@@ -613,16 +812,16 @@ class FinalOptimizedBharatSMService:
         return False
     
     def _determine_asset_type(self, symbol: str) -> str:
-        """Enhanced asset type detection with better US stock identification"""
-        symbol_upper = symbol.upper()
+        """Route a symbol to a provider chain, using the symbol master before heuristics"""
+        route = symbol_registry.route(symbol)
+        if route:
+            return route
         
-        # Crypto patterns (most specific first)
-        crypto_patterns = ['BTC', 'ETH', 'ADA', 'DOT', 'SOL', 'MATIC', 'DOGE', 'LTC', 'XRP', 'LINK']
-        crypto_suffixes = ['USD', 'USDT', 'USDC', 'BUSD']
+        symbol_upper = symbol.upper()
         
-        if (any(symbol_upper.endswith(suffix) for suffix in crypto_suffixes) or
-            any(symbol_upper.startswith(crypto) for crypto in crypto_patterns) or
-            any(crypto in symbol_upper for crypto in crypto_patterns)):
+        # Crypto patterns
+        if (symbol_upper.endswith(self.CRYPTO_SUFFIXES) or
+                any(crypto in symbol_upper for crypto in self.CRYPTO_TOKENS)):
             return 'crypto'
         
         # Enhanced US stock detection (check explicit US patterns first)
@@ -633,26 +832,7 @@ class FinalOptimizedBharatSMService:
         if self._is_indian_symbol(symbol):
             return 'indian_stock'
         
-        # Default fallback logic
-        # If symbol has dots (like BRK.A, BRK.B), likely US stock
-        if '.' in symbol_upper and not any(symbol_upper.endswith(suffix) for suffix in ['.NS', '.BO', '.NSE', '.BSE']):
-            return 'us_stock'
-        
-        # If symbol is very short (1-2 chars), likely US stock
-        if len(symbol) <= 2:
-            return 'us_stock'
-        
-        # If symbol is very long (>10 chars), likely US stock
-        if len(symbol) > 10:
-            return 'us_stock'
-        
-        # For 3-character symbols, check if they're common ETFs or US patterns
-        if len(symbol) == 3:
-            common_etfs = ['SPY', 'QQQ', 'IWM', 'VTI', 'VOO', 'VEA', 'VWO', 'AGG', 'BND']
-            if symbol_upper in common_etfs:
-                return 'us_stock'
-        
-        # Default to US stock for ambiguous cases
+        # Default to US stock for dotted, very short/long and ambiguous symbols
         return 'us_stock'
     
     def _is_us_stock_symbol(self, symbol: str) -> bool:
@@ -660,44 +840,16 @@ class FinalOptimizedBharatSMService:
         symbol_upper = symbol.upper()
         
         # Explicit US stock patterns
-        us_exchanges = ['.NYSE', '.NASDAQ', '.AMEX']
-        if any(symbol_upper.endswith(exchange) for exchange in us_exchanges):
+        if symbol_upper.endswith(self.US_EXCHANGE_SUFFIXES):
             return True
         
-        # Common US stock patterns
-        us_patterns = [
-            # Tech giants
-            'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
-            'NFLX', 'ADBE', 'CRM', 'ORCL', 'IBM', 'INTC', 'AMD', 'QCOM',
-            
-            # Financial
-            'JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'V', 'MA', 'PYPL', 'BRK.A', 'BRK.B',
-            
-            # Healthcare & Pharma
-            'JNJ', 'PFE', 'UNH', 'ABBV', 'MRK', 'TMO', 'DHR', 'ABT', 'LLY', 'BMY',
-            
-            # Consumer
-            'KO', 'PEP', 'WMT', 'PG', 'HD', 'MCD', 'DIS', 'NKE', 'SBUX', 'TGT',
-            
-            # Energy & Industrial
-            'XOM', 'CVX', 'GE', 'CAT', 'BA', 'MMM', 'HON', 'UPS', 'FDX',
-            
-            # Telecom & Media
-            'VZ', 'T', 'CMCSA', 'CHTR', 'TMUS',
-            
-            # ETFs (common ones)
-            'SPY', 'QQQ', 'IWM', 'VTI', 'VOO', 'VEA', 'VWO', 'AGG', 'BND'
-        ]
-        
-        if symbol_upper in us_patterns:
+        if symbol_upper in self.US_STOCK_SYMBOLS:
             return True
         
         # US-style patterns
         # Symbols with dots (like BRK.A, BRK.B) but not Indian exchange suffixes
         if '.' in symbol_upper and len(symbol_upper.split('.')[0]) <= 4:
-            # Exclude Indian exchange suffixes
-            indian_suffixes = ['.NS', '.BO', '.NSE', '.BSE']
-            if not any(symbol_upper.endswith(suffix) for suffix in indian_suffixes):
+            if not symbol_upper.endswith(self.INDIAN_SUFFIXES):
                 return True
         
         # Single letter symbols (common in US)
@@ -705,10 +857,8 @@ class FinalOptimizedBharatSMService:
             return True
         
         # 4+ character symbols ending with common US suffixes
-        if len(symbol) >= 4:
-            us_suffixes = ['INC', 'CORP', 'CO', 'LTD']
-            if any(symbol_upper.endswith(suffix) for suffix in us_suffixes):
-                return True
+        if len(symbol) >= 4 and symbol_upper.endswith(self.US_NAME_SUFFIXES):
+            return True
         
         return False
     
@@ -749,108 +899,72 @@ class FinalOptimizedBharatSMService:
             logger.error(f"Error fetching data for {symbol}: {e}")
             return {}
     
-    def _get_indian_stock_data(self, symbol: str) -> Dict:
-        """Get Indian stock data with BharatSM -> Perplexity fallback"""
-        # Try BharatSM first
-        if self.bharatsm_available and self.mc:
-            try:
-                result = self._get_bharatsm_data(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from BharatSM")
-                    return result
-                else:
-                    logger.warning(f"BharatSM returned incomplete data for {symbol}")
-            except Exception as e:
-                logger.warning(f"BharatSM failed for {symbol}: {e}")
+    def _run_provider_chain(self, symbol: str, chain: List[Tuple[str, Callable]], label: str) -> Dict:
+        """
+        Try providers in health order, skipping open circuits.
         
-        # Fallback to Perplexity
-        if self.perplexity_service.is_available():
+        ``chain`` is the configured fallback order as (provider, fetch) pairs;
+        every attempt is recorded on the provider's circuit breaker, where only
+        raised provider errors count as failures.
+        """
+        fetchers = dict(chain)
+        for provider in provider_breakers.order([name for name, _ in chain]):
+            if not provider_breakers.allow(provider):
+                logger.info(f"Skipping {provider} for {symbol}: circuit open")
+                continue
+            
+            started = time.monotonic()
             try:
-                logger.info(f"Falling back to Perplexity API for {symbol}")
-                result = self.perplexity_service.get_stock_data_fallback(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from Perplexity")
-                    return result
+                logger.info(f"Fetching {label} data for {symbol} from {provider}")
+                with provider_limits.throttle(provider):
+                    result = fetchers[provider](symbol)
             except Exception as e:
-                logger.warning(f"Perplexity fallback failed for {symbol}: {e}")
+                provider_breakers.record_failure(provider, time.monotonic() - started)
+                logger.warning(f"{provider} failed for {label} {symbol}: {e}")
+                continue
+            
+            # The provider answered: an empty result is a miss (symbol not covered), not a failure.
+            # Timeouts, connection errors and HTTP 5xx/429 surface as exceptions above.
+            provider_breakers.record_success(provider, time.monotonic() - started)
+            if self._is_valid_result(result):
+                logger.info(f"Successfully fetched {symbol} data from {provider}")
+                return result
+            logger.warning(f"{provider} returned incomplete data for {symbol}")
         
+        logger.error(f"All fallback methods failed for {label} {symbol}")
+        return {}
+    
+    def _get_indian_stock_data(self, symbol: str) -> Dict:
+        """Get Indian stock data with BharatSM -> Perplexity -> FMP fallback"""
+        chain = []
+        if self.bharatsm_available and self.mc:
+            chain.append(('bharatsm', self._get_bharatsm_data))
+        if self.perplexity_service.is_available():
+            chain.append(('perplexity', self.perplexity_service.get_stock_data_fallback))
         # Final fallback to FMP (might work for some Indian ADRs)
         if self.fmp_service.is_available():
-            try:
-                logger.info(f"Final fallback to FMP API for {symbol}")
-                result = self.fmp_service.get_stock_data(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from FMP")
-                    return result
-            except Exception as e:
-                logger.warning(f"FMP fallback failed for {symbol}: {e}")
-        
-        logger.error(f"All fallback methods failed for Indian stock {symbol}")
-        return {}
+            chain.append(('fmp', self.fmp_service.get_stock_data))
+        return self._run_provider_chain(symbol, chain, 'Indian stock')
     
     def _get_crypto_data(self, symbol: str) -> Dict:
-        """Get cryptocurrency data using FMP API"""
+        """Get cryptocurrency data with FMP -> Perplexity fallback"""
+        chain = []
         if self.fmp_service.is_available():
-            try:
-                logger.info(f"Fetching crypto data for {symbol} from FMP API")
-                result = self.fmp_service.get_crypto_data(symbol)
-                if self._is_valid_result(result):
-                    return result
-            except Exception as e:
-                logger.warning(f"FMP crypto API failed for {symbol}: {e}")
-        
-        # Fallback to Perplexity for crypto
+            chain.append(('fmp', self.fmp_service.get_crypto_data))
         if self.perplexity_service.is_available():
-            try:
-                logger.info(f"Falling back to Perplexity for crypto {symbol}")
-                # Use a crypto-specific prompt
-                result = self._get_crypto_data_perplexity(symbol)
-                if self._is_valid_result(result):
-                    return result
-            except Exception as e:
-                logger.warning(f"Perplexity crypto fallback failed for {symbol}: {e}")
-        
-        return {}
+            chain.append(('perplexity', self._get_crypto_data_perplexity))
+        return self._run_provider_chain(symbol, chain, 'crypto')
     
     def _get_us_stock_data(self, symbol: str) -> Dict:
-        """Enhanced US stock data with Finnhub primary, FMP fallback"""
-        # Try Finnhub first (primary source for US stocks)
+        """Get US stock data with Finnhub -> FMP -> Perplexity fallback"""
+        chain = []
         if self.finnhub_service.is_available():
-            try:
-                logger.info(f"Fetching US stock data for {symbol} from Finnhub API")
-                result = self.finnhub_service.get_stock_data(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from Finnhub")
-                    return result
-                else:
-                    logger.warning(f"Finnhub returned incomplete data for {symbol}")
-            except Exception as e:
-                logger.warning(f"Finnhub API failed for {symbol}: {e}")
-        
-        # Fallback to FMP
+            chain.append(('finnhub', self.finnhub_service.get_stock_data))
         if self.fmp_service.is_available():
-            try:
-                logger.info(f"Falling back to FMP API for US stock {symbol}")
-                result = self.fmp_service.get_stock_data(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from FMP")
-                    return result
-            except Exception as e:
-                logger.warning(f"FMP API failed for {symbol}: {e}")
-        
-        # Final fallback to Perplexity
+            chain.append(('fmp', self.fmp_service.get_stock_data))
         if self.perplexity_service.is_available():
-            try:
-                logger.info(f"Final fallback to Perplexity for US stock {symbol}")
-                result = self._get_us_stock_data_perplexity(symbol)
-                if self._is_valid_result(result):
-                    logger.info(f"Successfully fetched {symbol} data from Perplexity")
-                    return result
-            except Exception as e:
-                logger.warning(f"Perplexity US stock fallback failed for {symbol}: {e}")
-        
-        logger.error(f"All fallback methods failed for US stock {symbol}")
-        return {}
+            chain.append(('perplexity', self._get_us_stock_data_perplexity))
+        return self._run_provider_chain(symbol, chain, 'US stock')
     
     def _get_bharatsm_data(self, symbol: str) -> Dict:
         """Get data using original BharatSM implementation"""
@@ -867,13 +981,19 @@ class FinalOptimizedBharatSMService:
             logger.warning(f"No company URL found for {symbol}")
             return {}
 
-        # Step 2: Fetch all required data efficiently
-        ratios_df = self._get_ratios_data_safe(company_url)
-        quarterly_df = self._get_quarterly_results_safe(company_url)
-        mini_ratios_df = self._get_ratios_mini_statement(ticker_id)
+        # Step 2: Fetch all independent data legs concurrently under one deadline
+        legs = self._run_legs_with_deadline(symbol, {
+            'ratios': lambda: self._get_ratios_data_safe(company_url),
+            'quarterly': lambda: self._get_quarterly_results_safe(company_url),
+            'mini_ratios': lambda: self._get_ratios_mini_statement(ticker_id),
+            'volume': lambda: self._get_volume_data_optimized(ticker_id, symbol),
+        })
+        ratios_df = legs['ratios']
+        quarterly_df = legs['quarterly']
+        mini_ratios_df = legs['mini_ratios']
 
         # Step 3: Extract data using optimized methods
-        volume = self._get_volume_data_optimized(ticker_id, symbol)
+        volume = legs['volume']  # None if the volume chain missed the deadline
         market_cap = self._extract_market_cap_final(ratios_df)
         pe_ratio = self._extract_pe_ratio_final(ratios_df)
         
@@ -897,6 +1017,41 @@ class FinalOptimizedBharatSMService:
         
         return result
     
+    def _run_legs_with_deadline(self, symbol: str, legs: Dict) -> Dict:
+        """
+        Run independent fetch legs concurrently and give each at most
+        settings.BHARATSM_SYMBOL_DEADLINE seconds from the moment it starts.
+        Legs that fail or miss the deadline come back as None (partial result).
+        
+        Every call gets its own executor with one thread per leg: no leg waits
+        in a queue, and a provider call that hangs past its deadline only keeps
+        its own (abandoned) thread busy instead of a slot other symbols need.
+        """
+        deadline = getattr(settings, 'BHARATSM_SYMBOL_DEADLINE', self.DEFAULT_SYMBOL_DEADLINE)
+        started = {}
+        
+        def run(name, func):
+            started[name] = time.monotonic()
+            return func()
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, len(legs)), thread_name_prefix='bharatsm-leg')
+        try:
+            futures = {name: executor.submit(run, name, func) for name, func in legs.items()}
+            results = {}
+            for name, future in futures.items():
+                remaining = started.get(name, time.monotonic()) + deadline - time.monotonic()
+                try:
+                    results[name] = future.result(timeout=max(0, remaining))
+                except FutureTimeout:
+                    logger.warning(f"BharatSM {name} fetch for {symbol} missed the {deadline}s deadline")
+                    results[name] = None
+                except Exception as e:
+                    logger.warning(f"BharatSM {name} fetch failed for {symbol}: {e}")
+                    results[name] = None
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def _get_crypto_data_perplexity(self, symbol: str) -> Dict:
         """Get crypto data using Perplexity with crypto-specific prompt"""
         prompt = f"""
@@ -1003,28 +1158,13 @@ class FinalOptimizedBharatSMService:
             logger.error(f"Error calculating growth rate: {e}")
             return None
     
+    def _load_ticker(self, symbol: str) -> Tuple[Optional[str], Optional[List]]:
+        """Look up a ticker on MoneyControl (cache loader)."""
+        return self.mc.get_ticker(symbol)
+    
     def _get_cached_ticker(self, symbol: str) -> Tuple[Optional[str], Optional[List]]:
-        """Get ticker info with intelligent caching."""
-        cache_key = f"ticker_{symbol}"
-        current_time = time.time()
-        
-        # Check cache
-        if (cache_key in self._ticker_cache and 
-            cache_key in self._cache_expiry and 
-            current_time < self._cache_expiry[cache_key]):
-            logger.debug(f"Using cached ticker data for {symbol}")
-            return self._ticker_cache[cache_key]
-        
-        # Fetch fresh data
-        try:
-            ticker_result, ticker_raw = self.mc.get_ticker(symbol)
-            self._ticker_cache[cache_key] = (ticker_result, ticker_raw)
-            self._cache_expiry[cache_key] = current_time + self._cache_duration
-            logger.debug(f"Cached fresh ticker data for {symbol}")
-            return ticker_result, ticker_raw
-        except Exception as e:
-            logger.error(f"Error fetching ticker for {symbol}: {e}")
-            return None, None
+        """Get ticker info through the two-tier ticker cache."""
+        return self.ticker_cache.get(symbol)
     
     def _get_ratios_data_safe(self, company_url: str) -> Optional[pd.DataFrame]:
         """Get ratios data following u.md documentation."""
@@ -1300,36 +1440,30 @@ class FinalOptimizedBharatSMService:
         return False
     
     def _get_volume_from_turnover_data(self, symbol: str) -> Optional[str]:
-        """Get volume from NSE turnover data (NEW METHOD from updated u.md)."""
+        """Get volume from the cached NSE turnover snapshot (NEW METHOD from updated u.md)."""
         try:
-            turnover_df = self.nse.get_nse_turnover()
-            if turnover_df is not None and not turnover_df.empty:
-                # Look for equity segment data
-                equity_data = turnover_df[turnover_df['segment'] == 'CM']
-                if not equity_data.empty:
-                    # Get total volume for equity segment
-                    total_volume = equity_data['volume'].iloc[0]  # Current day volume
-                    if pd.notna(total_volume) and total_volume > 0:
-                        logger.debug(f"Found volume from turnover data: {total_volume}")
-                        return self._format_volume_indian(float(total_volume))
+            # Symbol-level row if the table has one, otherwise the equity (CM) segment row
+            row = self.market_snapshot.get_turnover_row(symbol) or self.market_snapshot.get_turnover_row('CM')
+            if row:
+                total_volume = row.get('volume')
+                if pd.notna(total_volume) and total_volume > 0:
+                    logger.debug(f"Found volume from turnover data: {total_volume}")
+                    return self._format_volume_indian(float(total_volume))
             return None
         except Exception as e:
             logger.debug(f"Error getting volume from turnover data: {e}")
             return None
     
     def _get_volume_from_equities_index_data(self, symbol: str) -> Optional[str]:
-        """Get volume from equities index data (NEW METHOD from updated u.md)."""
+        """Get volume from the cached equities index snapshot (NEW METHOD from updated u.md)."""
         try:
-            # Try to get data from SECURITIES IN F&O index (default)
-            equities_df = self.nse.get_equities_data_from_index()
-            if equities_df is not None and not equities_df.empty:
-                # Look for the specific symbol
-                symbol_data = equities_df[equities_df['symbol'] == symbol]
-                if not symbol_data.empty and 'totalTradedVolume' in symbol_data.columns:
-                    volume = symbol_data['totalTradedVolume'].iloc[0]
-                    if pd.notna(volume) and volume > 0:
-                        logger.debug(f"Found volume from equities index data: {volume}")
-                        return self._format_volume_indian(float(volume))
+            # SECURITIES IN F&O index (default), downloaded once per snapshot interval
+            row = self.market_snapshot.get_equities_row(symbol)
+            if row:
+                volume = row.get('totalTradedVolume')
+                if pd.notna(volume) and volume > 0:
+                    logger.debug(f"Found volume from equities index data: {volume}")
+                    return self._format_volume_indian(float(volume))
             return None
         except Exception as e:
             logger.debug(f"Error getting volume from equities index data: {e}")
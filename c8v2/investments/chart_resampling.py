@@ -0,0 +1,153 @@
+"""
+OHLCV resampling for the chart endpoints.
+
+Weekly and monthly candles are aggregated from the shared daily bars with
+pandas (first open, max high, min low, last close, summed volume) instead of
+picking every n-th row, and the result is cached per (symbol, interval,
+range). Long series can be reduced to a fixed number of points with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of a line
+for sparklines.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# timeframe: (pandas resample rule, None for the stored daily bars; range in days)
+TIMEFRAMES = {
+    'daily': (None, 30),
+    'weekly': ('W-FRI', 7 * 12),
+    'monthly': ('MS', 365),
+}
+
+BAR_FIELDS = ['ts', 'date', 'open', 'high', 'low', 'close', 'volume']
+OHLCV_AGGREGATION = {
+    'ts': 'first',
+    'date': 'first',
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+}
+
+
+def resample_ohlcv(frame: pd.DataFrame, rule: Optional[str]) -> pd.DataFrame:
+    """Aggregate daily bars (indexed by session date) into candles for a pandas rule"""
+    if rule is None or frame.empty:
+        return frame
+    candles = frame.resample(rule).agg(OHLCV_AGGREGATION)
+    # Buckets without any session (e.g. a week of holidays) come back empty
+    return candles.dropna(subset=['open'])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        # Third triangle vertex: average of the next bucket (the last point for the final bucket)
+        if end < next_end:
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        indices[i + 1] = a
+
+    indices[-1] = n - 1
+    return indices
+
+
+class ChartResampler:
+    """Cached chart series built from the shared PriceHistory bars"""
+
+    CACHE_PREFIX = 'chart_series'
+    DEFAULT_CACHE_TIMEOUT = 3600
+
+    @classmethod
+    def cache_key(cls, symbol: str, timeframe: str) -> str:
+        from .services import PriceHistoryService
+
+        symbol, exchange = PriceHistoryService.series_key(symbol)
+        rule, days = TIMEFRAMES[timeframe]
+        return f"{cls.CACHE_PREFIX}_{symbol}_{exchange}_{rule or '1d'}_{days}"
+
+    @classmethod
+    def invalidate(cls, symbol: str):
+        """Drop every cached timeframe for a symbol (after its bars changed)"""
+        cache.delete_many([cls.cache_key(symbol, timeframe) for timeframe in TIMEFRAMES])
+
+    @staticmethod
+    def load_frame(symbol: str, since) -> pd.DataFrame:
+        """Daily bars from ``since`` onwards as a DataFrame indexed by session date"""
+        from .services import PriceHistoryService
+
+        rows = PriceHistoryService.get_bars(symbol).filter(date__gte=since).values_list(*BAR_FIELDS)
+        frame = pd.DataFrame.from_records(list(rows), columns=BAR_FIELDS)
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame['date']))
+        return frame
+
+    @staticmethod
+    def to_points(frame: pd.DataFrame) -> List[Dict]:
+        """Chart points in the ChartDataSerializer shape"""
+        return [
+            {
+                'date': row.date.isoformat(),
+                'open_price': f"{row.open:.4f}",
+                'high_price': f"{row.high:.4f}",
+                'low_price': f"{row.low:.4f}",
+                'close_price': f"{row.close:.4f}",
+                'volume': int(row.volume),
+                'timestamp': int(row.ts.timestamp()),
+            }
+            for row in frame.itertuples(index=False)
+        ]
+
+    @classmethod
+    def get_series(cls, symbol: str, timeframe: str = 'daily') -> List[Dict]:
+        """Candles for a timeframe over its range, oldest first"""
+        if timeframe not in TIMEFRAMES:
+            timeframe = 'daily'
+        key = cls.cache_key(symbol, timeframe)
+        points = cache.get(key)
+        if points is not None:
+            return points
+
+        rule, days = TIMEFRAMES[timeframe]
+        frame = cls.load_frame(symbol, timezone.now().date() - timedelta(days=days))
+        points = cls.to_points(resample_ohlcv(frame, rule))
+        cache.set(key, points, getattr(settings, 'CHART_SERIES_CACHE_TTL', cls.DEFAULT_CACHE_TIMEOUT))
+        return points
+
+    @staticmethod
+    def downsample(points: List[Dict], threshold: int) -> List[Dict]:
+        """Reduce a series to ``threshold`` points with LTTB on the closing price"""
+        if threshold >= len(points):
+            return points
+        x = np.array([point['timestamp'] for point in points], dtype=float)
+        y = np.array([float(point['close_price']) for point in points])
+        return [points[i] for i in lttb(x, y, threshold)]
@@ -0,0 +1,218 @@
+"""
+Per-provider circuit breakers for market data APIs.
+
+Outcomes are counted in the shared Django cache with atomic increments on
+per-bucket counters (calls, failures, total latency) that together form a
+rolling window, and the open state is a single key set with cache.add, so every
+worker process sees, and contributes to, the same provider health. A provider
+whose error rate crosses the threshold is opened and skipped until a cooldown
+passes; then a single half-open probe decides whether it closes again.
+Fallback chains are reordered so open and degraded providers are tried last.
+"""
+
+import logging
+import time
+from typing import Dict, List, Sequence
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Whether an error means the provider is unhealthy (timeout, connection error, HTTP 5xx/429)"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'status_code', None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class CircuitBreakerRegistry:
+    """Shared-state circuit breakers keyed by provider name"""
+
+    KEY_PREFIX = 'circuit_breaker'
+    BUCKETS = 10  # counter buckets per window
+
+    DEFAULTS = {
+        'window': 300,           # seconds of history used for the error rate
+        'min_calls': 5,          # calls needed before a circuit can open
+        'error_threshold': 0.5,  # error rate that opens the circuit
+        'degraded_threshold': 0.2,  # error rate that moves a provider down the chain
+        'slow_call': 10.0,       # average latency (seconds) that counts as degraded
+        'cooldown': 60,          # seconds an open circuit waits before a probe
+        'probe_timeout': 30,     # seconds before an unanswered probe can be retried
+    }
+
+    COUNTERS = ('calls', 'failures', 'latency_ms')
+
+    @property
+    def config(self) -> Dict:
+        return {**self.DEFAULTS, **getattr(settings, 'MARKET_DATA_CIRCUIT_BREAKER', {})}
+
+    def _key(self, provider: str) -> str:
+        return f"{self.KEY_PREFIX}_{provider}"
+
+    def _bucket_width(self, config: Dict) -> int:
+        return max(1, int(config['window']) // self.BUCKETS)
+
+    def _bucket_keys(self, provider: str, now: float, config: Dict) -> Dict[str, List[str]]:
+        """Counter keys of every bucket in the window ending now, per counter"""
+        width = self._bucket_width(config)
+        last = int(now) // width
+        first = int(now - config['window']) // width + 1
+        return {
+            counter: [f"{self._key(provider)}_{bucket}_{counter}" for bucket in range(first, last + 1)]
+            for counter in self.COUNTERS
+        }
+
+    def _incr(self, key: str, delta: int, timeout: int):
+        # add() is a no-op when the counter exists; incr() is atomic on the shared backend
+        cache.add(key, 0, timeout)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.add(key, delta, timeout)
+
+    def _opened_at(self, provider: str):
+        try:
+            return cache.get(f"{self._key(provider)}_opened_at")
+        except Exception as e:
+            logger.warning(f"Circuit breaker state unavailable for {provider}: {e}")
+            return None
+
+    def _window_stats(self, provider: str, now: float, config: Dict = None) -> Dict:
+        config = config or self.config
+        keys = self._bucket_keys(provider, now, config)
+        try:
+            values = cache.get_many([key for counter_keys in keys.values() for key in counter_keys])
+        except Exception as e:
+            logger.warning(f"Circuit breaker counters unavailable for {provider}: {e}")
+            values = {}
+        calls, failures, latency_ms = (
+            sum(values.get(key, 0) for key in keys[counter]) for counter in self.COUNTERS
+        )
+        return {
+            'calls': calls,
+            'failures': failures,
+            'error_rate': failures / calls if calls else 0.0,
+            'avg_latency': latency_ms / 1000 / calls if calls else 0.0,
+        }
+
+    def _current(self, opened_at) -> str:
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at >= self.config['cooldown']:
+            return HALF_OPEN
+        return OPEN
+
+    def get_state(self, provider: str) -> str:
+        """Current state, moving open circuits to half-open once the cooldown has passed"""
+        return self._current(self._opened_at(provider))
+
+    def allow(self, provider: str) -> bool:
+        """Whether a call to the provider should be attempted now"""
+        current = self.get_state(provider)
+        if current == CLOSED:
+            return True
+        if current == HALF_OPEN:
+            # Only one process/thread gets to probe per cooldown period
+            try:
+                return cache.add(f"{self._key(provider)}_probe", 1, self.config['probe_timeout'])
+            except Exception as e:
+                # Without the shared cache the breaker fails open rather than blocking the fetch
+                logger.warning(f"Circuit breaker probe unavailable for {provider}: {e}")
+                return True
+        return False
+
+    def record(self, provider: str, success: bool, latency: float):
+        """Record the outcome of one provider call"""
+        config = self.config
+        now = time.time()
+        opened_key = f"{self._key(provider)}_opened_at"
+        timeout = int(config['window']) + self._bucket_width(config)
+        try:
+            keys = self._bucket_keys(provider, now, config)
+            self._incr(keys['calls'][-1], 1, timeout)
+            if not success:
+                self._incr(keys['failures'][-1], 1, timeout)
+            self._incr(keys['latency_ms'][-1], int(latency * 1000), timeout)
+
+            opened_at = cache.get(opened_key)
+            if opened_at is not None:
+                if now - opened_at < config['cooldown']:
+                    return
+                # Outcome of a half-open probe
+                if success:
+                    cache.delete_many([opened_key] + [key for counter_keys in keys.values() for key in counter_keys])
+                    self._incr(keys['calls'][-1], 1, timeout)
+                    self._incr(keys['latency_ms'][-1], int(latency * 1000), timeout)
+                    logger.info(f"Circuit for {provider} closed after successful probe")
+                else:
+                    cache.set(opened_key, now, None)
+                cache.delete(f"{self._key(provider)}_probe")
+                return
+
+            stats = self._window_stats(provider, now, config)
+            if stats['calls'] >= config['min_calls'] and stats['error_rate'] >= config['error_threshold']:
+                # Only the process whose add() wins opens the circuit (and logs it)
+                if cache.add(opened_key, now, None):
+                    logger.warning(
+                        f"Circuit for {provider} opened: {stats['failures']}/{stats['calls']} "
+                        f"calls failed in the last {config['window']}s"
+                    )
+        except Exception as e:
+            logger.warning(f"Failed to record circuit breaker outcome for {provider}: {e}")
+
+    def record_success(self, provider: str, latency: float):
+        self.record(provider, True, latency)
+
+    def record_failure(self, provider: str, latency: float):
+        self.record(provider, False, latency)
+
+    def get_health(self, provider: str) -> Dict:
+        return {'state': self.get_state(provider), **self._window_stats(provider, time.time())}
+
+    def order(self, providers: Sequence[str]) -> List[str]:
+        """
+        Reorder a fallback chain by recent health.
+
+        Healthy providers keep their configured order, degraded providers
+        (error rate or latency above the thresholds) follow sorted by error rate
+        and latency, and open circuits go last.
+        """
+        config = self.config
+
+        def sort_key(item):
+            index, provider = item
+            health = self.get_health(provider)
+            if health['state'] == OPEN:
+                return (2, 0, 0, index)
+            degraded = health['calls'] >= config['min_calls'] and (
+                health['error_rate'] >= config['degraded_threshold']
+                or health['avg_latency'] >= config['slow_call']
+            )
+            if degraded or health['state'] == HALF_OPEN:
+                return (1, round(health['error_rate'], 2), round(health['avg_latency'], 1), index)
+            return (0, 0, 0, index)
+
+        return [provider for _, provider in sorted(enumerate(providers), key=sort_key)]
+
+    def reset(self, provider: str = None):
+        """Clear shared state (all known providers when none is given)"""
+        providers = [provider] if provider else list(getattr(settings, 'MARKET_DATA_PROVIDER_LIMITS', {}) or {})
+        config = self.config
+        now = time.time()
+        keys = []
+        for name in providers:
+            keys += [f"{self._key(name)}_opened_at", f"{self._key(name)}_probe"]
+            keys += [key for counter_keys in self._bucket_keys(name, now, config).values() for key in counter_keys]
+        cache.delete_many(keys)
+
+
+provider_breakers = CircuitBreakerRegistry()
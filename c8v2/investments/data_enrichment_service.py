@@ -1,9 +1,11 @@
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from decimal import Decimal
 from .models import Investment
 from .perplexity_service import PerplexityAPIService, perplexity_rate_limiter
-from .bharatsm_service import FinalOptimizedBharatSMService, final_bharatsm_service, get_bharatsm_frontend_data, get_bharatsm_basic_info
+from .bharatsm_service import FinalOptimizedBharatSMService, FMPAPIService, final_bharatsm_service, get_bharatsm_frontend_data, get_bharatsm_basic_info
+from .rate_limits import provider_limits
+from .symbol_master import symbol_registry
 import time
 
 logger = logging.getLogger(__name__)
@@ -367,9 +369,119 @@ class DataEnrichmentService:
         
         return suggestions
     
+    @classmethod
+    def fetch_market_data(cls, symbol: str, asset_type: str) -> Dict:
+        """Fetch market data for a single symbol without touching the database.
+        
+        Safe to call from worker threads; provider calls are throttled through
+        the shared per-provider limiters instead of fixed sleeps.
+        """
+        return cls.fetch_market_data_with_source(symbol, asset_type)[0]
+    
+    @classmethod
+    def fetch_market_data_with_source(cls, symbol: str, asset_type: str) -> Tuple[Dict, str]:
+        """Provider dispatch shared by every per-symbol fetch: (data, provider name), ({}, '') on failure"""
+        if asset_type in ['stock', 'etf']:
+            if final_bharatsm_service:
+                data = get_bharatsm_frontend_data(symbol)
+                if data:
+                    return data, 'bharatsm'
+            
+            logger.warning(f"BharatSM failed for {symbol}, using Perplexity fallback")
+            with provider_limits.throttle('perplexity'):
+                data = PerplexityAPIService.get_fallback_data(symbol)
+            return (data, 'perplexity') if data else ({}, '')
+        
+        elif asset_type == 'crypto':
+            with provider_limits.throttle('perplexity'):
+                data = PerplexityAPIService.get_fallback_data(symbol)
+            return (data, 'perplexity') if data else ({}, '')
+        
+        elif asset_type == 'bond':
+            with provider_limits.throttle('perplexity'):
+                data = PerplexityAPIService.get_bond_data(symbol)
+            return (data, 'perplexity') if data else ({}, '')
+        
+        return {}, ''
+    
+    @classmethod
+    def prefetch_market_data(cls, keys) -> Dict:
+        """Fetch US stocks/ETFs and crypto through FMP batch quotes.
+        
+        Returns {(symbol, asset_type): data} for the keys FMP answered; the
+        refresh engine fetches everything else symbol by symbol.
+        """
+        if not FMPAPIService.is_available():
+            return {}
+        
+        stock_keys, crypto_keys = {}, {}
+        for symbol, asset_type in keys:
+            if asset_type == 'crypto':
+                crypto_keys.setdefault(symbol, []).append((symbol, asset_type))
+            elif asset_type in ['stock', 'etf'] and cls._get_route(symbol) == 'us_stock':
+                stock_keys.setdefault(symbol, []).append((symbol, asset_type))
+        
+        results = {}
+        for symbol_keys, batch in [
+            (stock_keys, FMPAPIService.get_stock_data_batch(list(stock_keys)) if stock_keys else {}),
+            (crypto_keys, FMPAPIService.get_crypto_data_batch(list(crypto_keys)) if crypto_keys else {}),
+        ]:
+            for symbol, data in batch.items():
+                if data.get('current_price'):
+                    for key in symbol_keys.get(symbol, []):
+                        results[key] = data
+        
+        logger.info(f"FMP batch quotes answered {len(results)} of {len(stock_keys) + len(crypto_keys)} symbols")
+        return results
+    
+    @classmethod
+    def _get_route(cls, symbol: str) -> Optional[str]:
+        """Provider route for a stock symbol (symbol master first, then heuristics)"""
+        if final_bharatsm_service:
+            return final_bharatsm_service._determine_asset_type(symbol)
+        return symbol_registry.route(symbol)
+    
+    @classmethod
+    def apply_market_data(cls, investment: Investment, data: Dict) -> bool:
+        """Copy fetched market data onto an investment in memory (no save)"""
+        if not data:
+            return False
+        
+        if data.get('volume'):
+            investment.volume = data['volume']
+        
+        decimal_fields = {
+            'market_cap': 'market_cap',
+            'pe_ratio': 'pe_ratio',
+            'growth_rate': 'growth_rate',
+            'current_price': 'current_price',
+            'daily_change_percent': 'daily_change_percent',
+            'all_time_high': 'fifty_two_week_high',
+            'all_time_low': 'fifty_two_week_low',
+        }
+        for source_field, model_field in decimal_fields.items():
+            if data.get(source_field):
+                setattr(investment, model_field, Decimal(str(data[source_field])))
+        
+        if data.get('sector'):
+            investment.sector = data['sector']
+        
+        # Update investment name if not provided or is just the symbol
+        if data.get('company_name'):
+            if not investment.name or investment.name == investment.symbol:
+                investment.name = data['company_name']
+        
+        return True
+    
     @classmethod
     def refresh_investment_prices(cls, user=None, asset_types=None) -> list:
-        """Refresh prices for multiple investments"""
+        """Refresh prices for multiple investments.
+        
+        Each unique symbol is fetched once on a bounded thread pool and all rows
+        are written back with a single bulk_update.
+        """
+        from .refresh_engine import PriceRefreshEngine
+        
         queryset = Investment.objects.all()
         
         if user:
@@ -381,18 +493,12 @@ class DataEnrichmentService:
         # Only refresh tradeable assets
         queryset = queryset.filter(asset_type__in=['stock', 'etf', 'crypto', 'bond'])
         
-        updated_investments = []
-        
-        for investment in queryset:
-            try:
-                if cls.enrich_investment_data(investment.id):
-                    updated_investments.append(investment)
-                    
-                # Add small delay to respect rate limits
-                time.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Failed to refresh price for investment {investment.id}: {e}")
+        engine = PriceRefreshEngine(
+            fetch=cls.fetch_market_data,
+            apply=cls.apply_market_data,
+            prefetch=cls.prefetch_market_data
+        )
+        updated_investments = engine.refresh(queryset)
         
         logger.info(f"Refreshed prices for {len(updated_investments)} investments")
         return updated_investments
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from investments.alert_index import AlertThresholdIndex
+
+
+ALERT_TYPES = np.array(['above', 'below', 'change_percent'])
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-memory alert threshold index against a full scan on synthetic alerts (no database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=1_000_000, help='Synthetic alerts to index')
+        parser.add_argument('--symbols', type=int, default=5_000, help='Distinct symbols they are spread over')
+        parser.add_argument('--ticks', type=int, default=100_000, help='Price updates to resolve')
+        parser.add_argument('--verify', type=int, default=200, help='Ticks cross-checked against a full scan')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        n_alerts, n_symbols, n_ticks = options['alerts'], options['symbols'], options['ticks']
+
+        # Alerts: a random symbol and type each; price thresholds within 20% of the symbol's price
+        symbols = np.array([f'SYM{i:05d}' for i in range(n_symbols)])
+        base_price = rng.uniform(10, 1000, n_symbols)
+        alert_symbol = rng.integers(0, n_symbols, n_alerts)
+        alert_type = rng.integers(0, 3, n_alerts)
+        offset = rng.uniform(0, 0.2, n_alerts)
+        threshold = np.select(
+            [alert_type == 0, alert_type == 1],
+            [base_price[alert_symbol] * (1 + offset), base_price[alert_symbol] * (1 - offset)],
+            default=rng.uniform(0.5, 10, n_alerts),
+        ).round(4)
+
+        index = AlertThresholdIndex()
+        started = time.perf_counter()
+        index.build(zip(
+            range(n_alerts), symbols[alert_symbol].tolist(), ALERT_TYPES[alert_type].tolist(), threshold.tolist()
+        ))
+        build_seconds = time.perf_counter() - started
+
+        # Ticks: a random symbol moving by a few percent
+        tick_symbol = rng.integers(0, n_symbols, n_ticks)
+        tick_price = base_price[tick_symbol] * (1 + rng.normal(0, 0.05, n_ticks))
+        tick_change = rng.normal(0, 3, n_ticks)
+        tick_names = symbols[tick_symbol].tolist()
+
+        latencies = np.empty(n_ticks)
+        triggered = 0
+        for i, (symbol, price, change) in enumerate(zip(tick_names, tick_price.tolist(), tick_change.tolist())):
+            started = time.perf_counter()
+            triggered += len(index.resolve(symbol, price, change))
+            latencies[i] = time.perf_counter() - started
+
+        # Baseline: vectorised scan of every alert per tick, and a correctness check against it
+        n_verify = min(options['verify'], n_ticks)
+        scan_seconds = 0.0
+        for i in range(n_verify):
+            started = time.perf_counter()
+            same_symbol = alert_symbol == tick_symbol[i]
+            crossed = np.select(
+                [alert_type == 0, alert_type == 1],
+                [threshold <= tick_price[i], threshold >= tick_price[i]],
+                default=threshold <= abs(tick_change[i]),
+            )
+            expected = set(np.flatnonzero(same_symbol & crossed).tolist())
+            scan_seconds += time.perf_counter() - started
+            if set(index.resolve(tick_names[i], tick_price[i], tick_change[i])) != expected:
+                self.stderr.write(self.style.ERROR(f'Index and scan disagree on tick {i} ({tick_names[i]})'))
+                return
+
+        self.stdout.write(f'Indexed {len(index)} alerts over {n_symbols} symbols in {build_seconds:.2f}s')
+        self.stdout.write(
+            f'{n_ticks} ticks resolved in {latencies.sum():.2f}s, {triggered} alerts triggered '
+            f'(mean {latencies.mean() * 1e6:.1f}us, p50 {np.percentile(latencies, 50) * 1e6:.1f}us, '
+            f'p99 {np.percentile(latencies, 99) * 1e6:.1f}us per tick)'
+        )
+        self.stdout.write(
+            f'Full scan baseline: {scan_seconds / max(n_verify, 1) * 1e3:.2f}ms per tick '
+            f'over {n_verify} ticks'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Index matched the full scan on {n_verify} ticks'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from investments.models import SymbolMaster
+from investments.symbol_master import build_symbol_master_rows, read_symbol_dump, symbol_registry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Bulk load the symbol master table from a local CSV or JSON dump'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .csv or .json symbol dump')
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Deactivate symbols that are not present in the dump',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+
+        try:
+            rows = build_symbol_master_rows(read_symbol_dump(path))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read symbol dump {path}: {e}')
+
+        with transaction.atomic():
+            SymbolMaster.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['symbol'],
+                update_fields=[
+                    'name', 'exchange', 'country', 'asset_class',
+                    'route', 'provider_ids', 'is_active', 'updated_at',
+                ],
+                batch_size=1000
+            )
+            deactivated = 0
+            if options['replace']:
+                deactivated = SymbolMaster.objects.exclude(
+                    symbol__in=[row.symbol for row in rows]
+                ).update(is_active=False)
+
+        loaded = symbol_registry.reload()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Loaded {len(rows)} symbols ({deactivated} deactivated), {loaded} active in registry'
+            )
+        )
@@ -0,0 +1,241 @@
+"""
+Exchange trading calendars.
+
+Regular session hours, time zones and a bundled holiday table for the
+exchanges holdings trade on (NSE, BSE, NYSE, NASDAQ) plus 24/7 crypto, so
+refresh cadences follow the markets without any network lookup. Celery beat
+uses them through MarketSessionSchedule (market_schedule.py): frequent ticks
+while a session is open, one settle run shortly after the close and nothing
+on weekends and holidays.
+
+The holiday table covers the years in HOLIDAY_YEARS and is extended from the
+exchanges' holiday circulars once a year; days of a year it does not cover
+are treated as open on weekdays, and a warning is logged.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .symbol_master import INDIAN_SUFFIXES, normalize_symbol, symbol_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _dates(*days: str) -> FrozenSet[date]:
+    return frozenset(date.fromisoformat(day) for day in days)
+
+
+HOLIDAY_YEARS = frozenset({2025, 2026})
+
+# Trading holidays shared by NSE and BSE
+INDIA_HOLIDAYS = _dates(
+    '2025-02-26', '2025-03-14', '2025-03-31', '2025-04-10', '2025-04-14', '2025-04-18', '2025-05-01',
+    '2025-08-15', '2025-08-27', '2025-10-02', '2025-10-21', '2025-10-22', '2025-11-05', '2025-12-25',
+    '2026-01-15', '2026-01-26', '2026-03-03', '2026-03-26', '2026-03-31', '2026-04-03', '2026-04-14',
+    '2026-05-01', '2026-05-28', '2026-06-26', '2026-09-14', '2026-10-02', '2026-10-20', '2026-11-10',
+    '2026-11-24', '2026-12-25',
+)
+
+# Full-day closures shared by NYSE and NASDAQ
+US_HOLIDAYS = _dates(
+    '2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26', '2025-06-19',
+    '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25',
+    '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25', '2026-06-19', '2026-07-03',
+    '2026-09-07', '2026-11-26', '2026-12-25',
+)
+
+# US sessions that close at 13:00 New York time
+US_EARLY_CLOSES = MappingProxyType({
+    day: time(13, 0) for day in _dates('2025-07-03', '2025-11-28', '2025-12-24', '2026-11-27', '2026-12-24')
+})
+
+
+class ExchangeCalendar(NamedTuple):
+    """Regular session of an exchange in its local time zone"""
+    code: str
+    tz: str
+    open: Optional[time]  # None for markets that never close
+    close: Optional[time]
+    holidays: FrozenSet[date] = frozenset()
+    early_closes: Mapping[date, time] = MappingProxyType({})
+
+    @property
+    def always_open(self) -> bool:
+        return self.open is None
+
+    @property
+    def zone(self) -> ZoneInfo:
+        return ZoneInfo(self.tz)
+
+    def is_trading_day(self, day: date) -> bool:
+        if self.always_open:
+            return True
+        if day.weekday() >= 5:
+            return False
+        if day.year not in HOLIDAY_YEARS:
+            _warn_uncovered(day.year)
+        return day not in self.holidays
+
+    def session(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        """(open, close) of the session on a local day as aware datetimes; None when closed"""
+        zone = self.zone
+        if self.always_open:
+            return datetime.combine(day, time.min, zone), datetime.combine(day + timedelta(days=1), time.min, zone)
+        if not self.is_trading_day(day):
+            return None
+        close = self.early_closes.get(day, self.close)
+        return datetime.combine(day, self.open, zone), datetime.combine(day, close, zone)
+
+    def is_open(self, at: datetime) -> bool:
+        if self.always_open:
+            return True
+        session = self.session(at.astimezone(self.zone).date())
+        return session is not None and session[0] <= at < session[1]
+
+    def next_session(self, at: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """The first session that has not closed at ``at`` (the running one while open)"""
+        today = at.astimezone(self.zone).date()
+        for offset in range(MAX_SCAN_DAYS):
+            session = self.session(today + timedelta(days=offset))
+            if session is not None and session[1] > at:
+                return session
+        return None
+
+    def last_close(self, at: datetime) -> Optional[datetime]:
+        """The most recent close at or before ``at``"""
+        today = at.astimezone(self.zone).date()
+        for offset in range(MAX_SCAN_DAYS):
+            session = self.session(today - timedelta(days=offset))
+            if session is not None and session[1] <= at:
+                return session[1]
+        return None
+
+
+MAX_SCAN_DAYS = 14  # longer than any run of weekends and holidays
+
+CALENDARS = {
+    'NSE': ExchangeCalendar('NSE', 'Asia/Kolkata', time(9, 15), time(15, 30), INDIA_HOLIDAYS),
+    'BSE': ExchangeCalendar('BSE', 'Asia/Kolkata', time(9, 15), time(15, 30), INDIA_HOLIDAYS),
+    'NYSE': ExchangeCalendar('NYSE', 'America/New_York', time(9, 30), time(16, 0), US_HOLIDAYS, US_EARLY_CLOSES),
+    'NASDAQ': ExchangeCalendar('NASDAQ', 'America/New_York', time(9, 30), time(16, 0), US_HOLIDAYS, US_EARLY_CLOSES),
+    'CRYPTO': ExchangeCalendar('CRYPTO', 'UTC', None, None),
+}
+
+# Exchange names and provider codes (yfinance, Finnhub, ...) -> calendar
+EXCHANGE_ALIASES = {
+    'NSE': 'NSE', 'NSI': 'NSE', 'NSE_EQ': 'NSE',
+    'BSE': 'BSE', 'BOM': 'BSE', 'BO': 'BSE',
+    'NYSE': 'NYSE', 'NYQ': 'NYSE', 'NYSEARCA': 'NYSE', 'PCX': 'NYSE', 'ASE': 'NYSE', 'AMEX': 'NYSE',
+    'NASDAQ': 'NASDAQ', 'NMS': 'NASDAQ', 'NGM': 'NASDAQ', 'NCM': 'NASDAQ', 'NASDAQGS': 'NASDAQ',
+    'CRYPTO': 'CRYPTO', 'CCC': 'CRYPTO',
+}
+
+ROUTE_EXCHANGES = {'indian_stock': 'NSE', 'us_stock': 'NYSE', 'crypto': 'CRYPTO'}
+
+# Asset types with intraday market prices
+INTRADAY_ASSET_TYPES = ('stock', 'etf', 'crypto')
+
+_warned_years = set()
+
+
+def _warn_uncovered(year: int):
+    if year not in _warned_years:
+        _warned_years.add(year)
+        logger.warning(f"No bundled exchange holidays for {year}; treating every weekday as a trading day")
+
+
+def get_calendar(code: str) -> ExchangeCalendar:
+    """Calendar for an exchange name or provider code"""
+    code = (code or '').strip().upper()
+    try:
+        return CALENDARS[EXCHANGE_ALIASES.get(code, code)]
+    except KeyError:
+        raise ValueError(f"Unknown exchange calendar: {code}")
+
+
+def exchange_for(symbol: str, asset_type: str = 'stock', exchange: str = '') -> Optional[str]:
+    """Calendar a holding trades on; None for assets without intraday prices"""
+    if asset_type == 'crypto':
+        return 'CRYPTO'
+    symbol = normalize_symbol(symbol)
+    if asset_type not in INTRADAY_ASSET_TYPES or not symbol:
+        return None
+
+    _, dot, suffix = symbol.rpartition('.')
+    if dot and f'.{suffix}' in INDIAN_SUFFIXES:
+        return INDIAN_SUFFIXES[f'.{suffix}']
+    code = EXCHANGE_ALIASES.get((exchange or '').strip().upper())
+    if code:
+        return code
+    entry = symbol_registry.lookup(symbol)
+    if entry is not None:
+        return EXCHANGE_ALIASES.get(entry.exchange.upper()) or ROUTE_EXCHANGES.get(entry.route, 'NYSE')
+    return 'NYSE'
+
+
+def held_symbols_by_exchange() -> Dict[str, List[str]]:
+    """Distinct held symbols with intraday prices, grouped by calendar code"""
+    from .models import Investment
+
+    rows = Investment.objects.filter(asset_type__in=INTRADAY_ASSET_TYPES).exclude(symbol='').order_by().values_list(
+        'symbol', 'asset_type', 'exchange'
+    ).distinct()
+    grouped = {}
+    for symbol, asset_type, exchange in rows:
+        code = exchange_for(symbol, asset_type, exchange)
+        if code is not None:
+            grouped.setdefault(code, set()).add(symbol)
+    return {code: sorted(symbols) for code, symbols in grouped.items()}
+
+
+def symbols_on_exchange(code: str) -> List[str]:
+    """Distinct held symbols that trade on an exchange's calendar"""
+    return held_symbols_by_exchange().get(get_calendar(code).code, [])
+
+
+def symbols_on_open_exchanges(at: datetime) -> List[str]:
+    """Distinct held symbols whose exchange is in session at ``at``"""
+    return sorted({
+        symbol
+        for code, symbols in held_symbols_by_exchange().items() if CALENDARS[code].is_open(at)
+        for symbol in symbols
+    })
+
+
+def refresh_due(calendar: ExchangeCalendar, last_run_at: datetime, now: datetime,
+                interval: Optional[timedelta] = None,
+                settle_delay: Optional[timedelta] = None) -> Tuple[bool, float]:
+    """(is due, seconds until the next check) of a refresh paced by an exchange.
+
+    Due every ``interval`` while a session is open and once ``settle_delay``
+    after each close (either may be None to turn it off); never in between.
+    """
+    if interval is not None and calendar.is_open(now):
+        remaining = (last_run_at + interval - now).total_seconds()
+        if remaining <= 0:
+            return True, interval.total_seconds()
+        return False, remaining
+
+    upcoming = []
+    if settle_delay is not None and not calendar.always_open:
+        close = calendar.last_close(now)
+        if close is not None:
+            settle_at = close + settle_delay
+            if last_run_at < settle_at <= now:
+                return True, refresh_due(calendar, now, now, interval, settle_delay)[1]
+            if settle_at > now:
+                upcoming.append(settle_at)
+
+    session = calendar.next_session(now)
+    if session is not None:
+        opens, closes = session
+        if interval is not None and opens > now:
+            upcoming.append(opens)
+        if settle_delay is not None and not calendar.always_open:
+            upcoming.append(closes + settle_delay)
+
+    if not upcoming:
+        return False, 60.0 * 60.0
+    return False, max(1.0, min((moment - now).total_seconds() for moment in upcoming))
@@ -0,0 +1,63 @@
+"""
+Celery beat schedule paced by an exchange's trading calendar.
+
+A MarketSessionSchedule entry is due every refresh interval while its
+exchange is open and once a settle delay after each close, and sleeps through
+nights, weekends and holidays (see market_calendar.py). Intervals are read
+from settings when beat checks the entry, so they can be tuned per deploy.
+"""
+
+from datetime import timedelta
+from typing import Optional
+from celery.schedules import schedstate, schedule
+from django.conf import settings
+from .market_calendar import get_calendar, refresh_due
+
+
+class MarketSessionSchedule(schedule):
+    """Frequent runs during an exchange's sessions plus one settle run after each close"""
+
+    DEFAULT_INTERVAL = 60  # seconds
+    DEFAULT_SETTLE_DELAY = 15  # minutes after the close
+
+    def __init__(self, exchange: str, intraday: bool = True, settle: bool = True,
+                 interval_setting: str = 'MARKET_SESSION_REFRESH_INTERVAL', app=None):
+        self.exchange = get_calendar(exchange).code
+        self.intraday = intraday
+        self.settle = settle
+        self.interval_setting = interval_setting
+        super().__init__(run_every=timedelta(seconds=self.DEFAULT_INTERVAL), app=app)
+
+    @property
+    def interval(self) -> Optional[timedelta]:
+        if not self.intraday:
+            return None
+        return timedelta(seconds=getattr(settings, self.interval_setting, self.DEFAULT_INTERVAL))
+
+    @property
+    def settle_delay(self) -> Optional[timedelta]:
+        if not self.settle:
+            return None
+        return timedelta(minutes=getattr(settings, 'MARKET_SETTLE_DELAY_MINUTES', self.DEFAULT_SETTLE_DELAY))
+
+    def is_due(self, last_run_at):
+        due, wait = refresh_due(
+            get_calendar(self.exchange), self.maybe_make_aware(last_run_at), self.now(),
+            self.interval, self.settle_delay,
+        )
+        return schedstate(due, wait)
+
+    def __repr__(self):
+        return f'<market session {self.exchange}: intraday={self.intraday} settle={self.settle}>'
+
+    def __reduce__(self):
+        return self.__class__, (self.exchange, self.intraday, self.settle, self.interval_setting)
+
+    def __eq__(self, other):
+        if isinstance(other, MarketSessionSchedule):
+            return self.__reduce__() == other.__reduce__()
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
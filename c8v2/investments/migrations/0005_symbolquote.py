@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0004_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('asset_type', models.CharField(choices=[('stock', 'Stock'), ('etf', 'ETF'), ('mutual_fund', 'Mutual Fund'), ('crypto', 'Cryptocurrency'), ('bond', 'Bond'), ('gold', 'Gold'), ('silver', 'Silver'), ('commodity', 'Commodity')], max_length=20)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('source', models.CharField(blank=True, max_length=20)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['symbol'],
+                'unique_together': {('symbol', 'asset_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0005_symbolquote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolMaster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=30, unique=True)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('exchange', models.CharField(blank=True, max_length=20)),
+                ('country', models.CharField(blank=True, max_length=2)),
+                ('asset_class', models.CharField(choices=[('stock', 'Stock'), ('etf', 'ETF'), ('mutual_fund', 'Mutual Fund'), ('crypto', 'Cryptocurrency'), ('bond', 'Bond'), ('gold', 'Gold'), ('silver', 'Silver'), ('commodity', 'Commodity')], default='stock', max_length=20)),
+                ('route', models.CharField(choices=[('indian_stock', 'Indian Stock'), ('us_stock', 'US Stock'), ('crypto', 'Cryptocurrency')], max_length=20)),
+                ('provider_ids', models.JSONField(blank=True, default=dict)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['symbol'],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+EXCHANGE_SUFFIXES = {'.NS': 'NSE', '.NSE': 'NSE', '.BO': 'BSE', '.BSE': 'BSE'}
+
+
+def copy_chart_data(apps, schema_editor):
+    """Fold per-investment ChartData into one series per symbol"""
+    ChartData = apps.get_model('investments', 'ChartData')
+    PriceHistory = apps.get_model('investments', 'PriceHistory')
+
+    seen = set()
+    bars = []
+    rows = ChartData.objects.order_by('-created_at').values_list(
+        'investment__symbol', 'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'timestamp'
+    ).iterator()
+    for symbol, date, open_price, high_price, low_price, close_price, volume, timestamp in rows:
+        symbol = (symbol or '').strip().upper()
+        _, dot, suffix = symbol.rpartition('.')
+        exchange = EXCHANGE_SUFFIXES.get(f'.{suffix}', '') if dot else ''
+        ts = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        # Newest copy of a bar wins when several holdings stored the same one
+        if not symbol or (symbol, ts) in seen:
+            continue
+        seen.add((symbol, ts))
+        bars.append(PriceHistory(
+            symbol=symbol, exchange=exchange, interval='1d', ts=ts, date=date,
+            open=float(open_price), high=float(high_price), low=float(low_price), close=float(close_price),
+            volume=volume,
+        ))
+    PriceHistory.objects.bulk_create(bars, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0006_symbolmaster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=30)),
+                ('exchange', models.CharField(blank=True, max_length=20)),
+                ('interval', models.CharField(choices=[('1d', 'Daily')], default='1d', max_length=5)),
+                ('ts', models.DateTimeField()),
+                ('date', models.DateField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['ts'],
+                'indexes': [models.Index(fields=['symbol', 'exchange', 'interval', 'date'], name='pricehistory_series_idx')],
+                'unique_together': {('symbol', 'exchange', 'interval', 'ts')},
+            },
+        ),
+        migrations.RunPython(copy_chart_data, migrations.RunPython.noop),
+    ]
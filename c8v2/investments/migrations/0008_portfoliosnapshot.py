@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Snapshots are built from the holdings on a user's first read or write
+
+    dependencies = [
+        ('investments', '0007_pricehistory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('investment_count', models.PositiveIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_gain_loss', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('daily_change', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('buckets', models.JSONField(blank=True, default=dict)),
+                ('sector_count', models.PositiveIntegerField(default=0)),
+                ('large_positions', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_snapshot', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_price_updated_at(apps, schema_editor):
+    # Holdings with a market price start out as recently ticked as they were last written
+    Investment = apps.get_model('investments', 'Investment')
+    Investment.objects.filter(current_price__gt=0).update(price_updated_at=F('last_updated'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0009_portfoliovaluehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investment',
+            name='price_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(seed_price_updated_at, migrations.RunPython.noop),
+    ]
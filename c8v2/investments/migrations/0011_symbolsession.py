@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0010_investment_price_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=30, unique=True)),
+                ('session_date', models.DateField()),
+                ('previous_close', models.DecimalField(decimal_places=4, max_digits=15)),
+                ('open', models.DecimalField(blank=True, decimal_places=4, max_digits=15, null=True)),
+                ('high', models.DecimalField(blank=True, decimal_places=4, max_digits=15, null=True)),
+                ('low', models.DecimalField(blank=True, decimal_places=4, max_digits=15, null=True)),
+                ('captured_on', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['symbol'],
+            },
+        ),
+    ]
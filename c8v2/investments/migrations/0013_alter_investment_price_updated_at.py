@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0012_portfoliosnapshot_statistics_stale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='investment',
+            name='price_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 import json
@@ -81,6 +81,9 @@ class Investment(models.Model):
     # Chart Data (stored as JSON)
     chart_data = models.JSONField(default=list, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
+    # When the market price last moved (last_updated also moves on edits); informational, so
+    # not indexed: every tick writes it
+    price_updated_at = models.DateTimeField(blank=True, null=True)
     
     # AI Insights
     ai_analysis = models.TextField(blank=True, null=True)
@@ -103,6 +106,13 @@ class Investment(models.Model):
 
     objects = InvestmentManager()
 
+    # Fields a holding's contribution to its owner's PortfolioSnapshot is derived from: the
+    # summed fields first, then the further inputs of the snapshot's order statistics
+    SNAPSHOT_FIELDS = (
+        'user_id', 'asset_type', 'quantity', 'daily_change', 'total_value', 'total_gain_loss', 'risk_level',
+        'symbol', 'name', 'sector', 'total_gain_loss_percent', 'created_at',
+    )
+
     class Meta:
         unique_together = [['user', 'symbol', 'asset_type']]  # Allow same symbol for different asset types
         ordering = ['-created_at']
@@ -148,38 +158,100 @@ class Investment(models.Model):
             return f"{self.user.username} - {self.symbol} ({self.quantity} {self.get_display_unit()})"
         return f"{self.user.username} - {self.name} ({self.quantity} {self.get_display_unit()})"
 
-    def save(self, *args, **kwargs):
-        # Calculate derived fields
+    def calculate_derived_fields(self):
+        """Recalculate total value and gain/loss from quantity and prices"""
         self.total_value = self.quantity * self.current_price
         total_cost = self.quantity * self.average_purchase_price
         self.total_gain_loss = self.total_value - total_cost
-        
+
         if total_cost > 0:
             self.total_gain_loss_percent = (self.total_gain_loss / total_cost) * 100
-        
-        super().save(*args, **kwargs)
+
+    def snapshot_state(self):
+        """Values this holding contributes to its owner's PortfolioSnapshot from"""
+        return tuple(getattr(self, field) for field in self.SNAPSHOT_FIELDS)
+
+    def save(self, *args, **kwargs):
+        from .portfolio_snapshot import PortfolioSnapshotService
+
+        # Calculate derived fields
+        self.calculate_derived_fields()
+
+        created = self._state.adding
+        with transaction.atomic():
+            if not created:
+                PortfolioSnapshotService.lock_previous([self])
+            super().save(*args, **kwargs)
+
+            # Apply the change to the owner's running totals
+            PortfolioSnapshotService.apply_saved([self], created=created)
         
         # Clear cache when investment is updated
         self._clear_user_cache()
     
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
+        from .portfolio_snapshot import PortfolioSnapshotService
+
+        with transaction.atomic():
+            PortfolioSnapshotService.lock_previous([self])
+            super().delete(*args, **kwargs)
+            PortfolioSnapshotService.apply_deleted([self])
         # Clear cache when investment is deleted
         self._clear_user_cache()
     
     def _clear_user_cache(self):
-        """Clear cached data for the user"""
-        from django.core.cache import cache
-        cache_keys = [
-            f"portfolio_summary_{self.user.id}",
-            f"portfolio_insights_{self.user.id}",
-            f"asset_type_performance_{self.user.id}",
-        ]
-        cache.delete_many(cache_keys)
+        """Invalidate cached data for the user after the transaction commits"""
+        from .services import CacheService
+        CacheService.invalidate_user_cache(self.user_id)
+
+
+class PortfolioSnapshot(models.Model):
+    """Running portfolio totals for a user, maintained by deltas as holdings change"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='portfolio_snapshot')
+    investment_count = models.PositiveIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_gain_loss = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    daily_change = models.DecimalField(max_digits=24, decimal_places=8, default=0)  # sum of daily change x quantity
+
+    # Per asset type: count, total_value, total_gain_loss, daily_change, risk_value (sums, as
+    # decimal strings) plus the newest holding's created_at and the best/worst holding
+    buckets = models.JSONField(default=dict, blank=True)
+
+    # Portfolio-wide order statistics, refreshed on the first read after a write
+    sector_count = models.PositiveIntegerField(default=0)  # distinct sectors among tradeable holdings
+    large_positions = models.PositiveIntegerField(default=0)  # holdings over 20% of the portfolio
+    statistics_stale = models.BooleanField(default=False)  # holdings changed since the statistics were read
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.investment_count} holdings, {self.total_value}"
+
+
+class PortfolioValueHistory(models.Model):
+    """End-of-day portfolio value for a user, one compact row per day"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='portfolio_value_history')
+    date = models.DateField()
+    total_value = models.DecimalField(max_digits=20, decimal_places=2)
+    total_cost = models.DecimalField(max_digits=20, decimal_places=2)
+    by_type = models.JSONField(default=dict, blank=True)  # {asset_type: value as a decimal string}
+
+    class Meta:
+        unique_together = [['user', 'date']]
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.user.username} @ {self.date}: {self.total_value}"
 
 
 class ChartData(models.Model):
-    """Separate model for storing historical chart data"""
+    """Deprecated per-holding chart bars, frozen since migration 0007.
+
+    Charts are served from PriceHistory (one series per symbol), which 0007
+    seeded from these rows; nothing writes here any more. The table is kept
+    read-only for rows that predate the migration until it is dropped.
+    """
     investment = models.ForeignKey(Investment, on_delete=models.CASCADE, related_name='historical_data')
     date = models.DateField()
     open_price = models.DecimalField(max_digits=15, decimal_places=4)
@@ -199,6 +271,34 @@ class ChartData(models.Model):
         return f"{self.investment.symbol} - {self.date}"
 
 
+class PriceHistory(models.Model):
+    """OHLCV bars stored once per symbol and shared by every holding of it"""
+    INTERVAL_CHOICES = [
+        ('1d', 'Daily'),
+    ]
+
+    symbol = models.CharField(max_length=30)
+    exchange = models.CharField(max_length=20, blank=True)  # NSE, BSE, NYSE, NASDAQ, ...
+    interval = models.CharField(max_length=5, choices=INTERVAL_CHOICES, default='1d')
+    ts = models.DateTimeField()  # Bar open time
+    date = models.DateField()  # Session date in exchange time
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = [['symbol', 'exchange', 'interval', 'ts']]
+        indexes = [
+            models.Index(fields=['symbol', 'exchange', 'interval', 'date'], name='pricehistory_series_idx'),
+        ]
+        ordering = ['ts']
+
+    def __str__(self):
+        return f"{self.symbol} {self.interval} @ {self.date}"
+
+
 class PriceAlert(models.Model):
     """Model for price alerts"""
     ALERT_TYPE_CHOICES = [
@@ -221,4 +321,65 @@ class PriceAlert(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} - {self.investment.symbol} {self.alert_type} {self.target_value}"
\ No newline at end of file
+        return f"{self.user.username} - {self.investment.symbol} {self.alert_type} {self.target_value}"
+
+
+class SymbolQuote(models.Model):
+    """Latest market data for a symbol, fetched once and shared by every holding of it"""
+    symbol = models.CharField(max_length=20)
+    asset_type = models.CharField(max_length=20, choices=Investment.ASSET_TYPE_CHOICES)
+    data = models.JSONField(default=dict, blank=True)  # Raw provider payload
+    source = models.CharField(max_length=20, blank=True)  # bharatsm, perplexity, ...
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [['symbol', 'asset_type']]
+        ordering = ['symbol']
+
+    def __str__(self):
+        return f"{self.symbol} ({self.asset_type}) @ {self.fetched_at}"
+
+
+class SymbolSession(models.Model):
+    """Previous close and current session open/high/low of a symbol, captured once per trading day"""
+    symbol = models.CharField(max_length=30, unique=True)
+    session_date = models.DateField()  # Date of the latest daily bar the state was taken from
+    previous_close = models.DecimalField(max_digits=15, decimal_places=4)
+    open = models.DecimalField(max_digits=15, decimal_places=4, blank=True, null=True)  # None before the open
+    high = models.DecimalField(max_digits=15, decimal_places=4, blank=True, null=True)
+    low = models.DecimalField(max_digits=15, decimal_places=4, blank=True, null=True)
+    captured_on = models.DateField()  # Refetched on the first refresh of a later day
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['symbol']
+
+    def __str__(self):
+        return f"{self.symbol} @ {self.session_date}: prev close {self.previous_close}"
+
+
+class SymbolMaster(models.Model):
+    """Reference data for a tradeable symbol and the provider chain it is routed to"""
+    ROUTE_CHOICES = [
+        ('indian_stock', 'Indian Stock'),
+        ('us_stock', 'US Stock'),
+        ('crypto', 'Cryptocurrency'),
+    ]
+
+    symbol = models.CharField(max_length=30, unique=True)
+    name = models.CharField(max_length=200, blank=True)
+    exchange = models.CharField(max_length=20, blank=True)  # NSE, BSE, NYSE, NASDAQ, ...
+    country = models.CharField(max_length=2, blank=True)  # ISO 3166-1 alpha-2
+    asset_class = models.CharField(max_length=20, choices=Investment.ASSET_TYPE_CHOICES, default='stock')
+    route = models.CharField(max_length=20, choices=ROUTE_CHOICES)
+    provider_ids = models.JSONField(default=dict, blank=True)  # e.g. {"moneycontrol": "RI", "finnhub": "RELI"}
+    is_active = models.BooleanField(default=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['symbol']
+
+    def __str__(self):
+        return f"{self.symbol} ({self.exchange or self.country}) -> {self.route}"
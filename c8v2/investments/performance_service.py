@@ -5,7 +5,10 @@ Performance optimization service for investments app
 from django.db import connection
 from django.core.cache import cache
 from django.db.models import Prefetch, Q, Count, Sum, Avg
+from .alert_engine import PriceAlertEngine
 from .models import Investment, ChartData, PriceAlert
+from .portfolio_snapshot import PortfolioSnapshotService
+from .services import CacheService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,7 +27,7 @@ class PerformanceService:
     @classmethod
     def get_optimized_user_investments(cls, user, asset_type=None):
         """Get user investments with optimized queries"""
-        cache_key = f"user_investments_{user.id}_{asset_type or 'all'}"
+        cache_key = CacheService.user_key(f"user_investments_{asset_type or 'all'}", user.id)
         cached_data = cache.get(cache_key)
         
         if cached_data:
@@ -39,11 +42,6 @@ class PerformanceService:
         
         # Prefetch related data efficiently
         queryset = queryset.prefetch_related(
-            Prefetch(
-                'historical_data',
-                queryset=ChartData.objects.order_by('-date')[:30],
-                to_attr='recent_chart_data'
-            ),
             Prefetch(
                 'alerts',
                 queryset=PriceAlert.objects.filter(is_active=True),
@@ -65,7 +63,7 @@ class PerformanceService:
     @classmethod
     def get_portfolio_stats_optimized(cls, user):
         """Get portfolio statistics with optimized database queries"""
-        cache_key = f"portfolio_stats_{user.id}"
+        cache_key = CacheService.user_key('portfolio_stats', user.id)
         cached_stats = cache.get(cache_key)
         
         if cached_stats:
@@ -110,8 +108,6 @@ class PerformanceService:
     @classmethod
     def bulk_update_prices(cls, price_updates):
         """Bulk update prices for better performance"""
-        from django.db import transaction
-        
         investments_to_update = []
         
         for update in price_updates:
@@ -133,35 +129,23 @@ class PerformanceService:
             except Investment.DoesNotExist:
                 continue
         
-        # Bulk update in a single transaction
-        with transaction.atomic():
-            Investment.objects.bulk_update(
-                investments_to_update,
-                ['current_price', 'total_value', 'total_gain_loss', 'total_gain_loss_percent'],
-                batch_size=100
-            )
+        # Bulk update in a single transaction, with one aggregated snapshot delta per user
+        PortfolioSnapshotService.bulk_update(
+            investments_to_update,
+            ['current_price', 'total_value', 'total_gain_loss', 'total_gain_loss_percent'],
+            batch_size=100
+        )
         
-        # Clear related caches
-        user_ids = {inv.user_id for inv in investments_to_update}
-        for user_id in user_ids:
-            cls.invalidate_user_cache(user_id)
+        # Clear related caches, one generation bump per user
+        CacheService.invalidate_users(inv.user_id for inv in investments_to_update)
+        PriceAlertEngine.evaluate_investments(inv.id for inv in investments_to_update)
         
         return len(investments_to_update)
     
     @classmethod
     def invalidate_user_cache(cls, user_id):
         """Invalidate all cache entries for a user"""
-        cache_patterns = [
-            f"portfolio_summary_{user_id}",
-            f"portfolio_stats_{user_id}",
-            f"user_investments_{user_id}_all",
-            f"user_investments_{user_id}_stock",
-            f"user_investments_{user_id}_crypto",
-            f"user_investments_{user_id}_gold",
-            f"user_investments_{user_id}_silver",
-        ]
-        
-        cache.delete_many(cache_patterns)
+        CacheService.invalidate_user_cache(user_id)
     
     @classmethod
     def get_database_stats(cls):
@@ -238,7 +222,10 @@ class PerformanceService:
     
     @classmethod
     def cleanup_old_chart_data(cls, days_to_keep=90):
-        """Clean up old chart data to maintain performance"""
+        """Clean up old rows of the legacy ChartData table.
+
+        Only drains bars that predate PriceHistory; the shared series is kept.
+        """
         from django.utils import timezone
         from datetime import timedelta
         
@@ -282,12 +269,7 @@ class QueryOptimizer:
     @staticmethod
     def optimize_investment_queryset(queryset):
         """Apply common optimizations to investment querysets"""
-        return queryset.select_related('user').prefetch_related(
-            Prefetch(
-                'historical_data',
-                queryset=ChartData.objects.order_by('-date')[:30]
-            )
-        )
+        return queryset.select_related('user')
     
     @staticmethod
     def get_fields_for_list_view():
@@ -2,6 +2,7 @@ import requests
 import json
 import logging
 from django.conf import settings
+from C8V2.http_client import http_clients
 from typing import Dict, Optional
 import time
 
@@ -318,7 +319,8 @@ class PerplexityAPIService:
         }
         
         try:
-            response = requests.post(
+            response = http_clients.post(
+                'perplexity',
                 f"{cls.BASE_URL}/chat/completions",
                 headers=headers,
                 json=payload,
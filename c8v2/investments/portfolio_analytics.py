@@ -0,0 +1,360 @@
+"""
+Portfolio analytics from per-asset-type aggregates.
+
+Every portfolio view -- totals, allocation, top/worst performers, per-type
+performance, diversification and risk -- is derived from a handful of
+per-asset-type columns (count, value, gain/loss, daily change, risk-weighted
+value, best/worst holding) plus two portfolio-wide facts (distinct sectors and
+oversized positions). For a user those come straight from the database with
+GROUP BY aggregates and window functions, so the rows transferred and the
+Python work stay constant however many holdings there are; the same columns
+are kept up to date in each user's PortfolioSnapshot row (see
+portfolio_snapshot.py), which is what the summary endpoints read. In-memory
+holdings (e.g. unsaved instances) are reduced to the same columns with NumPy.
+Money totals are kept as integer cents so they stay exact.
+"""
+
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Sequence
+import numpy as np
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Max, Q, Sum, Value, When, Window
+)
+from django.db.models.functions import FirstValue
+from .models import Investment
+
+LARGE_POSITION = Decimal('0.2')  # share of the portfolio that counts as an oversized position
+
+
+def _cents(value) -> int:
+    # Values are stored with 2 decimal places, so cents are exact integers
+    return int((value or 0) * 100)
+
+
+def _cents_to_decimal(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _performer(symbol, name, percent) -> Dict:
+    return {'symbol': symbol, 'name': name, 'total_gain_loss_percent': percent or Decimal('0')}
+
+
+def _stored_performer(performer) -> Dict:
+    # [symbol, name, percent] with the percent as a decimal string, as kept in PortfolioSnapshot.buckets
+    symbol, name, percent = performer
+    return _performer(symbol, name, Decimal(percent))
+
+
+class PortfolioAnalytics:
+    """Portfolio metrics computed from per-asset-type aggregates"""
+
+    FIELDS = (
+        'symbol', 'name', 'asset_type', 'sector', 'risk_level', 'quantity',
+        'daily_change', 'total_value', 'total_gain_loss', 'total_gain_loss_percent',
+    )
+    PERFORMER_FIELDS = ('symbol', 'name', 'total_gain_loss_percent')
+    RISK_SCORES = {'low': 1, 'medium': 2, 'high': 3}
+    TRADEABLE_TYPES = ('stock', 'etf', 'bond', 'crypto', 'mutual_fund')
+    PHYSICAL_TYPES = ('gold', 'silver', 'commodity')
+
+    def __init__(self, types: Sequence[str], counts, value_cents, gain_cents, daily_change, risk_value,
+                 best: List[Dict], worst: List[Dict], sector_count: int, large_positions: int,
+                 worst_performers: Callable[[int], List[Dict]]):
+        self.types = list(types)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.value_cents = np.asarray(value_cents, dtype=np.int64)
+        self.gain_cents = np.asarray(gain_cents, dtype=np.int64)
+        self.daily_change = [Decimal(d or 0) for d in daily_change]
+        self.risk_value = np.asarray(risk_value, dtype=float)  # sum of risk score x value, in cents
+        self.best = best
+        self.worst = worst
+        self.sector_count = sector_count
+        self.large_positions = large_positions
+        self._worst_performers = worst_performers
+
+        self.count = int(self.counts.sum())
+        self.total_value_cents = int(self.value_cents.sum())
+        self.type_array = np.array(self.types, dtype=object)
+
+    @classmethod
+    def sums_by_type(cls, queryset):
+        """Per (user, asset type) count, value, gain/loss, daily change, risk-weighted value and newest holding"""
+        risk_score = Case(
+            *[When(risk_level=level, then=Value(score)) for level, score in cls.RISK_SCORES.items()],
+            default=Value(2), output_field=IntegerField()
+        )
+        return queryset.order_by().values('user_id', 'asset_type').annotate(
+            count=Count('id'),
+            value_sum=Sum('total_value'),
+            gain_sum=Sum('total_gain_loss'),
+            daily_change_sum=Sum(F('daily_change') * F('quantity')),
+            risk_sum=Sum(ExpressionWrapper(
+                risk_score * F('total_value'), output_field=DecimalField(max_digits=20, decimal_places=2)
+            )),
+            latest=Max('created_at'),
+        )
+
+    @staticmethod
+    def performers_by_type(queryset):
+        """Best and worst holding per (user, asset type), one row each:
+        (user_id, asset_type, best symbol, name, percent, worst symbol, name, percent, newest created_at)"""
+        def first(field, order_by):
+            return Window(FirstValue(field), partition_by=[F('user_id'), F('asset_type')],
+                          order_by=[order_by, F('created_at').desc()])
+
+        best_order = F('total_gain_loss_percent').desc()
+        worst_order = F('total_gain_loss_percent').asc()
+        return queryset.order_by().annotate(
+            best_symbol=first('symbol', best_order),
+            best_name=first('name', best_order),
+            best_percent=first('total_gain_loss_percent', best_order),
+            worst_symbol=first('symbol', worst_order),
+            worst_name=first('name', worst_order),
+            worst_percent=first('total_gain_loss_percent', worst_order),
+            latest=Window(Max('created_at'), partition_by=[F('user_id'), F('asset_type')]),
+        ).values_list(
+            'user_id', 'asset_type', 'best_symbol', 'best_name', 'best_percent',
+            'worst_symbol', 'worst_name', 'worst_percent', 'latest'
+        ).distinct()
+
+    @classmethod
+    def worst_performers_query(cls, queryset, limit: int) -> List[Dict]:
+        """Holdings with the lowest gain/loss percent, worst first"""
+        holdings = queryset.only(*cls.PERFORMER_FIELDS).order_by('total_gain_loss_percent', '-created_at')[:limit]
+        return [_performer(h.symbol, h.name, h.total_gain_loss_percent) for h in holdings]
+
+    @classmethod
+    def for_user(cls, user) -> 'PortfolioAnalytics':
+        """Aggregate a user's holdings in the database (three constant-size queries)"""
+        queryset = Investment.objects.filter(user=user).order_by()
+
+        # Types in the order their newest holding appears (default ordering is newest first)
+        by_type = list(cls.sums_by_type(queryset).order_by('-latest'))
+        performers = {row[1]: row[2:] for row in cls.performers_by_type(queryset)}
+
+        total_value = sum((row['value_sum'] or Decimal('0')) for row in by_type)
+        facts = queryset.aggregate(
+            sector_count=Count(
+                'sector', distinct=True,
+                filter=Q(asset_type__in=cls.TRADEABLE_TYPES) & ~Q(sector='')
+            ),
+            large_positions=Count('id', filter=Q(total_value__gt=total_value * LARGE_POSITION)),
+        )
+
+        types = [row['asset_type'] for row in by_type]
+        return cls(
+            types=types,
+            counts=[row['count'] for row in by_type],
+            value_cents=[_cents(row['value_sum']) for row in by_type],
+            gain_cents=[_cents(row['gain_sum']) for row in by_type],
+            daily_change=[row['daily_change_sum'] for row in by_type],
+            risk_value=[float(row['risk_sum'] or 0) * 100 for row in by_type],
+            best=[_performer(*performers[t][0:3]) for t in types],
+            worst=[_performer(*performers[t][3:6]) for t in types],
+            sector_count=facts['sector_count'],
+            large_positions=facts['large_positions'] if total_value > 0 else 0,
+            worst_performers=lambda limit: cls.worst_performers_query(queryset, limit),
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'PortfolioAnalytics':
+        """Metrics from a user's PortfolioSnapshot row, without reading the holdings"""
+        buckets = sorted(snapshot.buckets.items(), key=lambda item: item[1]['latest'], reverse=True)
+        queryset = Investment.objects.filter(user_id=snapshot.user_id)
+        return cls(
+            types=[asset_type for asset_type, _ in buckets],
+            counts=[bucket['count'] for _, bucket in buckets],
+            value_cents=[_cents(Decimal(bucket['total_value'])) for _, bucket in buckets],
+            gain_cents=[_cents(Decimal(bucket['total_gain_loss'])) for _, bucket in buckets],
+            daily_change=[Decimal(bucket['daily_change']) for _, bucket in buckets],
+            risk_value=[float(bucket['risk_value']) * 100 for _, bucket in buckets],
+            best=[_stored_performer(bucket['best']) for _, bucket in buckets],
+            worst=[_stored_performer(bucket['worst']) for _, bucket in buckets],
+            sector_count=snapshot.sector_count,
+            large_positions=snapshot.large_positions,
+            worst_performers=lambda limit: cls.worst_performers_query(queryset, limit),
+        )
+
+    @classmethod
+    def from_investments(cls, investments: Iterable[Investment]) -> 'PortfolioAnalytics':
+        """Reduce in-memory holdings to the same aggregates with NumPy"""
+        rows = [tuple(getattr(investment, field) for field in cls.FIELDS) for investment in investments]
+        columns = list(zip(*rows)) if rows else [()] * len(cls.FIELDS)
+        symbol, name, asset_type, sector, risk_level, quantity, daily_change, \
+            total_value, total_gain_loss, gain_percent = columns
+
+        symbol = np.array(symbol, dtype=object)
+        name = np.array(name, dtype=object)
+        asset_type = np.array(asset_type, dtype=object)
+        sector = np.array([s or '' for s in sector], dtype=object)
+        risk_score = np.array([cls.RISK_SCORES.get(r, 2) for r in risk_level], dtype=float)
+        daily_change = np.array([(d or 0) * (q or 0) for d, q in zip(daily_change, quantity)], dtype=object)
+        value_cents = np.array([_cents(v) for v in total_value], dtype=np.int64)
+        gain_cents = np.array([_cents(g) for g in total_gain_loss], dtype=np.int64)
+        percent = np.array([p or Decimal('0') for p in gain_percent], dtype=object)
+        percent_float = percent.astype(float)
+
+        # Asset types in order of first appearance, and each holding's group index
+        types, first_index, type_index = np.unique(asset_type.astype(str), return_index=True, return_inverse=True)
+        order = np.argsort(first_index)
+        types = types[order].tolist()
+        type_index = np.argsort(order)[type_index]
+        k = len(types)
+
+        best, worst, type_daily_change = [], [], []
+        for i in range(k):
+            members = np.flatnonzero(type_index == i)
+            b = members[percent_float[members].argmax()]
+            w = members[percent_float[members].argmin()]
+            best.append(_performer(symbol[b], name[b], percent[b]))
+            worst.append(_performer(symbol[w], name[w], percent[w]))
+            type_daily_change.append(daily_change[members].sum())
+
+        total = int(value_cents.sum())
+        tradeable = np.isin(asset_type, cls.TRADEABLE_TYPES)
+
+        def worst_performers(limit):
+            return [_performer(symbol[i], name[i], percent[i])
+                    for i in np.argsort(percent_float, kind='stable')[:limit]]
+
+        return cls(
+            types=types,
+            counts=np.bincount(type_index, minlength=k),
+            value_cents=np.rint(np.bincount(type_index, weights=value_cents, minlength=k)),
+            gain_cents=np.rint(np.bincount(type_index, weights=gain_cents, minlength=k)),
+            daily_change=type_daily_change,
+            risk_value=np.bincount(type_index, weights=risk_score * value_cents, minlength=k),
+            best=best,
+            worst=worst,
+            sector_count=len(np.unique(sector[tradeable & (sector != '')])),
+            large_positions=int((value_cents * 5 > total).sum()) if total > 0 else 0,
+            worst_performers=worst_performers,
+        )
+
+    def _share(self, mask: np.ndarray) -> float:
+        return float(self.value_cents[mask].sum() / self.total_value_cents) if self.total_value_cents > 0 else 0.0
+
+    def worst_performers(self, limit: int) -> List[Dict]:
+        """Holdings with the lowest gain/loss percent, worst first"""
+        return self._worst_performers(limit) if self.count else []
+
+    def asset_allocation(self) -> Dict[str, Dict]:
+        allocation = {}
+        for i, asset_type in enumerate(self.types):
+            allocation[asset_type] = {
+                'count': int(self.counts[i]),
+                'total_value': _cents_to_decimal(self.value_cents[i]),
+                'percentage': (
+                    Decimal(int(self.value_cents[i])) / Decimal(self.total_value_cents) * 100
+                    if self.total_value_cents > 0 else Decimal('0')
+                ),
+            }
+        return allocation
+
+    def diversification_score(self) -> int:
+        """Portfolio diversification score (0-100)"""
+        if not self.count:
+            return 0
+
+        # Asset type diversity: 8 points per type, max 40
+        score = min(len(self.types) * 8, 40)
+        # Sector diversity among tradeable holdings: 6 points per sector, max 30
+        score += min(self.sector_count * 6, 30)
+        # Position size diversity: 10 points off per position over 20% of the portfolio, max 30
+        if self.total_value_cents > 0:
+            score += max(30 - self.large_positions * 10, 0)
+
+        return min(score, 100)
+
+    def risk_assessment(self) -> str:
+        """Value-weighted risk level adjusted for the crypto and physical asset mix"""
+        if not self.count or self.total_value_cents == 0:
+            return 'medium'
+
+        weighted_risk = float(self.risk_value.sum() / self.total_value_cents)
+        # Crypto increases risk, physical assets reduce it
+        if self._share(self.type_array == 'crypto') > 0.3:
+            weighted_risk += 0.5
+        if self._share(np.isin(self.type_array, self.PHYSICAL_TYPES)) > 0.2:
+            weighted_risk -= 0.3
+
+        if weighted_risk <= 1.5:
+            return 'low'
+        elif weighted_risk <= 2.5:
+            return 'medium'
+        return 'high'
+
+    def summary(self) -> Dict:
+        """Totals, performers, allocation, diversification and risk"""
+        if not self.count:
+            return {
+                'total_value': Decimal('0'),
+                'total_gain_loss': Decimal('0'),
+                'total_gain_loss_percent': Decimal('0'),
+                'daily_change': Decimal('0'),
+                'daily_change_percent': Decimal('0'),
+                'investment_count': 0,
+                'top_performer': 'N/A',
+                'worst_performer': 'N/A',
+                'asset_allocation': {},
+                'diversification_score': 0,
+                'risk_assessment': 'medium'
+            }
+
+        total_value = _cents_to_decimal(self.total_value_cents)
+        total_gain_loss = _cents_to_decimal(self.gain_cents.sum())
+        daily_change = sum(self.daily_change, Decimal('0'))
+
+        total_cost = total_value - total_gain_loss
+        previous_total = total_value - daily_change
+
+        top = max(self.best, key=lambda p: p['total_gain_loss_percent'])
+        bottom = min(self.worst, key=lambda p: p['total_gain_loss_percent'])
+
+        return {
+            'total_value': total_value,
+            'total_gain_loss': total_gain_loss,
+            'total_gain_loss_percent': (total_gain_loss / total_cost * 100) if total_cost > 0 else Decimal('0'),
+            'daily_change': daily_change,
+            'daily_change_percent': (daily_change / previous_total * 100) if previous_total > 0 else Decimal('0'),
+            'investment_count': self.count,
+            'top_performer': top['symbol'] or top['name'],
+            'worst_performer': bottom['symbol'] or bottom['name'],
+            'asset_allocation': self.asset_allocation(),
+            'diversification_score': self.diversification_score(),
+            'risk_assessment': self.risk_assessment()
+        }
+
+    def performance_by_type(self) -> Dict[str, Dict]:
+        """Count, value, gain/loss and best/worst performer per asset type"""
+        performance = {}
+        for i, asset_type in enumerate(self.types):
+            type_value = _cents_to_decimal(self.value_cents[i])
+            type_gain = _cents_to_decimal(self.gain_cents[i])
+            total_cost = type_value - type_gain
+            performance[asset_type] = {
+                'count': int(self.counts[i]),
+                'total_value': type_value,
+                'total_gain_loss': type_gain,
+                'total_gain_loss_percent': (type_gain / total_cost * 100) if total_cost > 0 else Decimal('0'),
+                'best_performer': self.best[i],
+                'worst_performer': self.worst[i],
+            }
+        return performance
+
+    def asset_type_stats(self) -> List[Dict]:
+        """Per-type count, value, gain/loss and share of the portfolio, as floats"""
+        values = self.value_cents / 100
+        gains = self.gain_cents / 100
+        total = values.sum()
+        percentages = values / total * 100 if total > 0 else np.zeros(len(self.types))
+        return [
+            {
+                'asset_type': asset_type,
+                'count': int(self.counts[i]),
+                'total_value': float(values[i]),
+                'total_gain_loss': float(gains[i]),
+                'percentage_of_portfolio': round(float(percentages[i]), 2),
+            }
+            for i, asset_type in enumerate(self.types)
+        ]
@@ -0,0 +1,115 @@
+"""
+Daily portfolio value history.
+
+A nightly job stores each user's end-of-day total value, cost and value per
+asset type as one compact row per (user, day). Every user is covered by a
+single GROUP BY over the holdings, streamed in user order and written with
+batched upserts, so the job issues a handful of statements however many users
+there are. The history endpoint serves fixed ranges and reduces long ranges to
+a point budget on the server with LTTB.
+"""
+
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, Optional
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from .chart_resampling import lttb
+from .models import Investment, PortfolioValueHistory
+
+logger = logging.getLogger(__name__)
+
+
+# range: days of history, None for everything
+RANGES = {
+    '1M': 30,
+    '6M': 182,
+    '1Y': 365,
+    'ALL': None,
+}
+
+
+def _money(value) -> Decimal:
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+class PortfolioHistoryService:
+    """Record and serve the daily portfolio value series"""
+
+    DEFAULT_MAX_POINTS = 180
+    DEFAULT_BATCH_SIZE = 1000
+
+    @classmethod
+    def record_daily(cls, day: date = None) -> int:
+        """Upsert the day's value row for every user with holdings; returns rows written"""
+        day = day or timezone.now().date()
+        batch_size = getattr(settings, 'PORTFOLIO_HISTORY_BATCH_SIZE', cls.DEFAULT_BATCH_SIZE)
+
+        rows = Investment.objects.values('user_id', 'asset_type').annotate(
+            value=Sum('total_value'),
+            gain_loss=Sum('total_gain_loss'),
+        ).order_by('user_id', 'asset_type')
+
+        written = 0
+        batch = []
+        for user_id, group in groupby(rows.iterator(chunk_size=batch_size), key=itemgetter('user_id')):
+            by_type = {}
+            total_value = total_gain_loss = Decimal('0')
+            for row in group:
+                value = _money(row['value'])
+                by_type[row['asset_type']] = str(value)
+                total_value += value
+                total_gain_loss += _money(row['gain_loss'])
+            batch.append(PortfolioValueHistory(
+                user_id=user_id, date=day, total_value=total_value,
+                total_cost=total_value - total_gain_loss, by_type=by_type,
+            ))
+            if len(batch) >= batch_size:
+                written += cls._write(batch)
+                batch = []
+        if batch:
+            written += cls._write(batch)
+
+        logger.info(f"Recorded portfolio values for {written} users on {day}")
+        return written
+
+    @staticmethod
+    def _write(rows: List[PortfolioValueHistory]) -> int:
+        # Re-running the job on the same day replaces that day's rows
+        PortfolioValueHistory.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user', 'date'],
+            update_fields=['total_value', 'total_cost', 'by_type'],
+        )
+        return len(rows)
+
+    @classmethod
+    def get_series(cls, user, range_key: str = '1Y', points: Optional[int] = None) -> List[Dict]:
+        """Daily values over a range, oldest first, downsampled to at most ``points`` points"""
+        days = RANGES[range_key]
+        queryset = PortfolioValueHistory.objects.filter(user=user)
+        if days is not None:
+            queryset = queryset.filter(date__gte=timezone.now().date() - timedelta(days=days))
+
+        series = [
+            {
+                'date': day.isoformat(),
+                'total_value': float(total_value),
+                'total_cost': float(total_cost),
+                'by_type': {asset_type: float(value) for asset_type, value in by_type.items()},
+            }
+            for day, total_value, total_cost, by_type in queryset.values_list(
+                'date', 'total_value', 'total_cost', 'by_type'
+            )
+        ]
+
+        threshold = points or getattr(settings, 'PORTFOLIO_HISTORY_MAX_POINTS', cls.DEFAULT_MAX_POINTS)
+        if threshold >= len(series):
+            return series
+        x = np.array([date.fromisoformat(point['date']).toordinal() for point in series], dtype=float)
+        y = np.array([point['total_value'] for point in series])
+        return [series[i] for i in lttb(x, y, threshold)]
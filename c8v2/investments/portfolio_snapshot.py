@@ -0,0 +1,320 @@
+"""
+Incrementally maintained portfolio totals.
+
+Every user has one PortfolioSnapshot row with the portfolio totals and
+per-asset-type sums (count, value, gain/loss, daily change, risk-weighted
+value). Writes apply the difference between what a holding contributed before
+and after the change instead of recomputing the portfolio: single saves through
+Investment.save()/delete(), bulk price updates (bulk_update) as one aggregated
+delta per user written back with a single bulk UPDATE. The "before" side is
+re-read with the holding rows locked, not taken from when the holding was
+loaded, so two processes that loaded the same holding do not both apply its
+old value. Users without a snapshot yet, or holdings that vanished meanwhile,
+are rebuilt from the holdings instead. Rows are always locked in id/user order
+(holdings first, then snapshots) so concurrent batches cannot deadlock.
+
+Order statistics -- the best/worst holding per type, distinct sectors and
+oversized positions -- cannot be maintained from deltas. Writes that touch one
+of their inputs only flag them stale; the next read refreshes them for that
+user, and reading the summary or the asset type stats is otherwise a
+single-row lookup. Writes that change no snapshot input at all (notes,
+enrichment state, ...) or whose deltas cancel out leave the snapshot alone. Writes that bypass this
+service (raw queryset updates) are reconciled by rebuild_portfolio_snapshots_task
+every night.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.utils import timezone
+from .models import Investment, PortfolioSnapshot
+from .portfolio_analytics import LARGE_POSITION, PortfolioAnalytics
+
+logger = logging.getLogger(__name__)
+
+
+UNKNOWN = object()  # previous state of a holding that was not loaded in full
+
+SUMS = ('total_value', 'total_gain_loss', 'daily_change', 'risk_value')
+
+SUM_INPUTS = 7  # leading Investment.SNAPSHOT_FIELDS the sums are derived from
+
+# Holding fields the order statistics (best/worst, newest, sectors, large positions) read
+STATISTICS_INPUTS = [
+    Investment.SNAPSHOT_FIELDS.index(field)
+    for field in ('user_id', 'asset_type', 'symbol', 'name', 'sector', 'total_gain_loss_percent',
+                  'total_value', 'created_at')
+]
+
+SNAPSHOT_FIELDS = [
+    'investment_count', 'total_value', 'total_cost', 'total_gain_loss', 'daily_change',
+    'buckets', 'sector_count', 'large_positions', 'statistics_stale', 'updated_at',
+]
+
+STATISTICS_FIELDS = ['buckets', 'sector_count', 'large_positions', 'statistics_stale']
+
+
+def _quantize(value, places: int) -> Decimal:
+    # Same rounding the DecimalField columns apply when the holding is stored
+    return Decimal(value or 0).quantize(Decimal(1).scaleb(-places))
+
+
+def _stored(state: Tuple) -> Tuple:
+    """A holding state as its columns store it, so an unchanged holding compares equal"""
+    return tuple(
+        _quantize(value, places) if places is not None and value is not None else value
+        for value, places in zip(state, _state_places())
+    )
+
+
+@lru_cache(maxsize=None)
+def _state_places() -> Tuple:
+    # Decimal places of each Investment.SNAPSHOT_FIELDS column (None for non-decimal fields)
+    fields = [Investment._meta.get_field(name.removesuffix('_id')) for name in Investment.SNAPSHOT_FIELDS]
+    return tuple(getattr(field, 'decimal_places', None) for field in fields)
+
+
+class PortfolioSnapshotService:
+    """Maintain and read per-user PortfolioSnapshot rows"""
+
+    @staticmethod
+    def contribution(state) -> Tuple:
+        """(user_id, asset_type, value, gain/loss, daily change, risk-weighted value) of a holding state"""
+        user_id, asset_type, quantity, daily_change, total_value, total_gain_loss, risk_level = state[:SUM_INPUTS]
+        value = _quantize(total_value, 2)
+        return (
+            user_id,
+            asset_type,
+            value,
+            _quantize(total_gain_loss, 2),
+            _quantize(daily_change, 4) * _quantize(quantity, 4),
+            value * PortfolioAnalytics.RISK_SCORES.get(risk_level, 2),
+        )
+
+    @staticmethod
+    def lock_previous(investments: Iterable[Investment]):
+        """Lock the holdings' rows and take their stored state as the base of the next delta.
+
+        Must run in the transaction that writes them, before the write.
+        """
+        by_id = {investment.pk: investment for investment in investments if investment.pk is not None}
+        if not by_id:
+            return
+        for investment in by_id.values():
+            investment._snapshot_state = UNKNOWN
+        rows = Investment.objects.select_for_update().filter(id__in=list(by_id)).order_by('id').values_list(
+            'id', *Investment.SNAPSHOT_FIELDS
+        )
+        for investment_id, *state in rows:
+            by_id[investment_id]._snapshot_state = tuple(state)
+
+    @classmethod
+    def bulk_update(cls, investments: Iterable[Investment], fields: Iterable[str], batch_size: int = 500):
+        """bulk_update holdings and apply them to their owners' snapshots in one transaction"""
+        investments = list(investments)
+        if not investments:
+            return
+        with transaction.atomic():
+            cls.lock_previous(investments)
+            Investment.objects.bulk_update(investments, list(fields), batch_size=batch_size)
+            cls.apply_saved(investments)
+
+    @classmethod
+    def apply_saved(cls, investments: Iterable[Investment], created: bool = False):
+        """Apply written holdings (save, bulk_update or bulk_create) to their owners' snapshots"""
+        changes = []
+        for investment in investments:
+            previous = None if created else getattr(investment, '_snapshot_state', UNKNOWN)
+            current = _stored(investment.snapshot_state())
+            if previous != current:
+                changes.append((investment.user_id, previous, current))
+            investment._snapshot_state = current
+        cls.apply_changes(changes)
+
+    @classmethod
+    def apply_deleted(cls, investments: Iterable[Investment]):
+        """Remove deleted holdings from their owners' snapshots"""
+        cls.apply_changes(
+            (investment.user_id, getattr(investment, '_snapshot_state', UNKNOWN), None)
+            for investment in investments
+        )
+
+    @classmethod
+    def apply_changes(cls, changes: Iterable[Tuple[int, object, Optional[Tuple]]]):
+        """Apply (user_id, previous state, current state) changes, aggregated per user and type.
+
+        A state of None is a holding that did not exist before (created) or no
+        longer exists (deleted).
+        """
+        deltas = defaultdict(lambda: defaultdict(lambda: [0] + [Decimal('0')] * len(SUMS)))
+        rebuild = set()
+        stale = set()
+        for user_id, previous, current in changes:
+            if previous is UNKNOWN:
+                rebuild.add(user_id)
+                continue
+            if previous == current:
+                continue
+            if previous is None or current is None or any(
+                previous[i] != current[i] for i in STATISTICS_INPUTS
+            ):
+                stale.update(state[0] for state in (previous, current) if state is not None)
+            for sign, state in ((-1, previous), (1, current)):
+                if state is None:
+                    continue
+                owner, asset_type, *amounts = cls.contribution(state)
+                bucket = deltas[owner][asset_type]
+                bucket[0] += sign
+                for i, amount in enumerate(amounts, 1):
+                    bucket[i] += sign * amount
+
+        # Users whose changes cancel out and leave the statistics alone need no write
+        changed = {
+            user_id for user_id, by_type in deltas.items()
+            if any(count or any(amounts) for count, *amounts in by_type.values())
+        }
+        user_ids = changed | stale | rebuild
+        if not user_ids:
+            return
+
+        with transaction.atomic():
+            snapshots = {
+                snapshot.user_id: snapshot
+                for snapshot in PortfolioSnapshot.objects.select_for_update().filter(
+                    user_id__in=user_ids - rebuild
+                ).order_by('user_id')
+            }
+            for user_id, snapshot in snapshots.items():
+                cls._add(snapshot, deltas.get(user_id, {}))
+                if user_id in stale:
+                    snapshot.statistics_stale = True
+            PortfolioSnapshot.objects.bulk_update(list(snapshots.values()), SNAPSHOT_FIELDS, batch_size=500)
+
+            # First write for a user, or a previous state we cannot diff against
+            missing = user_ids - set(snapshots)
+            if missing:
+                cls.rebuild(missing)
+
+    @classmethod
+    def rebuild(cls, user_ids: Iterable[int]) -> Dict[int, PortfolioSnapshot]:
+        """Recompute snapshots from the holdings; returns them by user id"""
+        user_ids = set(user_ids)
+        with transaction.atomic():
+            snapshots = {
+                snapshot.user_id: snapshot
+                for snapshot in PortfolioSnapshot.objects.select_for_update().filter(
+                    user_id__in=user_ids
+                ).order_by('user_id')
+            }
+            created = [PortfolioSnapshot(user_id=user_id) for user_id in user_ids - set(snapshots)]
+            snapshots.update((snapshot.user_id, snapshot) for snapshot in created)
+
+            for snapshot in snapshots.values():
+                snapshot.buckets = {}
+            for row in PortfolioAnalytics.sums_by_type(Investment.objects.filter(user_id__in=user_ids)):
+                snapshots[row['user_id']].buckets[row['asset_type']] = {
+                    'count': row['count'],
+                    'total_value': str(_quantize(row['value_sum'], 2)),
+                    'total_gain_loss': str(_quantize(row['gain_sum'], 2)),
+                    'daily_change': str(_quantize(row['daily_change_sum'], 8)),
+                    'risk_value': str(_quantize(row['risk_sum'], 2)),
+                }
+            for snapshot in snapshots.values():
+                cls._set_totals(snapshot)
+                snapshot.statistics_stale = False
+            cls._set_order_statistics(snapshots)
+
+            existing = [snapshot for snapshot in snapshots.values() if snapshot.pk]
+            PortfolioSnapshot.objects.bulk_update(existing, SNAPSHOT_FIELDS, batch_size=500)
+            # A concurrent first write may have created the row meanwhile; upsert on the user
+            PortfolioSnapshot.objects.bulk_create(
+                created, batch_size=500,
+                update_conflicts=True, unique_fields=['user'], update_fields=SNAPSHOT_FIELDS,
+            )
+        return snapshots
+
+    @classmethod
+    def refresh_statistics(cls, user_ids: Iterable[int]) -> Dict[int, PortfolioSnapshot]:
+        """Recompute the order statistics of snapshots; returns them by user id"""
+        with transaction.atomic():
+            snapshots = {
+                snapshot.user_id: snapshot
+                for snapshot in PortfolioSnapshot.objects.select_for_update().filter(
+                    user_id__in=set(user_ids)
+                ).order_by('user_id')
+            }
+            cls._set_order_statistics(snapshots)
+            for snapshot in snapshots.values():
+                snapshot.statistics_stale = False
+            PortfolioSnapshot.objects.bulk_update(list(snapshots.values()), STATISTICS_FIELDS, batch_size=500)
+        return snapshots
+
+    @classmethod
+    def get_snapshot(cls, user) -> PortfolioSnapshot:
+        """A user's snapshot, built on first use and with order statistics refreshed if stale"""
+        try:
+            snapshot = PortfolioSnapshot.objects.get(user=user)
+        except PortfolioSnapshot.DoesNotExist:
+            return cls.rebuild([user.id])[user.id]
+        if snapshot.statistics_stale:
+            snapshot = cls.refresh_statistics([user.id]).get(user.id, snapshot)
+        return snapshot
+
+    @classmethod
+    def get_analytics(cls, user) -> PortfolioAnalytics:
+        """Portfolio metrics from the user's snapshot row"""
+        return PortfolioAnalytics.from_snapshot(cls.get_snapshot(user))
+
+    @staticmethod
+    def _add(snapshot: PortfolioSnapshot, by_type: Dict[str, list]):
+        buckets = snapshot.buckets
+        for asset_type, (count, *amounts) in by_type.items():
+            bucket = buckets.setdefault(asset_type, {'count': 0, **{name: '0' for name in SUMS}})
+            bucket['count'] += count
+            for name, amount in zip(SUMS, amounts):
+                bucket[name] = str(Decimal(bucket[name]) + amount)
+            if bucket['count'] <= 0:
+                del buckets[asset_type]
+        PortfolioSnapshotService._set_totals(snapshot)
+
+    @staticmethod
+    def _set_totals(snapshot: PortfolioSnapshot):
+        buckets = snapshot.buckets.values()
+        snapshot.investment_count = sum(bucket['count'] for bucket in buckets)
+        snapshot.total_value = sum((Decimal(bucket['total_value']) for bucket in buckets), Decimal('0'))
+        snapshot.total_gain_loss = sum((Decimal(bucket['total_gain_loss']) for bucket in buckets), Decimal('0'))
+        snapshot.total_cost = snapshot.total_value - snapshot.total_gain_loss
+        snapshot.daily_change = sum((Decimal(bucket['daily_change']) for bucket in buckets), Decimal('0'))
+        snapshot.updated_at = timezone.now()
+
+    @staticmethod
+    def _set_order_statistics(snapshots: Dict[int, PortfolioSnapshot]):
+        """Best/worst holding and newest holding per type, distinct sectors and oversized positions"""
+        if not snapshots:
+            return
+        queryset = Investment.objects.filter(user_id__in=list(snapshots)).order_by()
+
+        for user_id, asset_type, *performers, latest in PortfolioAnalytics.performers_by_type(queryset):
+            bucket = snapshots[user_id].buckets.get(asset_type)
+            if bucket is None:
+                continue
+            best_symbol, best_name, best_percent, worst_symbol, worst_name, worst_percent = performers
+            bucket['best'] = [best_symbol, best_name, str(best_percent or 0)]
+            bucket['worst'] = [worst_symbol, worst_name, str(worst_percent or 0)]
+            bucket['latest'] = latest.isoformat()
+
+        sectors = dict(queryset.values('user_id').annotate(sector_count=Count(
+            'sector', distinct=True,
+            filter=Q(asset_type__in=PortfolioAnalytics.TRADEABLE_TYPES) & ~Q(sector='')
+        )).values_list('user_id', 'sector_count'))
+        large_positions = Counter(queryset.annotate(
+            portfolio_value=Window(Sum('total_value'), partition_by=[F('user_id')])
+        ).filter(total_value__gt=F('portfolio_value') * LARGE_POSITION).values_list('user_id', flat=True))
+
+        for user_id, snapshot in snapshots.items():
+            snapshot.sector_count = sectors.get(user_id, 0)
+            snapshot.large_positions = large_positions.get(user_id, 0)
@@ -0,0 +1,119 @@
+"""
+Async real-time price aggregator.
+
+Fetches current prices for a watchlist concurrently (the blocking yfinance
+client runs on a shared thread pool) under one overall deadline, and reads
+every previous price with a single query. Symbols that miss the deadline are
+left out of the response instead of stalling it.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .models import Investment
+from .services import MarketDataService
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPriceAggregator:
+    """Concurrent current-price lookups with an overall deadline"""
+
+    DEFAULT_DEADLINE = 8.0  # seconds for the whole watchlist
+    DEFAULT_CONCURRENCY = 10  # per request
+    DEFAULT_POOL_SIZE = 32  # threads shared by all requests in the process
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'REAL_TIME_PRICES_POOL_SIZE', cls.DEFAULT_POOL_SIZE),
+                        thread_name_prefix='real-time-prices'
+                    )
+        return cls._executor
+
+    def __init__(self, fetch: Callable[[str], Optional[Decimal]] = None,
+                 deadline: float = None, concurrency: int = None):
+        self.fetch = fetch or MarketDataService.get_current_price
+        self.deadline = deadline or getattr(settings, 'REAL_TIME_PRICES_DEADLINE', self.DEFAULT_DEADLINE)
+        self.concurrency = concurrency or getattr(
+            settings, 'REAL_TIME_PRICES_CONCURRENCY', self.DEFAULT_CONCURRENCY
+        )
+
+    async def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, Decimal]:
+        """Current price per symbol; symbols that fail or miss the deadline are omitted"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+
+        async def fetch_one(symbol):
+            async with semaphore:
+                return symbol, await loop.run_in_executor(executor, self.fetch, symbol)
+
+        tasks = [asyncio.create_task(fetch_one(symbol)) for symbol in symbols]
+        if not tasks:
+            return {}
+
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Real-time prices: {len(pending)} of {len(tasks)} symbols missed the {self.deadline}s deadline")
+
+        prices = {}
+        for task in done:
+            try:
+                symbol, price = task.result()
+            except Exception as e:
+                logger.error(f"Error fetching real-time price: {e}")
+                continue
+            if price:
+                prices[symbol] = price
+        return prices
+
+    @staticmethod
+    def get_previous_prices(user, symbols: Iterable[str]) -> Dict[str, Decimal]:
+        """Stored price per symbol for the user's holdings, in one query"""
+        previous = {}
+        rows = Investment.objects.filter(user=user, symbol__in=list(symbols)).values_list('symbol', 'current_price')
+        for symbol, price in rows:
+            # Default ordering is newest first; keep the same row .first() used to return
+            previous.setdefault(symbol, price)
+        return previous
+
+    async def get_price_updates(self, user, symbols: Iterable[str]) -> List[Dict]:
+        """Price, change and change percent for each symbol, in request order"""
+        symbols = list(dict.fromkeys(symbols))
+        prices, previous = await asyncio.gather(
+            self.fetch_prices(symbols),
+            sync_to_async(self.get_previous_prices)(user, symbols),
+        )
+
+        now = timezone.now().isoformat()
+        price_updates = []
+        for symbol in symbols:
+            current_price = prices.get(symbol)
+            if not current_price:
+                continue
+            previous_price = previous.get(symbol) or current_price
+            change = current_price - previous_price
+            change_percent = (change / previous_price * 100) if previous_price > 0 else 0
+            price_updates.append({
+                'symbol': symbol,
+                'price': float(current_price),
+                'change': float(change),
+                'changePercent': float(change_percent),
+                'timestamp': now
+            })
+        return price_updates
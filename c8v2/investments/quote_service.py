@@ -0,0 +1,165 @@
+"""
+Symbol-level quote and fundamentals layer.
+
+Market data is fetched once per distinct (symbol, asset_type) per refresh cycle,
+stored in SymbolQuote and then fanned out to every Investment row holding that
+symbol with a single bulk write. Identical data is no longer scraped once per
+user holding.
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+from django.utils import timezone
+from .alert_engine import PriceAlertEngine
+from .models import Investment, SymbolQuote
+from .portfolio_snapshot import PortfolioSnapshotService
+from .data_enrichment_service import DataEnrichmentService
+from .market_calendar import symbols_on_exchange
+from .refresh_engine import PriceRefreshEngine
+from .session_state import SymbolSessionService
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolQuoteService:
+    """Fetch shared market data per symbol and fan it out to holdings"""
+
+    ASSET_TYPES = ['stock', 'etf', 'crypto']
+
+    FAN_OUT_FIELDS = [
+        'volume', 'market_cap', 'pe_ratio', 'growth_rate',
+        'current_price', 'daily_change', 'daily_change_percent',
+        'total_value', 'total_gain_loss', 'total_gain_loss_percent',
+        'price_updated_at', 'last_updated', 'updated_at',
+    ]
+
+    @classmethod
+    def fetch_quote(cls, symbol: str, asset_type: str) -> Dict:
+        """Fetch data for one symbol. Returns {'data': ..., 'source': ...} or {}"""
+        data, source = DataEnrichmentService.fetch_market_data_with_source(symbol, asset_type)
+        return {'data': data, 'source': source} if data else {}
+
+    @classmethod
+    def get_distinct_symbols(cls, asset_types: Iterable[str] = None,
+                             exchange: str = None) -> Tuple[List[Tuple[str, str]], int]:
+        """Return distinct (symbol, asset_type) keys and the number of holdings behind them.
+
+        With ``exchange``, only symbols trading on that exchange's calendar are included.
+        """
+        queryset = Investment.objects.filter(asset_type__in=asset_types or cls.ASSET_TYPES).exclude(symbol='')
+        if exchange:
+            queryset = queryset.filter(symbol__in=symbols_on_exchange(exchange))
+        holdings = queryset.count()
+        keys = sorted(set(queryset.values_list('symbol', 'asset_type')))
+        return keys, holdings
+
+    @classmethod
+    def refresh_quotes(cls, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], SymbolQuote]:
+        """Fetch each key once (concurrently) and upsert the results into SymbolQuote"""
+        engine = PriceRefreshEngine(fetch=cls.fetch_quote, apply=None)
+        results = engine.fetch_all(keys)
+
+        now = timezone.now()
+        quotes = [
+            SymbolQuote(
+                symbol=symbol, asset_type=asset_type,
+                data=result['data'], source=result['source'], fetched_at=now
+            )
+            for (symbol, asset_type), result in results.items() if result
+        ]
+        if quotes:
+            SymbolQuote.objects.bulk_create(
+                quotes,
+                update_conflicts=True,
+                unique_fields=['symbol', 'asset_type'],
+                update_fields=['data', 'source', 'fetched_at'],
+                batch_size=500
+            )
+        return {(quote.symbol, quote.asset_type): quote for quote in quotes}
+
+    @classmethod
+    def apply_quote(cls, investment: Investment, quote: SymbolQuote, session=None):
+        """Copy shared quote data onto a single holding in memory.
+
+        The daily change is taken against the symbol's session (previous close),
+        like price ticks, not against the price the last cycle stored.
+        """
+        data = quote.data
+        if data.get('volume'):
+            investment.volume = data['volume']
+
+        for field in ['market_cap', 'pe_ratio', 'growth_rate']:
+            if data.get(field):
+                setattr(investment, field, Decimal(str(data[field])))
+
+        # BharatSM doesn't return prices; fallback providers do
+        if data.get('current_price'):
+            SymbolSessionService.apply_price(investment, Decimal(str(data['current_price'])), session)
+
+    @classmethod
+    def fan_out(cls, quotes: Dict[Tuple[str, str], SymbolQuote]) -> int:
+        """Apply quotes to every holding of each symbol with one bulk_update"""
+        if not quotes:
+            return 0
+
+        symbols = {symbol for symbol, _ in quotes}
+        asset_types = {asset_type for _, asset_type in quotes}
+        investments = Investment.objects.filter(symbol__in=symbols, asset_type__in=asset_types)
+        sessions = SymbolSessionService.get_sessions(
+            symbol for (symbol, _), quote in quotes.items() if quote.data.get('current_price')
+        )
+
+        now = timezone.now()
+        to_update = []
+        user_ids = set()
+        for investment in investments:
+            quote = quotes.get((investment.symbol, investment.asset_type))
+            if quote is None:
+                continue
+            previous_price = investment.current_price
+            cls.apply_quote(investment, quote, sessions.get(investment.symbol))
+            if investment.current_price != previous_price:
+                investment.price_updated_at = now
+            investment.calculate_derived_fields()
+            investment.last_updated = now
+            investment.updated_at = now
+            to_update.append(investment)
+            user_ids.add(investment.user_id)
+
+        PortfolioSnapshotService.bulk_update(to_update, cls.FAN_OUT_FIELDS)
+
+        from .services import CacheService
+        CacheService.invalidate_users(user_ids)
+        PriceAlertEngine.evaluate_investments(inv.id for inv in to_update)
+
+        return len(to_update)
+
+    @classmethod
+    def run_cycle(cls, asset_types: Iterable[str] = None, exchange: str = None) -> Dict:
+        """Run one full fetch + fan-out cycle (optionally for one exchange) and return dedup counters"""
+        keys, holdings = cls.get_distinct_symbols(asset_types, exchange)
+        quotes = cls.refresh_quotes(keys)
+        updated = cls.fan_out(quotes)
+
+        source_counts = defaultdict(int)
+        for quote in quotes.values():
+            source_counts[quote.source] += 1
+
+        fetches = len(keys)
+        stats = {
+            'holdings': holdings,
+            'distinct_symbols': fetches,
+            'fetched': len(quotes),
+            'failed': fetches - len(quotes),
+            'updated': updated,
+            'dedup_ratio': round(holdings / fetches, 2) if fetches else 0,
+            'bharatsm': source_counts.get('bharatsm', 0),
+            'fallback': sum(count for source, count in source_counts.items() if source != 'bharatsm'),
+        }
+        logger.info(
+            f"Symbol quote cycle: {stats['holdings']} holdings served by {stats['distinct_symbols']} fetches "
+            f"(dedup ratio {stats['dedup_ratio']}x), {stats['updated']} investments updated"
+        )
+        return stats
@@ -0,0 +1,125 @@
+"""
+Per-provider rate limiting for market data APIs.
+
+Each external provider (BharatSM, Finnhub, FMP, Perplexity) gets its own
+concurrency cap and token bucket so that a bulk refresh can run on a thread
+pool without fixed sleeps between calls.
+"""
+
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Per-provider limits live in settings.MARKET_DATA_PROVIDER_LIMITS; this fills in
+# whatever a provider's entry leaves out (and covers providers without one).
+# rate = tokens per second, burst = bucket capacity, concurrency = max in-flight calls
+FALLBACK_LIMITS = {'concurrency': 2, 'rate': 1.0, 'burst': 2}
+
+
+class TokenBucket:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available. Returns 0 on success, otherwise seconds to wait."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available or the timeout expires"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class ProviderLimiter:
+    """Concurrency cap plus token bucket for a single provider"""
+
+    def __init__(self, name: str, concurrency: int, rate: float, burst: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """Hold a concurrency slot and one token for the duration of a call"""
+        if not self._semaphore.acquire(timeout=timeout):
+            raise TimeoutError(f"Timed out waiting for a {self.name} slot")
+        try:
+            if not self.bucket.acquire(timeout=timeout):
+                raise TimeoutError(f"Timed out waiting for a {self.name} rate limit token")
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class ProviderLimiterRegistry:
+    """Lazily builds one limiter per provider from settings"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _get_config(self, provider: str) -> Dict:
+        configured = getattr(settings, 'MARKET_DATA_PROVIDER_LIMITS', {}) or {}
+        return {**FALLBACK_LIMITS, **configured.get(provider, {})}
+
+    def get(self, provider: str) -> ProviderLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(provider)
+                if limiter is None:
+                    config = self._get_config(provider)
+                    limiter = ProviderLimiter(
+                        provider,
+                        concurrency=int(config['concurrency']),
+                        rate=float(config['rate']),
+                        burst=float(config['burst']),
+                    )
+                    self._limiters[provider] = limiter
+        return limiter
+
+    def throttle(self, provider: str, timeout: Optional[float] = None):
+        """Context manager guarding a single call to the given provider"""
+        return self.get(provider).slot(timeout=timeout)
+
+    def reset(self):
+        """Drop all limiters so they are rebuilt from current settings"""
+        with self._lock:
+            self._limiters = {}
+
+
+# Global registry shared by all services in this process
+provider_limits = ProviderLimiterRegistry()
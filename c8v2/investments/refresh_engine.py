@@ -0,0 +1,152 @@
+"""
+Concurrent price refresh engine.
+
+Groups investments by unique (symbol, asset_type), fetches each symbol once on a
+bounded thread pool and writes every changed row back with a single bulk_update.
+Provider throttling happens inside the fetch path via ``provider_limits``, so
+the engine itself never sleeps.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .alert_engine import PriceAlertEngine
+from .models import Investment
+from .portfolio_snapshot import PortfolioSnapshotService
+
+logger = logging.getLogger(__name__)
+
+
+class PriceRefreshEngine:
+    """Fan out market data fetches per unique symbol and bulk write the results"""
+
+    DEFAULT_MAX_WORKERS = 8
+
+    UPDATE_FIELDS = [
+        'name', 'sector', 'volume', 'market_cap', 'pe_ratio', 'growth_rate',
+        'current_price', 'daily_change_percent', 'fifty_two_week_high', 'fifty_two_week_low',
+        'total_value', 'total_gain_loss', 'total_gain_loss_percent',
+        'data_enriched', 'enrichment_attempted', 'enrichment_error',
+        'price_updated_at', 'last_updated', 'updated_at',
+    ]
+
+    # Written for holdings whose fetch or apply failed; everything else keeps its stored value
+    FAILURE_FIELDS = ['enrichment_attempted', 'enrichment_error']
+
+    def __init__(self, fetch: Callable[[str, str], Dict], apply: Callable[[Investment, Dict], bool],
+                 max_workers: int = None, prefetch: Callable[[List[Tuple[str, str]]], Dict] = None):
+        """
+        Args:
+            fetch: callable(symbol, asset_type) -> market data dict, must not touch the database
+            apply: callable(investment, data) -> bool, copies data onto the instance in memory
+            max_workers: thread pool size (defaults to settings.PRICE_REFRESH_MAX_WORKERS)
+            prefetch: optional callable(keys) -> {key: data} for providers with batch endpoints;
+                keys it answers are not fetched one by one
+        """
+        self.fetch = fetch
+        self.apply = apply
+        self.prefetch = prefetch
+        self.max_workers = max_workers or getattr(
+            settings, 'PRICE_REFRESH_MAX_WORKERS', self.DEFAULT_MAX_WORKERS
+        )
+        self.stats = {}
+
+    @staticmethod
+    def group_by_symbol(investments) -> Dict[Tuple[str, str], List[Investment]]:
+        """Group investments by (upper-cased symbol, asset_type)"""
+        groups = defaultdict(list)
+        for investment in investments:
+            if not investment.symbol:
+                continue
+            groups[(investment.symbol.strip().upper(), investment.asset_type)].append(investment)
+        return groups
+
+    def fetch_all(self, keys) -> Dict[Tuple[str, str], Dict]:
+        """Fetch market data for every (symbol, asset_type) key concurrently"""
+        results = {}
+        keys = list(keys)
+        if not keys:
+            return results
+
+        workers = max(1, min(self.max_workers, len(keys)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='price-refresh') as executor:
+            futures = {executor.submit(self.fetch, symbol, asset_type): (symbol, asset_type)
+                       for symbol, asset_type in keys}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result() or {}
+                except Exception as e:
+                    logger.error(f"Failed to fetch market data for {key[0]}: {e}")
+                    results[key] = {}
+        return results
+
+    def refresh(self, queryset) -> List[Investment]:
+        """Refresh all investments in the queryset. Returns the investments that were updated."""
+        investments = list(queryset)
+        groups = self.group_by_symbol(investments)
+        
+        batched = {}
+        if self.prefetch and groups:
+            try:
+                batched = {key: data for key, data in self.prefetch(list(groups)).items() if data}
+            except Exception as e:
+                logger.error(f"Batch prefetch failed, falling back to per-symbol fetches: {e}")
+        market_data = self.fetch_all(key for key in groups if key not in batched)
+        market_data.update(batched)
+
+        now = timezone.now()
+        updated = []
+        failed = []
+        for key, group in groups.items():
+            data = market_data.get(key) or {}
+            for investment in group:
+                previous_price = investment.current_price
+                try:
+                    success = bool(data) and self.apply(investment, data)
+                except Exception as e:
+                    logger.error(f"Failed to apply market data to investment {investment.id}: {e}")
+                    investment.enrichment_error = str(e)
+                    success = False
+
+                investment.enrichment_attempted = True
+                if not success:
+                    # One transient failure must not unset data_enriched or look like an update
+                    failed.append(investment)
+                    continue
+                investment.data_enriched = True
+                investment.enrichment_error = None
+                if investment.current_price != previous_price:
+                    investment.price_updated_at = now
+                investment.calculate_derived_fields()
+                investment.last_updated = now
+                investment.updated_at = now
+                updated.append(investment)
+
+        if investments:
+            with transaction.atomic():
+                PortfolioSnapshotService.bulk_update(updated, self.UPDATE_FIELDS)
+                Investment.objects.bulk_update(failed, self.FAILURE_FIELDS, batch_size=500)
+            self._invalidate_caches(updated)
+            PriceAlertEngine.evaluate_investments(inv.id for inv in updated)
+
+        self.stats = {
+            'investments': len(investments),
+            'symbols': len(groups),
+            'batched': len(batched),
+            'updated': len(updated),
+        }
+        logger.info(
+            f"Price refresh engine: {self.stats['updated']}/{self.stats['investments']} investments "
+            f"updated from {self.stats['symbols']} unique symbols ({self.stats['batched']} via batch quotes)"
+        )
+        return updated
+
+    @staticmethod
+    def _invalidate_caches(investments):
+        from .services import CacheService
+        CacheService.invalidate_users(inv.user_id for inv in investments)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import Investment, ChartData, PriceAlert
+from .models import Investment, ChartData, PriceAlert, PriceHistory
 from .exceptions import AssetValidationException, AssetValidator
+from .services import PriceHistoryService
 from decimal import Decimal
 
 
@@ -10,6 +11,22 @@ class ChartDataSerializer(serializers.ModelSerializer):
         fields = ['date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'timestamp']
 
 
+class PriceHistorySerializer(serializers.ModelSerializer):
+    """Shared symbol bars in the same shape as ChartDataSerializer"""
+    open_price = serializers.DecimalField(source='open', max_digits=15, decimal_places=4, read_only=True)
+    high_price = serializers.DecimalField(source='high', max_digits=15, decimal_places=4, read_only=True)
+    low_price = serializers.DecimalField(source='low', max_digits=15, decimal_places=4, read_only=True)
+    close_price = serializers.DecimalField(source='close', max_digits=15, decimal_places=4, read_only=True)
+    timestamp = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PriceHistory
+        fields = ['date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume', 'timestamp']
+
+    def get_timestamp(self, obj):
+        return int(obj.ts.timestamp())
+
+
 class InvestmentSerializer(serializers.ModelSerializer):
     chart_data = serializers.SerializerMethodField()
     progress_percentage = serializers.SerializerMethodField()
@@ -37,17 +54,26 @@ class InvestmentSerializer(serializers.ModelSerializer):
         ]
 
     def get_chart_data(self, obj):
-        """Use prefetched data to avoid N+1 queries"""
+        """Recent bars from the shared symbol store, loaded in one query for a whole list"""
         if not obj.supports_chart_data:
             return []
 
-        # Use prefetched data if available (set by queryset optimization)
-        chart_data = getattr(obj, 'recent_chart_data', None)
-        if chart_data is None:
-            # Fallback to queryset if not prefetched
-            chart_data = obj.historical_data.order_by('-date')[:30]
+        recent = self.context.get('recent_price_history')
+        if recent is None:
+            if isinstance(self.parent, serializers.ListSerializer):
+                instances = self.parent.instance
+            else:
+                instances = [obj]
+            recent = PriceHistoryService.get_recent_bars(
+                [investment.symbol for investment in instances if investment.supports_chart_data]
+            )
+            self.context['recent_price_history'] = recent
 
-        return ChartDataSerializer(chart_data, many=True).data
+        bars = recent.get(PriceHistoryService.series_key(obj.symbol))
+        if bars is None:
+            # Not part of the batch loaded above
+            bars = PriceHistoryService.get_bars(obj.symbol).order_by('-ts')[:30]
+        return PriceHistorySerializer(bars, many=True).data
 
     def get_progress_percentage(self, obj):
         if obj.average_purchase_price > 0:
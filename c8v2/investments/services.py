@@ -1,9 +1,20 @@
 import requests
+import threading
+import time
 import yfinance as yf
-from datetime import datetime, timedelta
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from .models import Investment, ChartData
+from .alert_engine import PriceAlertEngine
+from .models import Investment, PriceHistory
+from .portfolio_analytics import PortfolioAnalytics
+from .portfolio_snapshot import PortfolioSnapshotService
+from .session_state import SymbolSessionService
+from .symbol_master import INDIAN_SUFFIXES, normalize_symbol
 import logging
 
 logger = logging.getLogger(__name__)
@@ -57,29 +68,76 @@ class MarketDataService:
             }
 
     @staticmethod
-    def get_historical_data(symbol, period="30d"):
-        """Fetch historical chart data"""
+    def _history_points(hist):
+        """Chart points from a yfinance OHLCV frame"""
+        chart_data = []
+        for date, row in hist.iterrows():
+            chart_data.append({
+                'date': date.strftime('%Y-%m-%d'),
+                'open': float(row['Open']),
+                'high': float(row['High']),
+                'low': float(row['Low']),
+                'close': float(row['Close']),
+                'volume': int(row['Volume']),
+                'timestamp': int(date.timestamp())
+            })
+        return chart_data
+
+    @staticmethod
+    def get_historical_data(symbol, period="30d", start=None):
+        """Fetch historical chart data (from ``start`` onwards when given, else for ``period``)"""
         try:
             ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
-            
-            chart_data = []
-            for date, row in hist.iterrows():
-                chart_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'open': float(row['Open']),
-                    'high': float(row['High']),
-                    'low': float(row['Low']),
-                    'close': float(row['Close']),
-                    'volume': int(row['Volume']),
-                    'timestamp': int(date.timestamp())
-                })
+            if start:
+                hist = ticker.history(start=start.isoformat())
+            else:
+                hist = ticker.history(period=period)
             
-            return chart_data
+            return MarketDataService._history_points(hist)
         except Exception as e:
             logger.error(f"Error fetching historical data for {symbol}: {e}")
             return []
 
+    @staticmethod
+    def get_historical_data_batch(symbols, period="30d", start=None):
+        """Fetch historical chart data for many symbols with one multi-ticker download.
+        
+        Returns {symbol: chart points}; symbols without data map to [].
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        try:
+            range_kwargs = {'start': start.isoformat()} if start else {'period': period}
+            data = yf.download(
+                symbols, group_by='ticker', auto_adjust=True, ignore_tz=False,
+                threads=True, progress=False, **range_kwargs
+            )
+        except Exception as e:
+            logger.error(f"Error downloading historical data for {len(symbols)} symbols: {e}")
+            return {}
+
+        results = {}
+        for symbol in symbols:
+            try:
+                # A single ticker comes back without the ticker column level
+                hist = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+                hist = hist.dropna(subset=['Close']).fillna({'Volume': 0})
+                results[symbol] = MarketDataService._history_points(hist)
+            except Exception as e:
+                logger.warning(f"No historical data for {symbol} in batch download: {e}")
+                results[symbol] = []
+        return results
+
+    @staticmethod
+    def last_session_date(asset_type='stock', today=None):
+        """Date of the most recent trading session (crypto trades every day)"""
+        today = today or timezone.now().date()
+        if asset_type == 'crypto':
+            return today
+        # Roll weekends back to Friday
+        return today - timedelta(days=max(0, today.weekday() - 4))
+
     @staticmethod
     def calculate_daily_change(current_price, previous_close):
         """Calculate daily change and percentage"""
@@ -92,6 +150,244 @@ class MarketDataService:
         return daily_change, daily_change_percent
 
 
+class PriceHistoryService:
+    """Symbol-level OHLCV store shared by every holding of a symbol"""
+
+    DAILY = '1d'
+    CHART_ASSET_TYPES = ('stock', 'etf', 'crypto')
+    DEFAULT_REFRESH_INTERVAL = 300  # seconds between background syncs of one symbol
+    DEFAULT_BACKFILL_DELAY = 5  # seconds new holdings wait so a burst shares one run
+    DEFAULT_BACKFILL_BATCH_SIZE = 50  # tickers per multi-ticker download
+    BACKFILL_SCHEDULE_KEY = 'price_history_backfill_scheduled'
+
+    @staticmethod
+    def series_key(symbol):
+        """(symbol, exchange) a symbol's bars are stored under"""
+        symbol = normalize_symbol(symbol)
+        _, dot, suffix = symbol.rpartition('.')
+        exchange = INDIAN_SUFFIXES.get(f'.{suffix}', '') if dot else ''
+        return symbol, exchange
+
+    @classmethod
+    def get_bars(cls, symbol, interval=DAILY):
+        """Stored bars for a symbol, oldest first"""
+        symbol, exchange = cls.series_key(symbol)
+        return PriceHistory.objects.filter(symbol=symbol, exchange=exchange, interval=interval).order_by('ts')
+
+    @classmethod
+    def get_recent_bars(cls, symbols, limit=30, interval=DAILY):
+        """Latest ``limit`` bars (newest first) for many symbols in one query, keyed by series_key"""
+        keys = {cls.series_key(symbol) for symbol in symbols if symbol}
+        recent = {key: [] for key in keys}
+        if not keys:
+            return recent
+
+        bars = PriceHistory.objects.filter(
+            symbol__in={symbol for symbol, _ in keys},
+            exchange__in={exchange for _, exchange in keys},
+            interval=interval,
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('symbol'), F('exchange')], order_by=F('ts').desc())
+        ).filter(row_number__lte=limit).order_by('symbol', 'exchange', '-ts')
+
+        for bar in bars:
+            key = (bar.symbol, bar.exchange)
+            if key in recent:
+                recent[key].append(bar)
+        return recent
+
+    @classmethod
+    def get_last_date(cls, symbol, interval=DAILY):
+        """Date of the newest stored bar for a symbol, or None"""
+        return cls.get_bars(symbol, interval).order_by('-ts').values_list('date', flat=True).first()
+
+    @staticmethod
+    def is_stale(last_date, asset_type='stock'):
+        """Whether a series ending on ``last_date`` misses the latest session"""
+        return last_date is None or last_date < MarketDataService.last_session_date(asset_type)
+
+    @classmethod
+    def request_refresh(cls, symbol, asset_type='stock'):
+        """Enqueue a background sync unless one was queued for the symbol recently.
+        
+        Concurrent requests for the same symbol share one fetch: only the
+        caller that takes the lock enqueues, and the lock is left to expire so
+        a series that stays stale is fetched at most once per interval.
+        """
+        from django.conf import settings
+        from django.core.cache import cache
+        from .tasks import sync_symbol_chart_data_task
+
+        symbol, exchange = cls.series_key(symbol)
+        lock_key = f"price_history_refresh_{symbol}_{exchange}"
+        interval = getattr(settings, 'CHART_REFRESH_INTERVAL', cls.DEFAULT_REFRESH_INTERVAL)
+        if not cache.add(lock_key, 1, interval):
+            return False
+
+        try:
+            sync_symbol_chart_data_task.delay(symbol, asset_type)
+            return True
+        except Exception as e:
+            cache.delete(lock_key)
+            logger.warning(f"Failed to enqueue chart data refresh for {symbol}: {e}")
+            return False
+
+    @classmethod
+    def store_bars(cls, symbol, chart_data, last_date=None):
+        """Store fetched bars newer than ``last_date`` and refresh the bar on it; returns new bars"""
+        from .chart_resampling import ChartResampler
+
+        symbol, exchange = cls.series_key(symbol)
+        series = PriceHistory.objects.filter(symbol=symbol, exchange=exchange, interval=cls.DAILY)
+        new_bars = []
+        for data_point in chart_data:
+            bar = PriceHistory(
+                symbol=symbol,
+                exchange=exchange,
+                interval=cls.DAILY,
+                ts=datetime.fromtimestamp(data_point['timestamp'], tz=dt_timezone.utc),
+                date=datetime.strptime(data_point['date'], '%Y-%m-%d').date(),
+                open=data_point['open'],
+                high=data_point['high'],
+                low=data_point['low'],
+                close=data_point['close'],
+                volume=data_point['volume']
+            )
+            if bar.date == last_date:
+                series.filter(date=last_date).update(
+                    open=bar.open, high=bar.high, low=bar.low, close=bar.close, volume=bar.volume
+                )
+            elif last_date is None or bar.date > last_date:
+                new_bars.append(bar)
+
+        # unique_together (symbol, exchange, interval, ts) makes concurrent syncs safe
+        PriceHistory.objects.bulk_create(new_bars, ignore_conflicts=True)
+        ChartResampler.invalidate(symbol)
+        return len(new_bars)
+
+    @classmethod
+    def sync_symbol(cls, symbol, asset_type='stock'):
+        """Incrementally sync daily bars for a symbol.
+        
+        Only bars from the last stored date onwards are fetched; nothing is
+        fetched when the series already covers the latest session. Returns
+        the number of new bars stored.
+        """
+        try:
+            last_date = cls.get_bars(symbol).aggregate(last=Max('date'))['last']
+            if not cls.is_stale(last_date, asset_type):
+                return 0
+
+            # Refetch the last stored bar too, it may have been stored mid-session
+            chart_data = MarketDataService.get_historical_data(normalize_symbol(symbol), start=last_date)
+            if not chart_data:
+                return 0
+            return cls.store_bars(symbol, chart_data, last_date)
+
+        except Exception as e:
+            logger.error(f"Error syncing price history for {symbol}: {e}")
+            return 0
+
+    @classmethod
+    def pending_backfill(cls, missing_only=False):
+        """Held chart symbols whose series is missing or misses the latest session.
+        
+        Returns {series_key: (symbol, asset_type, last_date)}. Holdings are the
+        queue: anything created since the last run shows up here until synced.
+        With ``missing_only`` only symbols without any stored bars are returned.
+        """
+        held = {}
+        holdings = Investment.objects.filter(asset_type__in=cls.CHART_ASSET_TYPES).exclude(symbol='')\
+            .values_list('symbol', 'asset_type').order_by().distinct()
+        for symbol, asset_type in holdings:
+            held.setdefault(cls.series_key(symbol), asset_type)
+        if not held:
+            return {}
+
+        last_dates = {
+            (symbol, exchange): last_date
+            for symbol, exchange, last_date in PriceHistory.objects.filter(
+                symbol__in={symbol for symbol, _ in held}, interval=cls.DAILY
+            ).order_by().values('symbol', 'exchange').annotate(last=Max('date')).values_list('symbol', 'exchange', 'last')
+        }
+        pending = {}
+        for key, asset_type in held.items():
+            last_date = last_dates.get(key)
+            if missing_only and last_date is not None:
+                continue
+            if cls.is_stale(last_date, asset_type):
+                pending[key] = (key[0], asset_type, last_date)
+        return pending
+
+    @classmethod
+    def backfill_pending(cls, missing_only=False):
+        """Fetch every pending series with batched multi-ticker downloads.
+        
+        Symbols are grouped by exchange, crypto vs. not, and start date, so each
+        download shares one time zone (keeping bar timestamps identical to the
+        single-symbol path) and one date range. ``missing_only`` restricts the
+        run to symbols without stored bars (see pending_backfill).
+        """
+        from django.conf import settings
+        from django.core.cache import cache
+
+        # Holdings created from here on schedule another run
+        cache.delete(cls.BACKFILL_SCHEDULE_KEY)
+
+        pending = cls.pending_backfill(missing_only)
+        groups = {}
+        for (symbol, exchange), (_, asset_type, last_date) in pending.items():
+            groups.setdefault((exchange, asset_type == 'crypto', last_date), []).append(symbol)
+
+        batch_size = getattr(settings, 'CHART_BACKFILL_BATCH_SIZE', cls.DEFAULT_BACKFILL_BATCH_SIZE)
+        stats = {'symbols': len(pending), 'downloads': 0, 'bars': 0, 'failed': 0}
+        for (_, _, last_date), symbols in groups.items():
+            for i in range(0, len(symbols), batch_size):
+                chunk = symbols[i:i + batch_size]
+                stats['downloads'] += 1
+                results = MarketDataService.get_historical_data_batch(chunk, start=last_date)
+                for symbol in chunk:
+                    try:
+                        chart_data = results.get(symbol)
+                        if not chart_data:
+                            stats['failed'] += 1
+                            continue
+                        stats['bars'] += cls.store_bars(symbol, chart_data, last_date)
+                    except Exception as e:
+                        stats['failed'] += 1
+                        logger.error(f"Error storing backfilled bars for {symbol}: {e}")
+
+        logger.info(
+            f"Chart backfill: {stats['symbols']} symbols, {stats['downloads']} downloads, "
+            f"{stats['bars']} new bars, {stats['failed']} failed"
+        )
+        return stats
+
+    @classmethod
+    def schedule_backfill(cls):
+        """Queue a batched backfill shortly, coalescing a burst of new holdings into one run.
+        
+        The run only fetches symbols that have no stored series yet; topping up
+        stale series is left to the nightly sync and request_refresh.
+        """
+        from django.conf import settings
+        from django.core.cache import cache
+        from .tasks import backfill_chart_data_task
+
+        delay = getattr(settings, 'CHART_BACKFILL_DELAY', cls.DEFAULT_BACKFILL_DELAY)
+        # Held until the run starts; expires on its own if no worker picks it up
+        if not cache.add(cls.BACKFILL_SCHEDULE_KEY, 1, delay + 60):
+            return False
+
+        try:
+            backfill_chart_data_task.apply_async(countdown=delay)
+            return True
+        except Exception as e:
+            cache.delete(cls.BACKFILL_SCHEDULE_KEY)
+            logger.warning(f"Failed to schedule chart backfill: {e}")
+            return False
+
+
 class InvestmentService:
     """Service for investment-related operations"""
     
@@ -102,60 +398,39 @@ class InvestmentService:
         if user:
             investments = investments.filter(user=user)
         
+        investments = list(investments)
         updated_investments = []
-        
-        for investment in investments:
-            try:
-                # Get current price
-                current_price = MarketDataService.get_current_price(investment.symbol)
-                if current_price:
-                    # Calculate daily change (simplified - using previous current_price as previous close)
-                    previous_price = investment.current_price
-                    daily_change, daily_change_percent = MarketDataService.calculate_daily_change(
-                        current_price, previous_price
-                    )
-                    
-                    # Update investment
-                    investment.current_price = current_price
-                    investment.daily_change = daily_change
-                    investment.daily_change_percent = daily_change_percent
-                    investment.save()  # This will trigger the save method to recalculate totals
+        prices = {}
+        
+        # Previous close per symbol, captured once a day for all symbols in one batched fetch
+        sessions = SymbolSessionService.get_sessions(investment.symbol for investment in investments)
+        
+        # Per-row saves only record the user; each cache generation is bumped once at the end
+        with CacheService.invalidation_batch():
+            for investment in investments:
+                try:
+                    # Get current price
+                    current_price = MarketDataService.get_current_price(investment.symbol)
+                    if current_price:
+                        SymbolSessionService.apply_price(investment, current_price, sessions.get(investment.symbol))
+                        investment.save()  # This will trigger the save method to recalculate totals
                     
-                    updated_investments.append(investment)
+                        updated_investments.append(investment)
+                        prices[investment.symbol] = current_price
                     
-            except Exception as e:
-                logger.error(f"Error updating price for {investment.symbol}: {e}")
+                except Exception as e:
+                    logger.error(f"Error updating price for {investment.symbol}: {e}")
         
+        SymbolSessionService.record_ticks(sessions, prices)
+        PriceAlertEngine.evaluate_investments(inv.id for inv in updated_investments)
         return updated_investments
 
     @staticmethod
     def update_chart_data(investment):
-        """Update chart data for an investment"""
-        try:
-            chart_data = MarketDataService.get_historical_data(investment.symbol)
-            
-            # Clear existing chart data
-            investment.historical_data.all().delete()
-            
-            # Add new chart data
-            for data_point in chart_data:
-                ChartData.objects.create(
-                    investment=investment,
-                    date=datetime.strptime(data_point['date'], '%Y-%m-%d').date(),
-                    open_price=Decimal(str(data_point['open'])),
-                    high_price=Decimal(str(data_point['high'])),
-                    low_price=Decimal(str(data_point['low'])),
-                    close_price=Decimal(str(data_point['close'])),
-                    volume=data_point['volume'],
-                    timestamp=data_point['timestamp']
-                )
-            
-            # Also update the JSON field for backward compatibility
-            investment.chart_data = chart_data
-            investment.save()
-            
-        except Exception as e:
-            logger.error(f"Error updating chart data for {investment.symbol}: {e}")
+        """Sync the shared daily bars for an investment's symbol; returns new bars stored"""
+        if not investment.symbol:
+            return 0
+        return PriceHistoryService.sync_symbol(investment.symbol, investment.asset_type)
 
     @staticmethod
     def generate_ai_analysis(investment):
@@ -193,91 +468,19 @@ class InvestmentService:
             logger.error(f"Error generating AI analysis for {investment.symbol}: {e}")
 
     @staticmethod
-    def get_portfolio_summary(user):
+    def get_portfolio_summary(user, analytics=None):
         """Get comprehensive portfolio summary for all asset types"""
         from django.core.cache import cache
         
         # Try to get from cache first
-        cache_key = f"portfolio_summary_{user.id}"
+        cache_key = CacheService.user_key('portfolio_summary', user.id)
         cached_summary = cache.get(cache_key)
         
         if cached_summary:
             return cached_summary
         
-        # Optimized query with select_related and only needed fields
-        investments = Investment.objects.filter(user=user).select_related('user')
-        
-        if not investments.exists():
-            return {
-                'total_value': Decimal('0'),
-                'total_gain_loss': Decimal('0'),
-                'total_gain_loss_percent': Decimal('0'),
-                'daily_change': Decimal('0'),
-                'daily_change_percent': Decimal('0'),
-                'investment_count': 0,
-                'top_performer': 'N/A',
-                'worst_performer': 'N/A',
-                'asset_allocation': {},
-                'diversification_score': 0,
-                'risk_assessment': 'medium'
-            }
-        
-        # Calculate totals
-        total_value = sum(inv.total_value for inv in investments)
-        total_gain_loss = sum(inv.total_gain_loss for inv in investments)
-        daily_change = sum(inv.daily_change * inv.quantity for inv in investments)
-        
-        # Calculate percentages
-        total_cost = total_value - total_gain_loss
-        total_gain_loss_percent = (total_gain_loss / total_cost * 100) if total_cost > 0 else Decimal('0')
-        
-        previous_total = total_value - daily_change
-        daily_change_percent = (daily_change / previous_total * 100) if previous_total > 0 else Decimal('0')
-        
-        # Find top and worst performers
-        top_performer = max(investments, key=lambda x: x.total_gain_loss_percent)
-        worst_performer = min(investments, key=lambda x: x.total_gain_loss_percent)
-        
-        # Asset allocation breakdown
-        asset_allocation = {}
-        for investment in investments:
-            asset_type = investment.asset_type
-            if asset_type not in asset_allocation:
-                asset_allocation[asset_type] = {
-                    'count': 0,
-                    'total_value': Decimal('0'),
-                    'percentage': Decimal('0')
-                }
-            
-            asset_allocation[asset_type]['count'] += 1
-            asset_allocation[asset_type]['total_value'] += investment.total_value
-        
-        # Calculate percentages for asset allocation
-        for asset_type in asset_allocation:
-            if total_value > 0:
-                asset_allocation[asset_type]['percentage'] = (
-                    asset_allocation[asset_type]['total_value'] / total_value * 100
-                )
-        
-        # Calculate diversification score (0-100)
-        diversification_score = InvestmentService._calculate_diversification_score(investments)
-        
-        # Risk assessment
-        risk_assessment = InvestmentService._assess_portfolio_risk(investments)
-        
-        summary = {
-            'total_value': total_value,
-            'total_gain_loss': total_gain_loss,
-            'total_gain_loss_percent': total_gain_loss_percent,
-            'daily_change': daily_change,
-            'daily_change_percent': daily_change_percent,
-            'investment_count': investments.count(),
-            'top_performer': top_performer.symbol or top_performer.name,
-            'worst_performer': worst_performer.symbol or worst_performer.name,
-            'asset_allocation': asset_allocation,
-            'diversification_score': diversification_score,
-            'risk_assessment': risk_assessment
-        }
+        # Single-row read of the incrementally maintained snapshot
+        summary = (analytics or PortfolioSnapshotService.get_analytics(user)).summary()
         
         # Cache for 5 minutes
         cache.set(cache_key, summary, 300)
@@ -286,130 +489,23 @@ class InvestmentService:
     @staticmethod
     def _calculate_diversification_score(investments):
         """Calculate portfolio diversification score (0-100)"""
-        if not investments:
-            return 0
-        
-        score = 0
-        total_value = sum(inv.total_value for inv in investments)
-        
-        # Asset type diversity (40 points max)
-        asset_types = set(inv.asset_type for inv in investments)
-        asset_type_score = min(len(asset_types) * 8, 40)  # 8 points per asset type, max 40
-        score += asset_type_score
-        
-        # Sector diversity for stocks (30 points max)
-        sectors = set(inv.sector for inv in investments if inv.sector and inv.is_tradeable)
-        sector_score = min(len(sectors) * 6, 30)  # 6 points per sector, max 30
-        score += sector_score
-        
-        # Position size diversity (30 points max)
-        if total_value > 0:
-            position_sizes = [float(inv.total_value / total_value) for inv in investments]
-            # Penalize large positions (over 20% of portfolio)
-            large_positions = sum(1 for size in position_sizes if size > 0.2)
-            position_score = max(30 - (large_positions * 10), 0)
-            score += position_score
-        
-        return min(score, 100)
+        return PortfolioAnalytics.from_investments(investments).diversification_score()
     
     @staticmethod
     def _assess_portfolio_risk(investments):
         """Assess overall portfolio risk level"""
-        if not investments:
-            return 'medium'
-        
-        risk_scores = {'low': 1, 'medium': 2, 'high': 3}
-        total_value = sum(inv.total_value for inv in investments)
-        
-        if total_value == 0:
-            return 'medium'
-        
-        # Calculate weighted average risk
-        weighted_risk = sum(
-            risk_scores.get(inv.risk_level, 2) * float(inv.total_value / total_value)
-            for inv in investments
-        )
-        
-        # Adjust for asset type mix
-        crypto_percentage = sum(
-            float(inv.total_value / total_value) 
-            for inv in investments if inv.asset_type == 'crypto'
-        )
-        
-        physical_percentage = sum(
-            float(inv.total_value / total_value) 
-            for inv in investments if inv.is_physical
-        )
-        
-        # Crypto increases risk
-        if crypto_percentage > 0.3:
-            weighted_risk += 0.5
-        
-        # Physical assets reduce risk
-        if physical_percentage > 0.2:
-            weighted_risk -= 0.3
-        
-        if weighted_risk <= 1.5:
-            return 'low'
-        elif weighted_risk <= 2.5:
-            return 'medium'
-        else:
-            return 'high'
+        return PortfolioAnalytics.from_investments(investments).risk_assessment()
     
     @staticmethod
     def get_asset_type_performance(user):
         """Get performance breakdown by asset type"""
-        # Optimized query with only needed fields
-        investments = Investment.objects.filter(user=user).only(
-            'asset_type', 'total_value', 'total_gain_loss', 'total_gain_loss_percent',
-            'symbol', 'name'
-        )
-        
-        performance_by_type = {}
-        
-        for investment in investments:
-            asset_type = investment.asset_type
-            if asset_type not in performance_by_type:
-                performance_by_type[asset_type] = {
-                    'count': 0,
-                    'total_value': Decimal('0'),
-                    'total_gain_loss': Decimal('0'),
-                    'total_gain_loss_percent': Decimal('0'),
-                    'best_performer': None,
-                    'worst_performer': None
-                }
-            
-            type_data = performance_by_type[asset_type]
-            type_data['count'] += 1
-            type_data['total_value'] += investment.total_value
-            type_data['total_gain_loss'] += investment.total_gain_loss
-            
-            # Track best and worst performers
-            if (type_data['best_performer'] is None or 
-                investment.total_gain_loss_percent > type_data['best_performer'].total_gain_loss_percent):
-                type_data['best_performer'] = investment
-            
-            if (type_data['worst_performer'] is None or 
-                investment.total_gain_loss_percent < type_data['worst_performer'].total_gain_loss_percent):
-                type_data['worst_performer'] = investment
-        
-        # Calculate percentages
-        for asset_type in performance_by_type:
-            type_data = performance_by_type[asset_type]
-            total_cost = type_data['total_value'] - type_data['total_gain_loss']
-            
-            if total_cost > 0:
-                type_data['total_gain_loss_percent'] = (
-                    type_data['total_gain_loss'] / total_cost * 100
-                )
-        
-        return performance_by_type
+        return PortfolioSnapshotService.get_analytics(user).performance_by_type()
     
     @staticmethod
     def get_portfolio_insights(user):
         """Get detailed portfolio insights and recommendations"""
-        investments = Investment.objects.filter(user=user)
-        summary = InvestmentService.get_portfolio_summary(user)
+        analytics = PortfolioSnapshotService.get_analytics(user)
+        summary = InvestmentService.get_portfolio_summary(user, analytics)
         
         insights = {
             'performance_insights': [],
@@ -418,7 +514,7 @@ class InvestmentService:
             'recommendations': []
         }
         
-        if not investments:
+        if not analytics.count:
             return insights
         
         # Performance insights
@@ -477,13 +573,13 @@ class InvestmentService:
         
         # Generate recommendations
         insights['recommendations'] = InvestmentService._generate_recommendations(
-            investments, summary, asset_allocation
+            analytics, summary, asset_allocation
         )
         
         return insights
     
     @staticmethod
-    def _generate_recommendations(investments, summary, asset_allocation):
+    def _generate_recommendations(analytics, summary, asset_allocation):
         """Generate specific investment recommendations"""
         recommendations = []
         
@@ -511,15 +607,10 @@ class InvestmentService:
                 )
         
         # Performance-based recommendations
-        worst_performers = sorted(
-            investments, 
-            key=lambda x: x.total_gain_loss_percent
-        )[:3]
-        
-        for investment in worst_performers:
-            if investment.total_gain_loss_percent < -20:
+        for performer in analytics.worst_performers(3):
+            if performer['total_gain_loss_percent'] < -20:
                 recommendations.append(
-                    f"Review {investment.symbol or investment.name} - significant losses may warrant attention."
+                    f"Review {performer['symbol'] or performer['name']} - significant losses may warrant attention."
                 )
         
         return recommendations
@@ -565,8 +656,8 @@ class AIInsightsService:
                 best = data['best_performer']
                 worst = data['worst_performer']
                 type_insights.append(
-                    f"Best performer: {best.symbol or best.name} ({best.total_gain_loss_percent:.1f}%), "
-                    f"Worst: {worst.symbol or worst.name} ({worst.total_gain_loss_percent:.1f}%)"
+                    f"Best performer: {best['symbol'] or best['name']} ({best['total_gain_loss_percent']:.1f}%), "
+                    f"Worst: {worst['symbol'] or worst['name']} ({worst['total_gain_loss_percent']:.1f}%)"
                 )
             
             insights[asset_type] = type_insights
@@ -611,8 +702,6 @@ class BulkOperationService:
     @staticmethod
     def bulk_update_prices(investments_data):
         """Bulk update prices for multiple investments"""
-        from django.db import transaction
-        
         investments_to_update = []
         
         for investment_data in investments_data:
@@ -622,17 +711,19 @@ class BulkOperationService:
             try:
                 investment = Investment.objects.get(id=investment_id)
                 investment.current_price = Decimal(str(new_price))
+                investment.calculate_derived_fields()
                 investments_to_update.append(investment)
             except Investment.DoesNotExist:
                 continue
         
-        # Bulk update in a single transaction
-        with transaction.atomic():
-            Investment.objects.bulk_update(
-                investments_to_update, 
-                ['current_price', 'total_value', 'total_gain_loss', 'total_gain_loss_percent'],
-                batch_size=100
-            )
+        # Bulk update in a single transaction, with one aggregated snapshot delta per user
+        PortfolioSnapshotService.bulk_update(
+            investments_to_update,
+            ['current_price', 'total_value', 'total_gain_loss', 'total_gain_loss_percent'],
+            batch_size=100
+        )
+        CacheService.invalidate_users(inv.user_id for inv in investments_to_update)
+        PriceAlertEngine.evaluate_investments(inv.id for inv in investments_to_update)
         
         return len(investments_to_update)
     
@@ -664,16 +755,16 @@ class BulkOperationService:
                 investments_to_create,
                 batch_size=100
             )
+            PortfolioSnapshotService.apply_saved(created_investments, created=True)
+            # bulk_create skips post_save, so queue the chart backfill here
+            transaction.on_commit(PriceHistoryService.schedule_backfill)
         
         return created_investments
     
     @staticmethod
     def optimize_portfolio_queries(user):
         """Optimize common portfolio queries with prefetching"""
-        return Investment.objects.filter(user=user).select_related('user').prefetch_related(
-            'historical_data',
-            'alerts'
-        )
+        return Investment.objects.filter(user=user).select_related('user').prefetch_related('alerts')
 
 
 class CacheService:
@@ -704,20 +795,95 @@ class CacheService:
         
         return data
     
-    @staticmethod
-    def invalidate_user_cache(user_id):
-        """Invalidate all cache entries for a user"""
+    GENERATION_KEY = 'portfolio_cache_generation_{user_id}'
+
+    _batch = threading.local()
+
+    @classmethod
+    def get_generation(cls, user_id):
+        """Current cache generation for a user's portfolio data"""
         from django.core.cache import cache
-        
-        cache_patterns = [
-            f"portfolio_summary_{user_id}",
-            f"portfolio_insights_{user_id}",
-            f"asset_type_performance_{user_id}",
-            f"diversification_analysis_{user_id}",
-        ]
-        
-        cache.delete_many(cache_patterns)
-    
+
+        key = cls.GENERATION_KEY.format(user_id=user_id)
+        generation = cache.get(key)
+        if generation is None:
+            # Seed from the clock so a counter lost to eviction never reuses an old generation
+            cache.add(key, int(time.time() * 1000), None)
+            generation = cache.get(key)
+        return generation
+
+    @classmethod
+    def user_key(cls, name, user_id):
+        """Versioned cache key; bumping the user's generation orphans every such key at once"""
+        return f"{name}_{user_id}_v{cls.get_generation(user_id)}"
+
+    @classmethod
+    def bump_generation(cls, user_ids):
+        """Start a new cache generation for each user"""
+        from django.core.cache import cache
+
+        for user_id in set(user_ids):
+            key = cls.GENERATION_KEY.format(user_id=user_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # No counter yet: nothing has been cached under a generation for this user
+                cache.add(key, int(time.time() * 1000), None)
+
+    @classmethod
+    def invalidate_user_cache(cls, user_id):
+        """Invalidate a user's cached portfolio data once the current transaction commits.
+
+        Inside ``invalidation_batch`` the user is only recorded, and the whole batch
+        bumps each user's generation once when it completes.
+        """
+        from django.db import transaction
+
+        if getattr(cls._batch, 'user_ids', None) is not None:
+            cls._batch.user_ids.add(user_id)
+            return
+        transaction.on_commit(lambda: cls.bump_generation([user_id]))
+
+    @classmethod
+    def invalidate_users(cls, user_ids, warm=True):
+        """Invalidate the users touched by a bulk write as one batch"""
+        with cls.invalidation_batch(warm=warm):
+            for user_id in set(user_ids):
+                cls.invalidate_user_cache(user_id)
+
+    @classmethod
+    @contextmanager
+    def invalidation_batch(cls, warm=True):
+        """Coalesce the invalidations of a refresh into one bump per user, then warm their summaries"""
+        from django.db import transaction
+
+        if getattr(cls._batch, 'user_ids', None) is not None:
+            # Nested batch: the outermost one flushes
+            yield
+            return
+
+        cls._batch.user_ids = set()
+        try:
+            yield
+        finally:
+            user_ids = cls._batch.user_ids
+            cls._batch.user_ids = None
+            if user_ids:
+                transaction.on_commit(lambda: cls._flush_batch(user_ids, warm))
+
+    @classmethod
+    def _flush_batch(cls, user_ids, warm):
+        cls.bump_generation(user_ids)
+        if not warm:
+            return
+        from django.contrib.auth import get_user_model
+
+        for user in get_user_model().objects.filter(id__in=user_ids):
+            try:
+                InvestmentService.get_portfolio_summary(user)
+            except Exception as e:
+                logger.error(f"Error warming portfolio summary for user {user.id}: {e}")
+
     @staticmethod
     def warm_cache_for_user(user):
         """Pre-warm cache with commonly accessed data"""
@@ -0,0 +1,144 @@
+"""
+Symbol-level trading session state.
+
+Daily change is measured against the previous session's close, not against
+whatever price the last refresh happened to store, so it no longer drifts
+with the refresh frequency. The previous close and the current session's
+open/high/low are captured per symbol once per day, for every symbol at once
+with one multi-ticker daily-bar download, and kept in SymbolSession. Refreshes
+then derive the daily change of every holding in memory; intraday ticks only
+widen the stored high/low.
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from django.core.cache import cache
+from django.utils import timezone
+from .models import SymbolSession
+
+logger = logging.getLogger(__name__)
+
+
+def _price(value) -> Decimal:
+    return Decimal(str(round(float(value), 4)))
+
+
+class SymbolSessionService:
+    """Capture, read and apply per-symbol session state"""
+
+    HISTORY_PERIOD = '5d'  # enough daily bars to reach back over a weekend and a holiday
+    MISS_KEY = 'symbol_session_miss_{day}_{symbol}'
+    MISS_TIMEOUT = 6 * 60 * 60
+
+    SESSION_FIELDS = ['session_date', 'previous_close', 'open', 'high', 'low', 'captured_on']
+
+    @staticmethod
+    def from_bars(symbol: str, bars: List[Dict], today: date) -> Optional[SymbolSession]:
+        """Session state from daily bars (oldest first); None without a previous close"""
+        if not bars:
+            return None
+        latest = bars[-1]
+        latest_date = date.fromisoformat(latest['date'])
+        if latest_date < today:
+            # Today's session has not opened: the latest bar is the previous close
+            return SymbolSession(
+                symbol=symbol, session_date=latest_date, previous_close=_price(latest['close']),
+                captured_on=today,
+            )
+        if len(bars) < 2:
+            return None
+        return SymbolSession(
+            symbol=symbol, session_date=latest_date, previous_close=_price(bars[-2]['close']),
+            open=_price(latest['open']), high=_price(latest['high']), low=_price(latest['low']),
+            captured_on=today,
+        )
+
+    @classmethod
+    def capture(cls, symbols: Iterable[str], today: date = None) -> Dict[str, SymbolSession]:
+        """Fetch and store the session state of the symbols with one batched download"""
+        from .services import MarketDataService
+
+        symbols = sorted(set(symbols))
+        today = today or timezone.now().date()
+        if not symbols:
+            return {}
+
+        bars = MarketDataService.get_historical_data_batch(symbols, period=cls.HISTORY_PERIOD)
+        sessions = {}
+        for symbol in symbols:
+            try:
+                session = cls.from_bars(symbol, bars.get(symbol) or [], today)
+            except Exception as e:
+                logger.warning(f"Could not derive session state for {symbol}: {e}")
+                session = None
+            if session is not None:
+                sessions[symbol] = session
+
+        if sessions:
+            SymbolSession.objects.bulk_create(
+                list(sessions.values()), batch_size=500,
+                update_conflicts=True, unique_fields=['symbol'], update_fields=cls.SESSION_FIELDS,
+            )
+        # Symbols without data are not retried on every refresh of the day
+        missed = [symbol for symbol in symbols if symbol not in sessions]
+        if missed:
+            cache.set_many(
+                {cls.MISS_KEY.format(day=today, symbol=symbol): True for symbol in missed}, cls.MISS_TIMEOUT
+            )
+            logger.warning(f"No session state for {len(missed)} of {len(symbols)} symbols")
+        return sessions
+
+    @classmethod
+    def get_sessions(cls, symbols: Iterable[str], today: date = None) -> Dict[str, SymbolSession]:
+        """Today's session state per symbol, capturing the missing or stale ones in one fetch"""
+        symbols = {symbol for symbol in symbols if symbol}
+        today = today or timezone.now().date()
+        sessions = {
+            session.symbol: session
+            for session in SymbolSession.objects.filter(symbol__in=symbols, captured_on=today)
+        }
+
+        pending = symbols - set(sessions)
+        if pending:
+            missed = cache.get_many([cls.MISS_KEY.format(day=today, symbol=symbol) for symbol in pending])
+            pending = [symbol for symbol in pending if cls.MISS_KEY.format(day=today, symbol=symbol) not in missed]
+        if pending:
+            try:
+                sessions.update(cls.capture(pending, today))
+            except Exception as e:
+                logger.error(f"Error capturing session state for {len(pending)} symbols: {e}")
+        return sessions
+
+    @staticmethod
+    def apply_price(investment, price: Decimal, session: Optional[SymbolSession]):
+        """Set a holding's price and its daily change against the session's previous close"""
+        from .services import MarketDataService
+
+        # Without a session (no data for the symbol) the stored price is the best reference left
+        previous_close = session.previous_close if session is not None else investment.current_price
+        investment.daily_change, investment.daily_change_percent = MarketDataService.calculate_daily_change(
+            price, previous_close
+        )
+        investment.current_price = price
+
+    @staticmethod
+    def record_ticks(sessions: Dict[str, SymbolSession], prices: Dict[str, Decimal]) -> int:
+        """Widen the sessions' open/high/low with new prices; returns sessions written"""
+        changed = []
+        for symbol, price in prices.items():
+            session = sessions.get(symbol)
+            if session is None:
+                continue
+            if session.open is None:
+                session.open = session.high = session.low = price
+            elif price > session.high or price < session.low:
+                session.high = max(session.high, price)
+                session.low = min(session.low, price)
+            else:
+                continue
+            changed.append(session)
+        if changed:
+            SymbolSession.objects.bulk_update(changed, ['open', 'high', 'low'], batch_size=500)
+        return len(changed)
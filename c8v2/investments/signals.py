@@ -1,7 +1,9 @@
 from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import Investment
-from .services import InvestmentService
+from .alert_index import alert_index
+from .models import Investment, PriceAlert
+from .services import PriceHistoryService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,14 +15,31 @@ def investment_post_save(sender, instance, created, **kwargs):
     if created:
         logger.info(f"New investment created: {instance.symbol} for user {instance.user.username}")
         
-        # Update chart data for new investment
-        try:
-            InvestmentService.update_chart_data(instance)
-        except Exception as e:
-            logger.error(f"Error updating chart data for new investment {instance.symbol}: {e}")
+        # Chart history is backfilled in batches in the background
+        if instance.supports_chart_data and instance.symbol:
+            transaction.on_commit(PriceHistoryService.schedule_backfill)
 
 
 @receiver(post_delete, sender=Investment)
 def investment_post_delete(sender, instance, **kwargs):
     """Handle post-delete actions for Investment model"""
-    logger.info(f"Investment deleted: {instance.symbol} for user {instance.user.username}")
\ No newline at end of file
+    logger.info(f"Investment deleted: {instance.symbol} for user {instance.user.username}")
+
+
+@receiver(post_save, sender=PriceAlert)
+def price_alert_post_save(sender, instance, **kwargs):
+    """Keep the in-memory alert threshold index in step with pending alerts"""
+    if instance.is_active and instance.triggered_at is None:
+        change = (instance.id, instance.investment.symbol, instance.alert_type, instance.target_value)
+        alert_index.add(*change)
+        transaction.on_commit(lambda: alert_index.publish_add(*change))
+    else:
+        alert_index.discard([instance.id])
+        transaction.on_commit(lambda: alert_index.publish_discard([instance.id]))
+
+
+@receiver(post_delete, sender=PriceAlert)
+def price_alert_post_delete(sender, instance, **kwargs):
+    alert_id = instance.id
+    alert_index.discard([alert_id])
+    transaction.on_commit(lambda: alert_index.publish_discard([alert_id]))
@@ -0,0 +1,173 @@
+"""
+In-memory symbol master registry.
+
+SymbolMaster rows are loaded once into a read-only mapping of
+symbol -> SymbolRoute, so provider routing is a single dict lookup instead of
+rebuilding pattern lists for every symbol. The snapshot is rebuilt after bulk
+loads and otherwise refreshed every SYMBOL_MASTER_RELOAD_INTERVAL seconds, so
+all worker processes pick up new rows without a restart.
+"""
+
+import csv
+import json
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolRoute(NamedTuple):
+    """Frozen routing record for one symbol"""
+    symbol: str
+    exchange: str
+    country: str
+    asset_class: str
+    route: str
+    provider_ids: Mapping[str, str]
+
+
+INDIAN_EXCHANGES = frozenset({'NSE', 'BSE'})
+INDIAN_SUFFIXES = {'.NS': 'NSE', '.NSE': 'NSE', '.BO': 'BSE', '.BSE': 'BSE'}
+
+
+def normalize_symbol(symbol: str) -> str:
+    return (symbol or '').strip().upper()
+
+
+def derive_route(asset_class: str, country: str = '', exchange: str = '') -> str:
+    """Provider route for a symbol when the dump does not specify one"""
+    if asset_class == 'crypto':
+        return 'crypto'
+    if (country or '').upper() == 'IN' or (exchange or '').upper() in INDIAN_EXCHANGES:
+        return 'indian_stock'
+    return 'us_stock'
+
+
+class SymbolRegistry:
+    """Thread-safe, lazily loaded frozen view of the SymbolMaster table"""
+
+    DEFAULT_RELOAD_INTERVAL = 300
+
+    def __init__(self):
+        self._routes: Mapping[str, SymbolRoute] = MappingProxyType({})
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        interval = getattr(settings, 'SYMBOL_MASTER_RELOAD_INTERVAL', self.DEFAULT_RELOAD_INTERVAL)
+        return time.monotonic() - self._loaded_at > interval
+
+    def reload(self) -> int:
+        """Rebuild the in-memory snapshot from the database"""
+        from .models import SymbolMaster
+
+        try:
+            rows = SymbolMaster.objects.filter(is_active=True).values_list(
+                'symbol', 'exchange', 'country', 'asset_class', 'route', 'provider_ids'
+            )
+            routes = {
+                symbol: SymbolRoute(symbol, exchange, country, asset_class, route,
+                                    MappingProxyType(provider_ids or {}))
+                for symbol, exchange, country, asset_class, route, provider_ids in rows
+            }
+        except Exception as e:
+            # Keep serving the previous snapshot (e.g. table not migrated yet)
+            logger.warning(f"Could not load symbol master: {e}")
+            self._loaded_at = time.monotonic()
+            return len(self._routes)
+
+        self._routes = MappingProxyType(routes)
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(routes)} symbols into the symbol registry")
+        return len(routes)
+
+    def invalidate(self):
+        """Force a reload on the next lookup"""
+        self._loaded_at = None
+
+    @property
+    def routes(self) -> Mapping[str, SymbolRoute]:
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.reload()
+        return self._routes
+
+    def lookup(self, symbol: str) -> Optional[SymbolRoute]:
+        """Return the routing record for a symbol (exchange suffixes like .NS are honoured)"""
+        symbol = normalize_symbol(symbol)
+        routes = self.routes
+        entry = routes.get(symbol)
+        if entry is None and '.' in symbol:
+            base, _, suffix = symbol.rpartition('.')
+            if f'.{suffix}' in INDIAN_SUFFIXES:
+                entry = routes.get(base)
+        return entry
+
+    def route(self, symbol: str) -> Optional[str]:
+        entry = self.lookup(symbol)
+        return entry.route if entry else None
+
+    def provider_id(self, symbol: str, provider: str) -> Optional[str]:
+        entry = self.lookup(symbol)
+        return entry.provider_ids.get(provider) if entry else None
+
+
+symbol_registry = SymbolRegistry()
+
+
+def read_symbol_dump(path: str) -> List[Dict]:
+    """Read a CSV or JSON symbol dump into a list of row dicts"""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else data.get('symbols', [])
+
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def build_symbol_master_rows(records: Iterable[Dict]) -> List:
+    """
+    Turn dump records into unsaved SymbolMaster instances.
+
+    Recognised keys: symbol, name, exchange, country, asset_class, route and
+    provider_ids (JSON object). Any other ``<provider>_id`` column is folded
+    into provider_ids.
+    """
+    from .models import SymbolMaster
+
+    rows = {}
+    for record in records:
+        symbol = normalize_symbol(record.get('symbol'))
+        if not symbol:
+            continue
+
+        asset_class = (record.get('asset_class') or 'stock').strip().lower()
+        country = (record.get('country') or '').strip().upper()
+        exchange = (record.get('exchange') or '').strip().upper()
+
+        provider_ids = record.get('provider_ids') or {}
+        if isinstance(provider_ids, str):
+            provider_ids = json.loads(provider_ids)
+        for key, value in record.items():
+            if key.endswith('_id') and value:
+                provider_ids[key[:-3]] = str(value).strip()
+
+        rows[symbol] = SymbolMaster(
+            symbol=symbol,
+            name=(record.get('name') or '').strip(),
+            exchange=exchange,
+            country=country,
+            asset_class=asset_class,
+            route=(record.get('route') or '').strip() or derive_route(asset_class, country, exchange),
+            provider_ids=provider_ids,
+            is_active=str(record.get('is_active', True)).lower() not in ('false', '0', 'no'),
+        )
+    return list(rows.values())
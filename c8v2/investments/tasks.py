@@ -6,14 +6,14 @@ except ImportError:
     def shared_task(func):
         return func
     CELERY_AVAILABLE = False
-from .services import InvestmentService, AIInsightsService
-from .models import Investment, PriceAlert
+from .services import InvestmentService, AIInsightsService, PriceHistoryService, CacheService
+from .alert_engine import PriceAlertEngine
+from .models import Investment
 from .data_enrichment_service import DataEnrichmentService
-from .bharatsm_service import final_bharatsm_service, get_bharatsm_frontend_data
-from .perplexity_service import PerplexityAPIService
+from .quote_service import SymbolQuoteService
+from .tick_writer import PriceTickWriter
+from .market_calendar import symbols_on_exchange
 from django.contrib.auth import get_user_model
-from django.utils import timezone
-from decimal import Decimal
 import logging
 
 User = get_user_model()
@@ -51,25 +51,26 @@ def refresh_user_investment_prices(user_id):
 
 @shared_task
 def update_chart_data_for_all_investments():
-    """Background task to update chart data for all investments"""
+    """Background task to sync shared chart data for every held symbol in batched downloads"""
     try:
-        investments = Investment.objects.all()
-        updated_count = 0
-        
-        for investment in investments:
-            try:
-                InvestmentService.update_chart_data(investment)
-                updated_count += 1
-            except Exception as e:
-                logger.error(f"Error updating chart data for {investment.symbol}: {e}")
-        
-        logger.info(f"Successfully updated chart data for {updated_count} investments")
-        return f"Updated chart data for {updated_count} investments"
+        stats = PriceHistoryService.backfill_pending()
+        return f"Updated chart data for {stats['symbols'] - stats['failed']} symbols in {stats['downloads']} downloads"
     except Exception as e:
         logger.error(f"Error in update_chart_data_for_all_investments task: {e}")
         raise
 
 
+@shared_task
+def backfill_chart_data_task():
+    """Background task to backfill chart history for newly held symbols"""
+    try:
+        stats = PriceHistoryService.backfill_pending(missing_only=True)
+        return f"Backfilled {stats['bars']} bars for {stats['symbols']} symbols"
+    except Exception as e:
+        logger.error(f"Error in backfill_chart_data_task: {e}")
+        raise
+
+
 @shared_task
 def generate_ai_analysis_for_all_investments():
     """Background task to generate AI analysis for all investments"""
@@ -95,35 +96,9 @@ def generate_ai_analysis_for_all_investments():
 def check_price_alerts():
     """Background task to check and trigger price alerts"""
     try:
-        alerts = PriceAlert.objects.filter(is_active=True, triggered_at__isnull=True)
-        triggered_count = 0
-        
-        for alert in alerts:
-            investment = alert.investment
-            current_price = investment.current_price
-            
-            should_trigger = False
-            
-            if alert.alert_type == 'above' and current_price >= alert.target_value:
-                should_trigger = True
-            elif alert.alert_type == 'below' and current_price <= alert.target_value:
-                should_trigger = True
-            elif alert.alert_type == 'change_percent':
-                change_percent = abs(investment.daily_change_percent)
-                if change_percent >= alert.target_value:
-                    should_trigger = True
-            
-            if should_trigger:
-                alert.triggered_at = timezone.now()
-                alert.is_active = False
-                alert.save()
-                triggered_count += 1
-                
-                # Here you could send notifications to users
-                logger.info(f"Price alert triggered for {alert.user.username}: {investment.symbol} {alert.alert_type} {alert.target_value}")
-        
-        logger.info(f"Checked price alerts, triggered {triggered_count} alerts")
-        return f"Triggered {triggered_count} price alerts"
+        triggered = PriceAlertEngine.evaluate()
+        logger.info(f"Checked price alerts, triggered {len(triggered)} alerts")
+        return f"Triggered {len(triggered)} price alerts"
     except Exception as e:
         logger.error(f"Error in check_price_alerts task: {e}")
         raise
@@ -152,42 +127,79 @@ def daily_investment_maintenance():
         raise
 
 
+@shared_task
+def record_portfolio_values_task():
+    """Nightly task storing every user's end-of-day portfolio value"""
+    try:
+        from .portfolio_history import PortfolioHistoryService
+        written = PortfolioHistoryService.record_daily()
+        return f"Recorded portfolio values for {written} users"
+    except Exception as e:
+        logger.error(f"Error in record_portfolio_values_task: {e}")
+        raise
+
+
+@shared_task
+def rebuild_portfolio_snapshots_task(batch_size=500):
+    """Recompute every user's PortfolioSnapshot from the holdings, catching drift from raw queryset writes"""
+    try:
+        from .portfolio_snapshot import PortfolioSnapshotService
+        user_ids = list(Investment.objects.values_list('user_id', flat=True).distinct().order_by('user_id'))
+        for start in range(0, len(user_ids), batch_size):
+            PortfolioSnapshotService.rebuild(user_ids[start:start + batch_size])
+        logger.info(f"Rebuilt portfolio snapshots for {len(user_ids)} users")
+        return f"Rebuilt portfolio snapshots for {len(user_ids)} users"
+    except Exception as e:
+        logger.error(f"Error in rebuild_portfolio_snapshots_task: {e}")
+        raise
+
+
 @shared_task
 def market_hours_price_refresh():
-    """Task to refresh prices during market hours (every 30 seconds)"""
+    """Refresh prices of every exchange that is currently open in one run.
+
+    Not on the beat schedule, which ticks each exchange separately through
+    refresh_exchange_prices_task (every MARKET_SESSION_REFRESH_INTERVAL seconds
+    while it is open, see MarketSessionSchedule); kept for manual and ad-hoc runs.
+    Held symbols whose exchange is open are fetched once each and only the
+    tick columns of changed holdings are written, in one bulk update.
+    """
     try:
-        # Only refresh prices for investments that have been updated recently
-        recent_investments = Investment.objects.filter(
-            last_updated__gte=timezone.now() - timezone.timedelta(hours=1)
-        )
+        updated = PriceTickWriter().refresh()
         
-        updated_count = 0
-        for investment in recent_investments:
-            try:
-                from .services import MarketDataService
-                current_price = MarketDataService.get_current_price(investment.symbol)
-                if current_price and current_price != investment.current_price:
-                    # Calculate daily change
-                    previous_price = investment.current_price
-                    daily_change, daily_change_percent = MarketDataService.calculate_daily_change(
-                        current_price, previous_price
-                    )
-                    
-                    investment.current_price = current_price
-                    investment.daily_change = daily_change
-                    investment.daily_change_percent = daily_change_percent
-                    investment.save()
-                    updated_count += 1
-            except Exception as e:
-                logger.error(f"Error updating price for {investment.symbol}: {e}")
-        
-        logger.info(f"Market hours refresh: updated {updated_count} investments")
-        return f"Market hours refresh: updated {updated_count} investments"
+        logger.info(f"Market hours refresh: updated {len(updated)} investments")
+        return f"Market hours refresh: updated {len(updated)} investments"
     except Exception as e:
         logger.error(f"Error in market_hours_price_refresh task: {e}")
         raise
 
 
+@shared_task
+def refresh_exchange_prices_task(exchange):
+    """Price ticks for the holdings on one exchange, paced by its trading calendar in beat"""
+    try:
+        symbols = symbols_on_exchange(exchange)
+        updated = PriceTickWriter().refresh(symbols)
+        
+        logger.info(f"{exchange} refresh: updated {len(updated)} investments from {len(symbols)} symbols")
+        return f"{exchange} refresh: updated {len(updated)} investments from {len(symbols)} symbols"
+    except Exception as e:
+        logger.error(f"Error in refresh_exchange_prices_task for {exchange}: {e}")
+        raise
+
+
+@shared_task
+def sync_symbol_chart_data_task(symbol, asset_type='stock'):
+    """Background task to sync the shared chart history of one symbol"""
+    try:
+        new_bars = PriceHistoryService.sync_symbol(symbol, asset_type)
+        logger.info(f"Synced {new_bars} new chart bars for {symbol}")
+        return f"Synced {new_bars} new chart bars for {symbol}"
+    except Exception as e:
+        logger.error(f"Error in sync_symbol_chart_data_task for {symbol}: {e}")
+        raise
+
+
 @shared_task
 def enrich_investment_data_task(investment_id):
     """Background task for data enrichment using BharatSM"""
@@ -205,99 +217,24 @@ def enrich_investment_data_task(investment_id):
 
 
 @shared_task
-def daily_price_and_data_update():
-    """Daily task to update prices and frontend display data for all tradeable assets using BharatSM"""
+def daily_price_and_data_update(exchange=None):
+    """Daily task to update prices and frontend display data for all tradeable assets.
+    
+    Each distinct (symbol, asset_type) is fetched once per run (BharatSM first,
+    Perplexity fallback) and fanned out to every holding in one bulk write.
+    Beat runs it once per exchange after that exchange's close; without an
+    exchange every holding is refreshed.
+    """
     try:
-        investments = Investment.objects.filter(asset_type__in=['stock', 'etf', 'crypto'])
-        updated_count = 0
-        bharatsm_success_count = 0
-        fallback_count = 0
-        
-        for investment in investments:
-            try:
-                if investment.asset_type in ['stock', 'etf']:
-                    # Use BharatSM for Indian stocks
-                    if final_bharatsm_service:
-                        data = get_bharatsm_frontend_data(investment.symbol)
-                        if data:
-                            # Update frontend display fields
-                            if 'volume' in data and data['volume']:
-                                investment.volume = data['volume']
-                            
-                            if 'market_cap' in data and data['market_cap']:
-                                investment.market_cap = Decimal(str(data['market_cap']))
-                            
-                            if 'pe_ratio' in data and data['pe_ratio']:
-                                investment.pe_ratio = Decimal(str(data['pe_ratio']))
-                            
-                            if 'growth_rate' in data and data['growth_rate']:
-                                investment.growth_rate = Decimal(str(data['growth_rate']))
-                            
-                            investment.save()
-                            updated_count += 1
-                            bharatsm_success_count += 1
-                            logger.info(f"Updated {investment.symbol} using BharatSM")
-                            continue
-                    
-                    # Fallback to Perplexity for stocks if BharatSM fails
-                    logger.warning(f"BharatSM failed for {investment.symbol}, using Perplexity fallback")
-                    fallback_data = PerplexityAPIService.get_fallback_data(investment.symbol)
-                    if fallback_data:
-                        if 'volume' in fallback_data and fallback_data['volume']:
-                            investment.volume = fallback_data['volume']
-                        
-                        if 'market_cap' in fallback_data and fallback_data['market_cap']:
-                            investment.market_cap = Decimal(str(fallback_data['market_cap']))
-                        
-                        if 'pe_ratio' in fallback_data and fallback_data['pe_ratio']:
-                            investment.pe_ratio = Decimal(str(fallback_data['pe_ratio']))
-                        
-                        if 'growth_rate' in fallback_data and fallback_data['growth_rate']:
-                            investment.growth_rate = Decimal(str(fallback_data['growth_rate']))
-                        
-                        if 'current_price' in fallback_data and fallback_data['current_price']:
-                            old_price = investment.current_price
-                            investment.current_price = Decimal(str(fallback_data['current_price']))
-                            investment.daily_change = investment.current_price - old_price
-                            if old_price > 0:
-                                investment.daily_change_percent = (investment.daily_change / old_price) * 100
-                        
-                        investment.save()
-                        updated_count += 1
-                        fallback_count += 1
-                        logger.info(f"Updated {investment.symbol} using Perplexity fallback")
-                
-                elif investment.asset_type == 'crypto':
-                    # Use Perplexity for crypto (BharatSM doesn't support crypto)
-                    data = PerplexityAPIService.get_fallback_data(investment.symbol)
-                    if data:
-                        if 'volume' in data and data['volume']:
-                            investment.volume = data['volume']
-                        
-                        if 'market_cap' in data and data['market_cap']:
-                            investment.market_cap = Decimal(str(data['market_cap']))
-                        
-                        if 'growth_rate' in data and data['growth_rate']:
-                            investment.growth_rate = Decimal(str(data['growth_rate']))
-                        
-                        if 'current_price' in data and data['current_price']:
-                            old_price = investment.current_price
-                            investment.current_price = Decimal(str(data['current_price']))
-                            investment.daily_change = investment.current_price - old_price
-                            investment.daily_change_percent = data.get('daily_change_percent', 0)
-                        
-                        investment.save()
-                        updated_count += 1
-                        fallback_count += 1
-                        logger.info(f"Updated crypto {investment.symbol} using Perplexity")
-                
-            except Exception as e:
-                logger.error(f"Failed to update data for {investment.symbol}: {e}")
+        stats = SymbolQuoteService.run_cycle(['stock', 'etf', 'crypto'], exchange)
         
-        logger.info(f"Daily data update completed: {updated_count} investments updated "
-                   f"(BharatSM: {bharatsm_success_count}, Fallback: {fallback_count})")
-        return f"Daily data update completed: {updated_count} investments updated " \
-               f"(BharatSM: {bharatsm_success_count}, Fallback: {fallback_count})"
+        scope = f"{exchange} " if exchange else ""
+        message = (f"Daily {scope}data update completed: {stats['updated']} investments updated "
+                   f"from {stats['distinct_symbols']} symbols across {stats['holdings']} holdings "
+                   f"(dedup ratio: {stats['dedup_ratio']}x, BharatSM: {stats['bharatsm']}, "
+                   f"Fallback: {stats['fallback']}, Failed: {stats['failed']})")
+        logger.info(message)
+        return message
     except Exception as e:
         logger.error(f"Error in daily_price_and_data_update: {e}")
         raise
@@ -316,12 +253,13 @@ def refresh_precious_metals_task():
         precious_metals = Investment.objects.filter(asset_type__in=['gold', 'silver'])
         updated_count = 0
         
-        for investment in precious_metals:
-            try:
-                if DataEnrichmentService.enrich_investment_data(investment.id):
-                    updated_count += 1
-            except Exception as e:
-                logger.error(f"Failed to update precious metal {investment.id}: {e}")
+        with CacheService.invalidation_batch():
+            for investment in precious_metals:
+                try:
+                    if DataEnrichmentService.enrich_investment_data(investment.id):
+                        updated_count += 1
+                except Exception as e:
+                    logger.error(f"Failed to update precious metal {investment.id}: {e}")
         
         logger.info(f"Precious metals update completed: {updated_count} investments updated")
         return f"Precious metals update completed: {updated_count} investments updated"
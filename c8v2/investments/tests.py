@@ -2,10 +2,11 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
-from .models import Investment, ChartData, PriceAlert
-from .services import InvestmentService, MarketDataService, AIInsightsService
+from .models import Investment, ChartData, PriceAlert, PriceHistory
+from .services import InvestmentService, MarketDataService, AIInsightsService, PriceHistoryService, BulkOperationService, CacheService
 from .data_enrichment_service import DataEnrichmentService
 from .perplexity_service import PerplexityAPIService
 from .asset_suggestions import AssetSuggestionService
@@ -166,6 +167,8 @@ class InvestmentAPITest(APITestCase):
 
 class InvestmentServiceTest(TestCase):
     def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
         self.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
@@ -199,6 +202,47 @@ class InvestmentServiceTest(TestCase):
         self.assertEqual(summary['total_value'], Decimal('11255.00'))
         self.assertIsInstance(summary['total_gain_loss'], Decimal)
 
+    def test_summary_cache_invalidated_after_commit(self):
+        investment = Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple Inc.', asset_type='stock',
+            quantity=Decimal('10'), average_purchase_price=Decimal('150.00'), current_price=Decimal('175.50')
+        )
+        self.assertEqual(InvestmentService.get_portfolio_summary(self.user)['total_value'], Decimal('1755.00'))
+
+        generation = CacheService.get_generation(self.user.id)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            investment.current_price = Decimal('200.00')
+            investment.save()
+        # Nothing is invalidated until the transaction commits
+        self.assertEqual(CacheService.get_generation(self.user.id), generation)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(CacheService.get_generation(self.user.id), generation + 1)
+        self.assertEqual(InvestmentService.get_portfolio_summary(self.user)['total_value'], Decimal('2000.00'))
+
+    def test_refresh_batch_bumps_generation_once_and_warms_summary(self):
+        from django.core.cache import cache
+        investments = [
+            Investment.objects.create(
+                user=self.user, symbol=symbol, name=symbol, asset_type='stock',
+                quantity=Decimal('1'), average_purchase_price=Decimal('100'), current_price=Decimal('100')
+            )
+            for symbol in ['AAPL', 'MSFT', 'GOOGL']
+        ]
+        generation = CacheService.get_generation(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CacheService.invalidation_batch():
+                for investment in investments:
+                    investment.current_price = Decimal('110')
+                    investment.save()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(CacheService.get_generation(self.user.id), generation + 1)
+        warmed = cache.get(CacheService.user_key('portfolio_summary', self.user.id))
+        self.assertEqual(warmed['total_value'], Decimal('330'))
+
 
 class ChartDataTest(TestCase):
     def setUp(self):
@@ -234,6 +278,356 @@ class ChartDataTest(TestCase):
         
         self.assertEqual(chart_data.investment, self.investment)
         self.assertEqual(chart_data.close_price, Decimal('175.50'))
+    
+    def _bars(self, *days):
+        from datetime import datetime
+        return [
+            {
+                'date': f'2026-03-{day:02d}', 'open': 100 + day, 'high': 110 + day, 'low': 90 + day,
+                'close': 105 + day, 'volume': 1000 * day,
+                'timestamp': int(datetime(2026, 3, day).timestamp())
+            }
+            for day in days
+        ]
+    
+    def test_update_chart_data_is_incremental(self):
+        from datetime import date
+        
+        PriceHistory.objects.all().delete()
+        with patch.object(MarketDataService, 'get_historical_data', return_value=self._bars(2, 3, 4)) as mock_fetch, \
+                patch.object(MarketDataService, 'last_session_date', return_value=date(2026, 3, 5)):
+            self.assertEqual(InvestmentService.update_chart_data(self.investment), 3)
+            mock_fetch.assert_called_once_with('AAPL', start=None)
+            
+            # Only bars from the last stored date on are fetched; the overlapping bar is refreshed
+            bars = self._bars(4, 5)
+            bars[0]['close'] = 200
+            mock_fetch.return_value = bars
+            self.assertEqual(InvestmentService.update_chart_data(self.investment), 1)
+            self.assertEqual(mock_fetch.call_args.kwargs['start'], date(2026, 3, 4))
+            
+            # Current for the latest session: no fetch at all
+            self.assertEqual(InvestmentService.update_chart_data(self.investment), 0)
+            self.assertEqual(mock_fetch.call_count, 2)
+        
+        self.assertEqual(PriceHistory.objects.filter(symbol='AAPL').count(), 4)
+        self.assertEqual(PriceHistory.objects.get(symbol='AAPL', date=date(2026, 3, 4)).close, 200)
+    
+    def test_holdings_share_symbol_history(self):
+        from datetime import date
+        from .serializers import InvestmentSerializer
+        
+        PriceHistory.objects.all().delete()
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        with patch.object(MarketDataService, 'get_historical_data', return_value=self._bars(2, 3)) as mock_fetch, \
+                patch.object(MarketDataService, 'last_session_date', return_value=date(2026, 3, 3)):
+            other = Investment.objects.create(
+                user=other_user, symbol='AAPL', name='Apple Inc.', asset_type='stock',
+                quantity=Decimal('1'), average_purchase_price=Decimal('150.00')
+            )
+            InvestmentService.update_chart_data(self.investment)
+            InvestmentService.update_chart_data(other)
+        
+        # Stored and fetched once per symbol, not per holding
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(PriceHistory.objects.count(), 2)
+        
+        with self.assertNumQueries(1):
+            data = InvestmentSerializer([self.investment, other], many=True).data
+        for item in data:
+            self.assertEqual([bar['date'] for bar in item['chart_data']], ['2026-03-03', '2026-03-02'])
+            self.assertEqual(item['chart_data'][0]['close_price'], '108.0000')
+
+
+class ChartResamplingTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.bars = []
+        for day in range(2, 14):  # 2026-03-02 (Mon) .. 2026-03-13 (Fri), weekdays only
+            if day in (7, 8):
+                continue
+            self.bars.append({
+                'date': f'2026-03-{day:02d}', 'open': 100 + day, 'high': 110 + day, 'low': 90 - day,
+                'close': 105 + day, 'volume': 10 * day,
+                'timestamp': int(datetime(2026, 3, day, tzinfo=dt_timezone.utc).timestamp())
+            })
+    
+    def _sync(self):
+        from datetime import date
+        with patch.object(MarketDataService, 'get_historical_data', return_value=self.bars), \
+                patch.object(MarketDataService, 'last_session_date', return_value=date(2026, 3, 13)):
+            return PriceHistoryService.sync_symbol('AAPL')
+    
+    def test_weekly_candles_aggregate_ohlcv(self):
+        from .chart_resampling import ChartResampler, resample_ohlcv
+        
+        self._sync()
+        frame = ChartResampler.load_frame('AAPL', datetime(2026, 3, 1).date())
+        candles = ChartResampler.to_points(resample_ohlcv(frame, 'W-FRI'))
+        
+        self.assertEqual(len(candles), 2)
+        first = candles[0]
+        self.assertEqual(first['date'], '2026-03-02')
+        self.assertEqual(first['open_price'], '102.0000')   # first open
+        self.assertEqual(first['high_price'], '116.0000')   # max high
+        self.assertEqual(first['low_price'], '84.0000')     # min low
+        self.assertEqual(first['close_price'], '111.0000')  # last close
+        self.assertEqual(first['volume'], 10 * (2 + 3 + 4 + 5 + 6))
+        self.assertEqual(candles[1]['date'], '2026-03-09')
+    
+    def test_series_is_cached_until_bars_change(self):
+        from .chart_resampling import ChartResampler
+        
+        with patch('investments.chart_resampling.timezone.now', return_value=datetime(2026, 3, 14, tzinfo=dt_timezone.utc)):
+            self._sync()
+            self.assertEqual(len(ChartResampler.get_series('AAPL', 'daily')), 10)
+            with self.assertNumQueries(0):
+                ChartResampler.get_series('AAPL', 'daily')
+            
+            self.bars = self.bars[-1:] + [dict(self.bars[-1], date='2026-03-16', timestamp=self.bars[-1]['timestamp'] + 3 * 86400)]
+            with patch.object(MarketDataService, 'last_session_date', return_value=datetime(2026, 3, 16).date()), \
+                    patch.object(MarketDataService, 'get_historical_data', return_value=self.bars):
+                PriceHistoryService.sync_symbol('AAPL')
+            self.assertEqual(len(ChartResampler.get_series('AAPL', 'daily')), 11)
+    
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        import numpy as np
+        from .chart_resampling import lttb
+        
+        x = np.arange(100)
+        y = np.zeros(100)
+        y[37] = 50
+        indices = lttb(x, y, 10)
+        
+        self.assertEqual(len(indices), 10)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 99)
+        self.assertIn(37, indices)
+        self.assertEqual(list(lttb(x, y, 200)), list(range(100)))
+
+
+class ChartDataAPITest(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        with patch.object(InvestmentService, 'update_chart_data', return_value=0):
+            self.investment = Investment.objects.create(
+                user=self.user, symbol='AAPL', name='Apple Inc.', asset_type='stock',
+                quantity=Decimal('10'), average_purchase_price=Decimal('150.00')
+            )
+        today = datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        PriceHistory.objects.create(
+            symbol='AAPL', interval='1d', ts=today, date=today.date(),
+            open=100, high=110, low=90, close=105, volume=1000
+        )
+        self.url = f'/api/investments/{self.investment.id}/chart_data/'
+    
+    @patch('investments.tasks.sync_symbol_chart_data_task.delay')
+    @patch.object(MarketDataService, 'get_historical_data')
+    def test_serves_stored_data_with_validators(self, mock_fetch, mock_delay):
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response['X-Chart-Data-Stale'], 'false')
+        self.assertNotIn('Last-Modified', response)
+        mock_fetch.assert_not_called()
+        mock_delay.assert_not_called()
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    @patch('investments.tasks.sync_symbol_chart_data_task.delay')
+    def test_bar_rewritten_in_place_is_not_served_as_not_modified(self, mock_delay):
+        from .chart_resampling import ChartResampler
+        etag = self.client.get(self.url)['ETag']
+        
+        # An intraday sync updates today's bar without moving its timestamp
+        PriceHistory.objects.filter(symbol='AAPL').update(close=107)
+        ChartResampler.invalidate('AAPL')
+        
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    @patch('investments.tasks.sync_symbol_chart_data_task.delay')
+    @patch.object(MarketDataService, 'get_historical_data')
+    def test_stale_series_refreshes_once_in_background(self, mock_fetch, mock_delay):
+        from datetime import timedelta
+        with patch.object(MarketDataService, 'last_session_date',
+                          return_value=datetime.now(dt_timezone.utc).date() + timedelta(days=1)):
+            for _ in range(3):
+                response = self.client.get(self.url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response['X-Chart-Data-Stale'], 'true')
+        
+        mock_fetch.assert_not_called()
+        mock_delay.assert_called_once_with('AAPL', 'stock')
+
+
+class ChartBackfillTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+    
+    def _create(self, symbol, asset_type='stock'):
+        return Investment.objects.create(
+            user=self.user, symbol=symbol, name=symbol, asset_type=asset_type,
+            quantity=Decimal('1'), average_purchase_price=Decimal('100.00')
+        )
+    
+    @patch('investments.tasks.backfill_chart_data_task.apply_async')
+    @patch.object(MarketDataService, 'get_historical_data')
+    def test_new_holdings_queue_one_batched_run(self, mock_fetch, mock_apply):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create('AAPL')
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create('MSFT')
+        with self.captureOnCommitCallbacks(execute=True):
+            BulkOperationService.bulk_create_investments(self.user, [
+                {'symbol': 'NVDA', 'name': 'NVIDIA', 'asset_type': 'stock',
+                 'quantity': 1, 'average_purchase_price': 100},
+            ])
+        
+        # Creation never waits on yfinance, and the burst shares one scheduled run
+        mock_fetch.assert_not_called()
+        mock_apply.assert_called_once()
+    
+    def test_backfill_groups_symbols_into_multi_ticker_downloads(self):
+        from datetime import date
+        for symbol, asset_type in [('AAPL', 'stock'), ('MSFT', 'stock'), ('RELIANCE.NS', 'stock'),
+                                   ('BTC-USD', 'crypto'), ('ETH-USD', 'crypto')]:
+            self._create(symbol, asset_type)
+        
+        def download(symbols, start=None):
+            return {
+                symbol: [{'date': '2026-03-02', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+                          'volume': 10, 'timestamp': int(datetime(2026, 3, 2, tzinfo=dt_timezone.utc).timestamp())}]
+                for symbol in symbols
+            }
+        
+        with patch.object(MarketDataService, 'get_historical_data_batch', side_effect=download) as mock_batch, \
+                patch.object(MarketDataService, 'last_session_date', return_value=date(2026, 3, 2)):
+            stats = PriceHistoryService.backfill_pending()
+            
+            # US stocks, NSE stocks and crypto each get one download
+            self.assertEqual(mock_batch.call_count, 3)
+            self.assertEqual(sorted(sorted(c.args[0]) for c in mock_batch.call_args_list),
+                             [['AAPL', 'MSFT'], ['BTC-USD', 'ETH-USD'], ['RELIANCE.NS']])
+            self.assertEqual(stats['bars'], 5)
+            self.assertEqual(PriceHistory.objects.get(symbol='RELIANCE.NS').exchange, 'NSE')
+            
+            # Everything is current now: nothing left to fetch
+            self.assertEqual(PriceHistoryService.backfill_pending()['downloads'], 0)
+            self.assertEqual(mock_batch.call_count, 3)
+    
+    def test_post_create_backfill_skips_stored_series(self):
+        from datetime import date
+        from .tasks import backfill_chart_data_task
+        self._create('AAPL')
+        PriceHistory.objects.create(
+            symbol='AAPL', interval='1d', ts=datetime(2026, 2, 27, tzinfo=dt_timezone.utc), date=date(2026, 2, 27),
+            open=100, high=110, low=90, close=105, volume=1000
+        )
+        self._create('MSFT')
+        
+        with patch.object(MarketDataService, 'get_historical_data_batch', return_value={}) as mock_batch, \
+                patch.object(MarketDataService, 'last_session_date', return_value=date(2026, 3, 2)):
+            backfill_chart_data_task()
+        
+        # AAPL is stale but already has a series: the nightly sync tops it up
+        mock_batch.assert_called_once()
+        self.assertEqual(mock_batch.call_args.args[0], ['MSFT'])
+
+
+class PortfolioHistoryTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def test_nightly_job_covers_all_users_in_one_aggregate(self):
+        from datetime import date
+        from .models import PortfolioValueHistory
+        from .portfolio_history import PortfolioHistoryService
+        
+        Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175
+        )
+        Investment.objects.create(
+            user=self.user, name='Gold', asset_type='gold', unit='grams',
+            quantity=100, average_purchase_price=60, current_price=65
+        )
+        Investment.objects.create(
+            user=self.other, symbol='BTC', name='Bitcoin', asset_type='crypto',
+            quantity=1, average_purchase_price=50000, current_price=60000
+        )
+        
+        # One aggregate read and one batched upsert, whatever the number of users
+        with self.assertNumQueries(2):
+            written = PortfolioHistoryService.record_daily(date(2026, 3, 2))
+        self.assertEqual(written, 2)
+        
+        row = PortfolioValueHistory.objects.get(user=self.user, date=date(2026, 3, 2))
+        self.assertEqual(row.total_value, Decimal('8250.00'))
+        self.assertEqual(row.total_cost, Decimal('7500.00'))
+        self.assertEqual(row.by_type, {'gold': '6500.00', 'stock': '1750.00'})
+        
+        # Re-running the same day replaces the rows
+        PortfolioHistoryService.record_daily(date(2026, 3, 2))
+        self.assertEqual(PortfolioValueHistory.objects.count(), 2)
+    
+    def test_history_ranges_are_downsampled(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import PortfolioValueHistory
+        
+        today = timezone.now().date()
+        PortfolioValueHistory.objects.bulk_create([
+            PortfolioValueHistory(
+                user=self.user, date=today - timedelta(days=i),
+                total_value=Decimal(1000 + i), total_cost=Decimal('900'), by_type={'stock': str(1000 + i)}
+            )
+            for i in range(400)
+        ])
+        
+        response = self.client.get('/api/investments/portfolio_history/', {'range': '1m'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['range'], '1M')
+        self.assertEqual(len(response.data['points']), 31)
+        self.assertEqual(response.data['points'][-1]['date'], today.isoformat())
+        
+        response = self.client.get('/api/investments/portfolio_history/', {'range': 'ALL', 'points': '50'})
+        points = response.data['points']
+        self.assertEqual(len(points), 50)
+        self.assertEqual(points[0]['date'], (today - timedelta(days=399)).isoformat())
+        self.assertEqual(points[-1]['by_type'], {'stock': 1000.0})
+        
+        response = self.client.get('/api/investments/portfolio_history/', {'range': '5Y'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class PriceAlertTest(TestCase):
@@ -266,6 +660,121 @@ class PriceAlertTest(TestCase):
         self.assertEqual(alert.investment, self.investment)
         self.assertEqual(alert.alert_type, 'above')
         self.assertTrue(alert.is_active)
+    
+    def test_engine_triggers_every_alert_type_in_one_update(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .alert_engine import PriceAlertEngine
+        
+        self.investment.daily_change_percent = Decimal('-3.0')
+        self.investment.save()
+        
+        def alert(alert_type, target, **kwargs):
+            return PriceAlert.objects.create(
+                user=self.user, investment=self.investment, alert_type=alert_type,
+                target_value=Decimal(target), **kwargs
+            )
+        
+        fired = [alert('above', '170'), alert('below', '180'), alert('change_percent', '2')]
+        quiet = [alert('above', '200'), alert('below', '150'), alert('change_percent', '5'),
+                 alert('above', '100', is_active=False)]
+        
+        with CaptureQueriesContext(connection) as queries:
+            triggered = PriceAlertEngine.evaluate()
+        
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual({a.id for a in triggered}, {a.id for a in fired})
+        self.assertEqual(triggered[0].investment.symbol, 'AAPL')
+        for a in fired:
+            a.refresh_from_db()
+            self.assertFalse(a.is_active)
+            self.assertIsNotNone(a.triggered_at)
+        for a in quiet:
+            a.refresh_from_db()
+            self.assertIsNone(a.triggered_at)
+        
+        # Triggered alerts are not triggered again
+        self.assertEqual(PriceAlertEngine.evaluate(), [])
+    
+    def test_alerts_evaluated_when_price_batch_lands(self):
+        alert = PriceAlert.objects.create(
+            user=self.user, investment=self.investment, alert_type='above', target_value=Decimal('190')
+        )
+        BulkOperationService.bulk_update_prices([{'id': self.investment.id, 'current_price': '195'}])
+        
+        alert.refresh_from_db()
+        self.assertFalse(alert.is_active)
+        self.assertIsNotNone(alert.triggered_at)
+
+    def test_threshold_index_resolves_crossed_alerts(self):
+        from .alert_index import AlertThresholdIndex
+        
+        index = AlertThresholdIndex()
+        index.build([
+            (1, 'aapl', 'above', 170), (2, 'AAPL', 'above', 200),
+            (3, 'AAPL', 'below', 180), (4, 'AAPL', 'below', 150),
+            (5, 'AAPL', 'change_percent', 2), (6, 'MSFT', 'above', 1),
+        ])
+        self.assertEqual(sorted(index.resolve('AAPL', 175, -3)), [1, 3, 5])
+        self.assertEqual(sorted(index.resolve('AAPL', 200, 1)), [1, 2])
+        
+        index.add(4, 'AAPL', 'below', 190)
+        index.discard([1])
+        self.assertEqual(sorted(index.resolve('AAPL', 175)), [3, 4])
+        self.assertEqual(index.resolve('GOOGL', 175, 10), [])
+
+    def test_threshold_index_applies_changes_from_other_processes(self):
+        from django.core.cache import cache
+        from .alert_index import AlertThresholdIndex
+        
+        cache.clear()
+        PriceAlert.objects.create(
+            user=self.user, investment=self.investment, alert_type='above', target_value=Decimal('190')
+        )
+        worker = AlertThresholdIndex()
+        worker.ensure_current()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            alert = PriceAlert.objects.create(
+                user=self.user, investment=self.investment, alert_type='below', target_value=Decimal('160')
+            )
+        # The worker applies the logged change instead of reloading the table
+        with patch.object(worker, 'reload') as mock_reload:
+            self.assertEqual(worker.resolve_many({'AAPL': (Decimal('155'), None)}), {alert.id})
+            with self.captureOnCommitCallbacks(execute=True):
+                alert.delete()
+            self.assertEqual(worker.resolve_many({'AAPL': (Decimal('155'), None)}), set())
+        mock_reload.assert_not_called()
+        
+        # A gap in the log (an evicted entry) falls back to a full reload
+        cache.delete(worker.CHANGE_KEY.format(seq=worker._seq - 1))
+        worker._seq -= 2
+        with patch.object(worker, 'reload') as mock_reload:
+            worker.ensure_current()
+        mock_reload.assert_called_once()
+    
+    def test_ticks_evaluated_through_threshold_index(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .alert_engine import PriceAlertEngine
+        from .alert_index import alert_index
+        
+        alert = PriceAlert.objects.create(
+            user=self.user, investment=self.investment, alert_type='below', target_value=Decimal('160')
+        )
+        alert_index.reload()
+        
+        # A tick that crosses no threshold does not query the alerts
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(PriceAlertEngine.evaluate_ticks({'AAPL': (Decimal('170'), None)}), [])
+        self.assertFalse([q for q in queries.captured_queries if 'investments_pricealert' in q['sql']])
+        
+        self.investment.current_price = Decimal('155')
+        self.investment.save()
+        triggered = PriceAlertEngine.evaluate_ticks({'AAPL': (Decimal('155'), None)})
+        self.assertEqual([a.id for a in triggered], [alert.id])
+        self.assertEqual(alert_index.resolve('AAPL', Decimal('150')), [])
 
 
 class DataEnrichmentServiceTest(TestCase):
@@ -334,13 +843,679 @@ class DataEnrichmentServiceTest(TestCase):
             quantity=100, average_purchase_price=60, current_price=60
         )
         
-        with patch.object(DataEnrichmentService, 'enrich_investment_data', return_value=True):
+        with patch.object(DataEnrichmentService, 'fetch_market_data', return_value={'current_price': 160}):
             updated = DataEnrichmentService.refresh_investment_prices(user=self.user)
             self.assertEqual(len(updated), 1)
+    
+    def test_refresh_investment_prices_fetches_each_symbol_once(self):
+        other_user = User.objects.create_user(
+            username='otheruser', email='other@example.com', password='testpass123'
+        )
+        for user in [self.user, other_user]:
+            Investment.objects.create(
+                user=user, symbol='RELIANCE', name='Reliance', asset_type='stock',
+                quantity=10, average_purchase_price=2500, current_price=2500
+            )
+        
+        with patch.object(DataEnrichmentService, 'fetch_market_data',
+                          return_value={'current_price': 2600, 'pe_ratio': 25.5}) as mock_fetch:
+            updated = DataEnrichmentService.refresh_investment_prices()
+        
+        mock_fetch.assert_called_once_with('RELIANCE', 'stock')
+        self.assertEqual(len(updated), 2)
+        for investment in Investment.objects.filter(symbol='RELIANCE'):
+            self.assertEqual(investment.current_price, Decimal('2600'))
+            self.assertEqual(investment.total_value, Decimal('26000'))
+            self.assertEqual(investment.pe_ratio, Decimal('25.50'))
+            self.assertTrue(investment.data_enriched)
+    
+    def test_failed_refresh_keeps_enriched_state(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        investment = Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=150
+        )
+        long_ago = timezone.now() - timedelta(days=1)
+        Investment.objects.filter(id=investment.id).update(data_enriched=True, last_updated=long_ago)
+        
+        with patch.object(DataEnrichmentService, 'prefetch_market_data', return_value={}), \
+             patch.object(DataEnrichmentService, 'fetch_market_data', return_value={}):
+            updated = DataEnrichmentService.refresh_investment_prices()
+        
+        self.assertEqual(updated, [])
+        investment.refresh_from_db()
+        self.assertTrue(investment.data_enriched)
+        self.assertTrue(investment.enrichment_attempted)
+        self.assertEqual(investment.last_updated, long_ago)
+
+
+class RateLimitTest(TestCase):
+    def test_token_bucket_burst_then_wait(self):
+        from .rate_limits import TokenBucket
+        
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+    
+    def test_provider_limiter_uses_settings_overrides(self):
+        from .rate_limits import ProviderLimiterRegistry
+        
+        with self.settings(MARKET_DATA_PROVIDER_LIMITS={'finnhub': {'concurrency': 1}}):
+            limiter = ProviderLimiterRegistry().get('finnhub')
+        self.assertEqual(limiter.concurrency, 1)
+        with limiter.slot(timeout=1):
+            pass
+
+
+class CircuitBreakerTest(TestCase):
+    def setUp(self):
+        from .circuit_breaker import provider_breakers
+        self.breakers = provider_breakers
+        self.breakers.reset()
+        self.addCleanup(self.breakers.reset)
+    
+    def test_failures_open_circuit_and_demote_provider(self):
+        for _ in range(5):
+            self.breakers.record_failure('finnhub', 0.1)
+        
+        self.assertEqual(self.breakers.get_state('finnhub'), 'open')
+        self.assertFalse(self.breakers.allow('finnhub'))
+        self.assertEqual(self.breakers.order(['finnhub', 'fmp', 'perplexity']), ['fmp', 'perplexity', 'finnhub'])
+    
+    def test_half_open_allows_single_probe(self):
+        with self.settings(MARKET_DATA_CIRCUIT_BREAKER={'cooldown': 0}):
+            for _ in range(5):
+                self.breakers.record_failure('fmp', 0.1)
+            self.assertEqual(self.breakers.get_state('fmp'), 'half_open')
+            self.assertTrue(self.breakers.allow('fmp'))
+            self.assertFalse(self.breakers.allow('fmp'))
+            
+            self.breakers.record_success('fmp', 0.1)
+            self.assertEqual(self.breakers.get_state('fmp'), 'closed')
+    
+    def test_outcomes_from_all_workers_are_counted(self):
+        from .circuit_breaker import CircuitBreakerRegistry
+        
+        # Separate registries stand in for separate worker processes sharing the cache
+        workers = [CircuitBreakerRegistry(), CircuitBreakerRegistry()]
+        for i in range(3):
+            workers[i % 2].record_failure('finnhub', 0.2)
+            workers[(i + 1) % 2].record_success('finnhub', 0.2)
+            workers[(i + 1) % 2].record_success('finnhub', 0.2)
+        
+        health = self.breakers.get_health('finnhub')
+        self.assertEqual(health['state'], 'closed')
+        self.assertEqual(health['calls'], 9)
+        self.assertEqual(health['failures'], 3)
+        self.assertAlmostEqual(health['avg_latency'], 0.2)
+        
+        for i in range(3):
+            workers[i % 2].record_failure('finnhub', 0.2)
+        self.assertEqual(self.breakers.get_state('finnhub'), 'open')
+    
+    def test_open_provider_is_skipped_in_fallback_chain(self):
+        from .bharatsm_service import FinalOptimizedBharatSMService
+        
+        service = FinalOptimizedBharatSMService()
+        service.finnhub_service = MagicMock()
+        service.finnhub_service.get_stock_data.side_effect = Exception('timeout')
+        service.fmp_service = MagicMock()
+        service.fmp_service.get_stock_data.return_value = {'volume': '1M', 'market_cap': 100}
+        service.perplexity_service = MagicMock()
+        service.perplexity_service.is_available.return_value = False
+        
+        for _ in range(10):
+            self.assertEqual(service._get_us_stock_data('AAPL')['volume'], '1M')
+        
+        # Finnhub is only tried until its circuit opens
+        self.assertEqual(service.finnhub_service.get_stock_data.call_count, 5)
+        self.assertEqual(service.fmp_service.get_stock_data.call_count, 10)
+    
+    def test_misses_do_not_open_circuit(self):
+        import requests
+        from .bharatsm_service import FinalOptimizedBharatSMService
+        
+        service = FinalOptimizedBharatSMService()
+        service.bharatsm_available = False
+        service.perplexity_service = MagicMock()
+        service.perplexity_service.is_available.return_value = False
+        service.fmp_service = MagicMock()
+        service.fmp_service.get_stock_data.return_value = {}
+        
+        # FMP not covering NSE symbols is a miss, not an outage
+        for _ in range(10):
+            service._get_indian_stock_data('RELIANCE')
+        self.assertEqual(self.breakers.get_state('fmp'), 'closed')
+        self.assertEqual(self.breakers.get_health('fmp')['failures'], 0)
+        
+        error = requests.HTTPError(response=MagicMock(status_code=503))
+        service.fmp_service.get_stock_data.side_effect = error
+        for _ in range(10):
+            service._get_indian_stock_data('RELIANCE')
+        self.assertEqual(self.breakers.get_state('fmp'), 'open')
+    
+    def test_probe_fails_open_without_cache(self):
+        with self.settings(MARKET_DATA_CIRCUIT_BREAKER={'cooldown': 0}):
+            for _ in range(5):
+                self.breakers.record_failure('fmp', 0.1)
+            with patch('investments.circuit_breaker.cache.add', side_effect=ConnectionError('cache down')):
+                self.assertTrue(self.breakers.allow('fmp'))
+
+
+class PooledHTTPClientTest(TestCase):
+    def setUp(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+    
+    def test_sessions_reuse_connections_per_provider(self):
+        from C8V2.http_client import HTTPClientRegistry
+        
+        clients = HTTPClientRegistry()
+        self.addCleanup(clients.close_all)
+        for _ in range(5):
+            self.assertEqual(clients.get('fmp', self.url).text, 'ok')
+        
+        self.assertIs(clients.session('fmp'), clients.session('fmp'))
+        stats = clients.get_stats()['fmp']
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reuse_ratio'], 0.8)
+    
+    def test_provider_config_overrides(self):
+        from C8V2.http_client import HTTPClientRegistry
+        
+        with self.settings(HTTP_CLIENT_PROVIDERS={'serper': {'timeout': 3, 'retries': 0}}):
+            adapter = HTTPClientRegistry().build_adapter('serper')
+        self.assertEqual(adapter.timeout, 3)
+        self.assertEqual(adapter.max_retries.total, 0)
+
+
+class FMPBatchQuoteTest(TestCase):
+    def setUp(self):
+        from .circuit_breaker import provider_breakers
+        provider_breakers.reset()
+        self.addCleanup(provider_breakers.reset)
+    
+    def _fake_get(self, provider, url):
+        endpoint, symbols = url.split('/api/v3/')[1].split('?')[0].split('/')
+        response = MagicMock()
+        response.raise_for_status.return_value = None
+        if endpoint == 'quote':
+            response.json.return_value = [
+                {'symbol': symbol, 'price': 100 + i, 'volume': 2_000_000, 'pe': 20, 'changesPercentage': 1.5}
+                for i, symbol in enumerate(symbols.split(',')) if symbol != 'DOGEUSD'
+            ]
+        else:
+            response.json.return_value = [
+                {'symbol': symbol, 'companyName': f'{symbol} Inc', 'mktCap': 10 ** 9}
+                for symbol in symbols.split(',')
+            ]
+        return response
+    
+    @patch('investments.bharatsm_service.http_clients.get')
+    def test_stock_batch_chunks_requests(self, mock_get):
+        from .bharatsm_service import FMPAPIService
+        
+        mock_get.side_effect = self._fake_get
+        symbols = [f'US{i}' for i in range(250)]
+        with self.settings(FMP_API_KEY='test', FMP_BATCH_SIZE=100):
+            results = FMPAPIService.get_stock_data_batch(symbols)
+        
+        self.assertEqual(len(results), 250)
+        self.assertEqual(results['US0']['company_name'], 'US0 Inc')
+        self.assertEqual(results['US1']['current_price'], 101)
+        # 3 quote chunks + 3 profile chunks instead of 500 calls
+        self.assertEqual(mock_get.call_count, 6)
+    
+    @patch('investments.bharatsm_service.http_clients.get')
+    def test_crypto_batch_retries_only_missing_formats(self, mock_get):
+        from .bharatsm_service import FMPAPIService
+        
+        mock_get.side_effect = self._fake_get
+        with self.settings(FMP_API_KEY='test'):
+            results = FMPAPIService.get_crypto_data_batch(['BTC', 'ETH', 'DOGE'])
+        
+        self.assertEqual(set(results), {'BTC', 'ETH', 'DOGE'})
+        self.assertEqual(results['BTC']['exchange'], 'CRYPTO')
+        self.assertEqual(mock_get.call_count, 2)
+    
+    def test_refresh_uses_batch_path_for_us_stocks(self):
+        user = User.objects.create_user(username='batch', email='batch@example.com', password='testpass123')
+        for symbol in ['AAPL', 'MSFT']:
+            Investment.objects.create(
+                user=user, symbol=symbol, name=symbol, asset_type='stock',
+                quantity=1, average_purchase_price=100, current_price=100
+            )
+        batch = {symbol: {'current_price': 150, 'company_name': symbol} for symbol in ['AAPL', 'MSFT']}
+        
+        with self.settings(FMP_API_KEY='test'), \
+                patch.object(DataEnrichmentService, '_get_route', return_value='us_stock'), \
+                patch('investments.data_enrichment_service.FMPAPIService.get_stock_data_batch',
+                      return_value=batch) as mock_batch, \
+                patch.object(DataEnrichmentService, 'fetch_market_data') as mock_fetch:
+            updated = DataEnrichmentService.refresh_investment_prices(user=user)
+        
+        self.assertEqual(len(updated), 2)
+        mock_batch.assert_called_once()
+        mock_fetch.assert_not_called()
+        self.assertEqual(Investment.objects.get(symbol='AAPL').current_price, Decimal('150'))
+
+
+class AsyncPriceAggregatorTest(TestCase):
+    def setUp(self):
+        from rest_framework.authtoken.models import Token
+        
+        self.user = User.objects.create_user(username='watcher', email='watcher@example.com', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=1, average_purchase_price=100, current_price=200
+        )
+    
+    def _slow_price(self, symbol):
+        import time
+        time.sleep(0.2 if symbol != 'SLOW' else 3)
+        return Decimal('210')
+    
+    def test_fetches_concurrently_within_deadline(self):
+        import time
+        from asgiref.sync import async_to_sync
+        from .price_aggregator import AsyncPriceAggregator
+        
+        aggregator = AsyncPriceAggregator(fetch=self._slow_price, deadline=1, concurrency=30)
+        symbols = ['AAPL'] + [f'SYM{i}' for i in range(20)] + ['SLOW']
+        started = time.monotonic()
+        updates = async_to_sync(aggregator.get_price_updates)(self.user, symbols)
+        
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(updates), 21)
+        self.assertNotIn('SLOW', [u['symbol'] for u in updates])
+        self.assertEqual(updates[0]['symbol'], 'AAPL')
+        self.assertEqual(updates[0]['change'], 10.0)
+        self.assertEqual(updates[0]['changePercent'], 5.0)
+    
+    @patch('investments.price_aggregator.MarketDataService.get_current_price', return_value=Decimal('220'))
+    def test_real_time_prices_endpoint(self, mock_price):
+        url = '/api/investments/real_time_prices/'
+        
+        response = self.client.post(url, {'symbols': ['AAPL']}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        
+        response = self.client.post(
+            url, {'symbols': ['AAPL']}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['price'], 220.0)
+        self.assertEqual(response.json()[0]['change'], 20.0)
+    
+    @patch('investments.price_aggregator.MarketDataService.get_current_price', return_value=Decimal('220'))
+    def test_real_time_prices_endpoint_is_throttled(self, mock_price):
+        from django.core.cache import cache
+        from rest_framework.throttling import UserRateThrottle
+        
+        cache.clear()
+        url = '/api/investments/real_time_prices/'
+        with patch.object(UserRateThrottle, 'get_rate', return_value='1/minute'):
+            statuses = [
+                self.client.post(
+                    url, {'symbols': ['AAPL']}, content_type='application/json',
+                    HTTP_AUTHORIZATION=f'Token {self.token.key}'
+                ).status_code
+                for _ in range(2)
+            ]
+        self.assertEqual(statuses, [200, 429])
+
+
+class SymbolQuoteServiceTest(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+        for user in self.users:
+            Investment.objects.create(
+                user=user, symbol='RELIANCE', name='Reliance', asset_type='stock',
+                quantity=10, average_purchase_price=2500, current_price=2500
+            )
+        Investment.objects.create(
+            user=self.users[0], symbol='BTC', name='Bitcoin', asset_type='crypto',
+            quantity=1, average_purchase_price=50000, current_price=50000
+        )
+    
+    @patch('investments.services.MarketDataService.get_historical_data_batch', return_value={})
+    def test_run_cycle_fetches_each_symbol_once(self, mock_bars):
+        from .quote_service import SymbolQuoteService
+        from .models import SymbolQuote
+        
+        def fake_fetch(symbol, asset_type):
+            if symbol == 'RELIANCE':
+                return {'data': {'volume': '1.2Cr', 'pe_ratio': 25.5}, 'source': 'bharatsm'}
+            return {'data': {'current_price': 55000, 'daily_change_percent': 2.5}, 'source': 'perplexity'}
+        
+        with patch.object(SymbolQuoteService, 'fetch_quote', side_effect=fake_fetch) as mock_fetch:
+            stats = SymbolQuoteService.run_cycle()
+        
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(stats['holdings'], 4)
+        self.assertEqual(stats['distinct_symbols'], 2)
+        self.assertEqual(stats['dedup_ratio'], 2.0)
+        self.assertEqual(stats['updated'], 4)
+        self.assertEqual(stats['bharatsm'], 1)
+        self.assertEqual(stats['fallback'], 1)
+        self.assertEqual(SymbolQuote.objects.count(), 2)
+        
+        for investment in Investment.objects.filter(symbol='RELIANCE'):
+            self.assertEqual(investment.volume, '1.2Cr')
+            self.assertEqual(investment.pe_ratio, Decimal('25.50'))
+        
+        bitcoin = Investment.objects.get(symbol='BTC')
+        self.assertEqual(bitcoin.current_price, Decimal('55000'))
+        self.assertEqual(bitcoin.daily_change, Decimal('5000'))
+        self.assertEqual(bitcoin.total_value, Decimal('55000'))
+    
+    @patch('investments.perplexity_service.PerplexityAPIService.get_fallback_data')
+    def test_fetch_quote_shares_enrichment_dispatch(self, mock_fallback):
+        from .quote_service import SymbolQuoteService
+        
+        mock_fallback.return_value = {'current_price': 55000}
+        self.assertEqual(
+            SymbolQuoteService.fetch_quote('BTC', 'crypto'),
+            {'data': DataEnrichmentService.fetch_market_data('BTC', 'crypto'), 'source': 'perplexity'}
+        )
+        mock_fallback.return_value = None
+        self.assertEqual(SymbolQuoteService.fetch_quote('BTC', 'crypto'), {})
+    
+    @patch('investments.services.MarketDataService.get_historical_data_batch')
+    def test_quote_cycle_keeps_change_against_previous_close(self, mock_bars):
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .models import SymbolQuote
+        from .quote_service import SymbolQuoteService
+        from .tick_writer import PriceTickWriter
+        
+        mock_bars.return_value = {'RELIANCE': [
+            {'date': '2024-03-05', 'open': 2480, 'high': 2510, 'low': 2470, 'close': 2500},
+            {'date': '2024-03-06', 'open': 2500, 'high': 2520, 'low': 2490, 'close': 2510},
+        ]}
+        cache.clear()
+        quote = SymbolQuote(symbol='RELIANCE', asset_type='stock', data={'current_price': 2560}, source='perplexity')
+        with patch.object(timezone, 'now', return_value=datetime(2024, 3, 6, 9, tzinfo=dt_timezone.utc)):
+            PriceTickWriter.write({'RELIANCE': Decimal('2550')})
+            for _ in range(2):
+                SymbolQuoteService.fan_out({('RELIANCE', 'stock'): quote})
+        
+        # Against the 2500 previous close, not the price the tick or the first cycle stored
+        for investment in Investment.objects.filter(symbol='RELIANCE'):
+            self.assertEqual(investment.current_price, Decimal('2560'))
+            self.assertEqual(investment.daily_change, Decimal('60'))
+            self.assertEqual(investment.daily_change_percent.quantize(Decimal('0.01')), Decimal('2.40'))
+        self.assertEqual(mock_bars.call_count, 1)
+
+
+class SymbolSessionServiceTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.investment = Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175
+        )
+        self.today = datetime(2024, 3, 6).date()
+        self.bars = [
+            {'date': '2024-03-04', 'open': 168, 'high': 171, 'low': 167, 'close': 169},
+            {'date': '2024-03-05', 'open': 169, 'high': 172, 'low': 168, 'close': 170},
+            {'date': '2024-03-06', 'open': 172, 'high': 176, 'low': 171, 'close': 175},
+        ]
+    
+    def test_session_from_daily_bars(self):
+        from .session_state import SymbolSessionService
+        
+        session = SymbolSessionService.from_bars('AAPL', self.bars, self.today)
+        self.assertEqual(session.previous_close, Decimal('170'))
+        self.assertEqual((session.open, session.high, session.low), (Decimal('172'), Decimal('176'), Decimal('171')))
+        
+        # Before today's bar exists the latest close is the previous close
+        session = SymbolSessionService.from_bars('AAPL', self.bars[:2], self.today)
+        self.assertEqual(session.previous_close, Decimal('170'))
+        self.assertIsNone(session.open)
+    
+    @patch('investments.services.MarketDataService.get_historical_data_batch')
+    def test_daily_change_from_session_captured_once(self, mock_bars):
+        from django.utils import timezone
+        from .models import SymbolSession
+        from .session_state import SymbolSessionService
+        from .tick_writer import PriceTickWriter
+        
+        mock_bars.return_value = {'AAPL': self.bars}
+        with patch.object(timezone, 'now', return_value=datetime(2024, 3, 6, 15, tzinfo=dt_timezone.utc)):
+            PriceTickWriter.write({'AAPL': Decimal('178.5')})
+            PriceTickWriter.write({'AAPL': Decimal('168')})
+            SymbolSessionService.get_sessions(['AAPL', 'UNKNOWN'])
+            SymbolSessionService.get_sessions(['AAPL', 'UNKNOWN'])
+        
+        # AAPL once, then UNKNOWN once: a symbol without data is not refetched the same day
+        self.assertEqual(mock_bars.call_count, 2)
+        self.investment.refresh_from_db()
+        self.assertEqual(self.investment.daily_change, Decimal('-2'))
+        self.assertEqual(self.investment.daily_change_percent.quantize(Decimal('0.01')), Decimal('-1.18'))
+        session = SymbolSession.objects.get(symbol='AAPL')
+        self.assertEqual((session.high, session.low), (Decimal('178.5'), Decimal('168')))
+    
+    @patch('investments.services.MarketDataService.get_historical_data_batch')
+    def test_new_session_resets_change_of_unchanged_price(self, mock_bars):
+        from django.utils import timezone
+        from .tick_writer import PriceTickWriter
+        
+        # Yesterday's move is still stored; today's session opens at yesterday's 175 close
+        Investment.objects.filter(pk=self.investment.pk).update(daily_change=5, daily_change_percent=Decimal('2.94'))
+        mock_bars.return_value = {'AAPL': self.bars}
+        with patch.object(timezone, 'now', return_value=datetime(2024, 3, 7, 15, tzinfo=dt_timezone.utc)):
+            updated = PriceTickWriter.write({'AAPL': Decimal('175')})
+        
+        self.assertEqual(len(updated), 1)
+        self.investment.refresh_from_db()
+        self.assertEqual(self.investment.daily_change, Decimal('0'))
+        self.assertEqual(self.investment.daily_change_percent, Decimal('0'))
+        self.assertIsNone(self.investment.price_updated_at)
+
+
+class NSEMarketSnapshotCacheTest(TestCase):
+    def setUp(self):
+        import pandas as pd
+        
+        self.nse = MagicMock()
+        self.nse.get_nse_turnover.return_value = pd.DataFrame({
+            'segment': ['CM', 'FO'], 'volume': [5_000_000, 100]
+        })
+        self.nse.get_equities_data_from_index.return_value = pd.DataFrame({
+            'symbol': [f'SYM{i}' for i in range(500)],
+            'totalTradedVolume': [1_000 * (i + 1) for i in range(500)],
+        })
+    
+    def test_volume_lookups_share_one_download_per_table(self):
+        from .bharatsm_service import NSEMarketSnapshotCache
+        
+        snapshot = NSEMarketSnapshotCache(self.nse, ttl=300)
+        for i in range(500):
+            row = snapshot.get_equities_row(f'sym{i}')
+            self.assertEqual(row['totalTradedVolume'], 1_000 * (i + 1))
+            self.assertEqual(snapshot.get_turnover_row('CM')['volume'], 5_000_000)
+        
+        self.assertIsNone(snapshot.get_equities_row('UNKNOWN'))
+        self.assertEqual(self.nse.get_nse_turnover.call_count, 1)
+        self.assertEqual(self.nse.get_equities_data_from_index.call_count, 1)
+    
+    def test_snapshot_refetches_after_expiry(self):
+        from .bharatsm_service import NSEMarketSnapshotCache
+        
+        snapshot = NSEMarketSnapshotCache(self.nse, ttl=0)
+        snapshot.get_equities_row('SYM1')
+        snapshot.get_equities_row('SYM2')
+        self.assertEqual(self.nse.get_equities_data_from_index.call_count, 2)
+
+
+class TickerCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.loader = MagicMock(side_effect=lambda symbol: (
+            (symbol, [{'link_src': f'http://example.com/{symbol}'}]) if symbol != 'UNKNOWN' else (None, None)
+        ))
+
+    def test_local_and_shared_tiers(self):
+        from .ticker_cache import TickerCache
+
+        ticker_cache = TickerCache(self.loader)
+        self.assertEqual(ticker_cache.get('TCS')[0], 'TCS')
+        self.assertEqual(ticker_cache.get('tcs')[0], 'TCS')
+
+        # A fresh process-local tier is filled from the shared cache
+        other = TickerCache(self.loader)
+        self.assertEqual(other.get('TCS')[0], 'TCS')
+
+        self.assertEqual(self.loader.call_count, 1)
+        self.assertEqual(ticker_cache.get_stats()['local_hits'], 1)
+        self.assertEqual(other.get_stats()['shared_hits'], 1)
+
+    def test_unknown_symbols_are_cached_negatively(self):
+        from .ticker_cache import TickerCache
+
+        ticker_cache = TickerCache(self.loader)
+        for _ in range(3):
+            self.assertEqual(ticker_cache.get('UNKNOWN'), (None, None))
+
+        self.assertEqual(self.loader.call_count, 1)
+        self.assertEqual(ticker_cache.get_stats()['negative_hits'], 2)
+
+    def test_loader_errors_are_not_cached(self):
+        from .ticker_cache import TickerCache
+
+        self.loader.side_effect = [Exception('timeout'), ('TCS', [{'link_src': 'x'}])]
+        ticker_cache = TickerCache(self.loader)
+        self.assertEqual(ticker_cache.get('TCS'), (None, None))
+        self.assertEqual(ticker_cache.get('TCS')[0], 'TCS')
+        self.assertEqual(ticker_cache.get_stats()['errors'], 1)
+
+
+class SymbolMasterTest(TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as f:
+            f.write('symbol,name,exchange,country,asset_class,moneycontrol_id\n')
+            f.write('ADANIPORTS,Adani Ports,NSE,IN,stock,AP\n')
+            f.write('bnd,Vanguard Total Bond,NASDAQ,US,etf,\n')
+            f.write('BTC,Bitcoin,,,crypto,\n')
+        self.addCleanup(os.remove, self.path)
+    
+    def tearDown(self):
+        from .symbol_master import symbol_registry
+        symbol_registry.invalidate()
+    
+    def test_bulk_load_and_lookup(self):
+        from django.core.management import call_command
+        from .models import SymbolMaster
+        from .symbol_master import symbol_registry
+        
+        call_command('load_symbol_master', self.path, stdout=MagicMock())
+        
+        self.assertEqual(SymbolMaster.objects.count(), 3)
+        self.assertEqual(symbol_registry.route('ADANIPORTS'), 'indian_stock')
+        self.assertEqual(symbol_registry.route('adaniports.ns'), 'indian_stock')
+        self.assertEqual(symbol_registry.route('BND'), 'us_stock')
+        self.assertEqual(symbol_registry.route('BTC'), 'crypto')
+        self.assertEqual(symbol_registry.provider_id('ADANIPORTS', 'moneycontrol'), 'AP')
+        self.assertIsNone(symbol_registry.route('UNLISTED'))
+    
+    def test_routing_prefers_symbol_master_over_heuristics(self):
+        from django.core.management import call_command
+        from .bharatsm_service import FinalOptimizedBharatSMService
+        
+        service = FinalOptimizedBharatSMService()
+        # Heuristics treat anything containing "ADA" as crypto
+        self.assertEqual(service._determine_asset_type('ADANIPORTS'), 'crypto')
+        
+        call_command('load_symbol_master', self.path, stdout=MagicMock())
+        self.assertEqual(service._determine_asset_type('ADANIPORTS'), 'indian_stock')
+        self.assertEqual(service._determine_asset_type('AAPL'), 'us_stock')
+
+
+class BharatSMParallelFetchTest(TestCase):
+    def _slow(self, delay, value):
+        import time
+        
+        def fetch(*args, **kwargs):
+            time.sleep(delay)
+            return value
+        return fetch
+    
+    def test_legs_run_concurrently_and_return_partial_results(self):
+        import time
+        from .bharatsm_service import FinalOptimizedBharatSMService
+        
+        service = FinalOptimizedBharatSMService()
+        service.mc = MagicMock()
+        service.mc.get_ticker.return_value = (
+            'RI', [{'link_src': 'http://example.com/ri', 'name': 'Reliance Industries', 'sc_sector': 'Energy'}]
+        )
+        
+        with self.settings(BHARATSM_SYMBOL_DEADLINE=0.5), \
+                patch.object(service, '_get_ratios_data_safe', side_effect=self._slow(0.2, None)), \
+                patch.object(service, '_get_quarterly_results_safe', side_effect=self._slow(0.2, None)), \
+                patch.object(service, '_get_ratios_mini_statement', side_effect=self._slow(0.2, None)), \
+                patch.object(service, '_get_volume_data_optimized', side_effect=self._slow(2, '1.2Cr')):
+            started = time.monotonic()
+            result = service._get_bharatsm_data('RELIANCE')
+            elapsed = time.monotonic() - started
+        
+        self.assertLess(elapsed, 1.0)
+        self.assertIsNone(result['volume'])
+        self.assertEqual(result['company_name'], 'Reliance Industries')
+    
+    def test_leg_deadline_runs_from_leg_start(self):
+        from .bharatsm_service import FinalOptimizedBharatSMService
+        
+        service = FinalOptimizedBharatSMService()
+        legs = {f'leg{i}': self._slow(0.3, i) for i in range(24)}
+        legs['hung'] = self._slow(2, 'late')
+        
+        with self.settings(BHARATSM_SYMBOL_DEADLINE=0.6):
+            first = service._run_legs_with_deadline('RELIANCE', legs)
+            # The abandoned hung leg holds no capacity the next symbol needs
+            second = service._run_legs_with_deadline('TCS', {'ratios': self._slow(0.3, 'ok')})
+        
+        self.assertEqual([first[f'leg{i}'] for i in range(24)], list(range(24)))
+        self.assertIsNone(first['hung'])
+        self.assertEqual(second, {'ratios': 'ok'})
 
 
 class PerplexityAPIServiceTest(TestCase):
-    @patch('investments.perplexity_service.requests.post')
+    @patch('investments.perplexity_service.http_clients.post')
     def test_get_stock_data(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -358,7 +1533,7 @@ class PerplexityAPIServiceTest(TestCase):
         self.assertIsInstance(result, dict)
         self.assertIn('current_price', result)
         
-    @patch('investments.perplexity_service.requests.post')
+    @patch('investments.perplexity_service.http_clients.post')
     def test_api_error_handling(self, mock_post):
         mock_post.side_effect = Exception('API Error')
         
@@ -632,6 +1807,166 @@ class EnhancedInvestmentServiceTest(TestCase):
         self.assertIsNotNone(stock_data['best_performer'])
         self.assertIsNotNone(stock_data['worst_performer'])
         
+    def test_portfolio_analytics_single_load(self):
+        from .portfolio_analytics import PortfolioAnalytics
+        
+        Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175, daily_change=Decimal('2.5')
+        )
+        Investment.objects.create(
+            user=self.user, symbol='GOOGL', name='Google', asset_type='stock',
+            quantity=5, average_purchase_price=2000, current_price=1900
+        )
+        Investment.objects.create(
+            user=self.user, name='Gold', asset_type='gold', unit='grams',
+            quantity=100, average_purchase_price=60, current_price=65
+        )
+        
+        # Constant-size aggregate queries, whatever the number of holdings
+        with self.assertNumQueries(3):
+            analytics = PortfolioAnalytics.for_user(self.user)
+            summary = analytics.summary()
+            performance = analytics.performance_by_type()
+            stats = analytics.asset_type_stats()
+        
+        self.assertEqual(summary['total_value'], Decimal('17750.00'))
+        self.assertEqual(summary['total_gain_loss'], Decimal('250.00'))
+        self.assertEqual(summary['daily_change'], Decimal('25'))
+        self.assertEqual(summary['top_performer'], 'AAPL')
+        self.assertEqual(summary['worst_performer'], 'GOOGL')
+        self.assertEqual(summary['asset_allocation']['stock']['total_value'], Decimal('11250.00'))
+        self.assertEqual(performance['stock']['best_performer']['symbol'], 'AAPL')
+        self.assertEqual(performance['stock']['total_gain_loss'], Decimal('-250.00'))
+        self.assertEqual(performance['gold']['count'], 1)
+        self.assertEqual({s['asset_type']: s['percentage_of_portfolio'] for s in stats},
+                         {'stock': 63.38, 'gold': 36.62})
+        self.assertEqual([p['symbol'] or p['name'] for p in analytics.worst_performers(2)], ['GOOGL', 'Gold'])
+        
+        # Same figures when reduced in memory from model instances
+        in_memory = PortfolioAnalytics.from_investments(Investment.objects.filter(user=self.user))
+        self.assertEqual(in_memory.summary(), summary)
+        
+    def test_portfolio_snapshot_maintained_by_deltas(self):
+        from .models import PortfolioSnapshot
+        from .portfolio_analytics import PortfolioAnalytics
+        from .portfolio_snapshot import PortfolioSnapshotService
+        
+        apple = Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175, daily_change=Decimal('2.5')
+        )
+        google = Investment.objects.create(
+            user=self.user, symbol='GOOGL', name='Google', asset_type='stock',
+            quantity=5, average_purchase_price=2000, current_price=1900
+        )
+        gold = Investment.objects.create(
+            user=self.user, name='Gold', asset_type='gold', unit='grams',
+            quantity=100, average_purchase_price=60, current_price=65
+        )
+        apple.quantity = 12
+        apple.save()
+        gold.delete()
+        
+        # Bulk price updates apply one aggregated delta per user in a single UPDATE
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            BulkOperationService.bulk_update_prices([
+                {'id': apple.id, 'current_price': '180'},
+                {'id': google.id, 'current_price': '2100'},
+            ])
+        snapshot_updates = [q for q in queries.captured_queries
+                            if q['sql'].startswith('UPDATE') and 'portfoliosnapshot' in q['sql']]
+        self.assertEqual(len(snapshot_updates), 1)
+        # Order statistics are not re-read on writes, only flagged stale
+        self.assertFalse([q for q in queries.captured_queries if 'DISTINCT' in q['sql']])
+        self.assertTrue(PortfolioSnapshot.objects.get(user=self.user).statistics_stale)
+        
+        # The first read refreshes them; after that reading the summary is a single-row lookup
+        PortfolioSnapshotService.get_snapshot(self.user)
+        with self.assertNumQueries(1):
+            snapshot_summary = PortfolioSnapshotService.get_analytics(self.user).summary()
+        
+        self.assertEqual(snapshot_summary['total_value'], Decimal('12660.00'))
+        self.assertEqual(snapshot_summary['investment_count'], 2)
+        self.assertEqual(snapshot_summary['top_performer'], 'AAPL')
+        self.assertEqual(snapshot_summary['worst_performer'], 'GOOGL')
+        self.assertEqual(snapshot_summary, PortfolioAnalytics.for_user(self.user).summary())
+        
+        # Rebuilding from the holdings gives the same row
+        snapshot = self.user.portfolio_snapshot
+        snapshot.refresh_from_db()
+        rebuilt = PortfolioSnapshotService.rebuild([self.user.id])[self.user.id]
+        self.assertEqual(rebuilt.buckets, snapshot.buckets)
+        self.assertEqual(rebuilt.total_cost, snapshot.total_cost)
+        
+    def test_portfolio_snapshot_rebuilds_unknown_previous_state(self):
+        from .portfolio_snapshot import PortfolioSnapshotService
+        
+        Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175
+        )
+        # A partially loaded holding is diffed against its stored state, re-read under the row lock
+        partial = Investment.objects.only('id', 'user_id', 'current_price').get(symbol='AAPL')
+        partial.current_price = Decimal('200')
+        partial.save()
+        
+        summary = PortfolioSnapshotService.get_analytics(self.user).summary()
+        self.assertEqual(summary['total_value'], Decimal('2000.00'))
+        self.assertEqual(summary['total_gain_loss'], Decimal('500.00'))
+        
+    def test_portfolio_snapshot_skips_writes_without_snapshot_inputs(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import PortfolioSnapshot
+        from .portfolio_snapshot import PortfolioSnapshotService
+        
+        apple = Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175
+        )
+        PortfolioSnapshotService.get_snapshot(self.user)
+        
+        # No snapshot input changed: the snapshot row is not touched
+        apple.ai_analysis = 'Strong fundamentals'
+        with CaptureQueriesContext(connection) as queries:
+            apple.save()
+        self.assertFalse([q for q in queries.captured_queries if 'portfoliosnapshot' in q['sql']])
+        
+        # A daily change moves the sums but none of the order statistics
+        apple.daily_change = Decimal('1.5')
+        apple.save()
+        snapshot = PortfolioSnapshot.objects.get(user=self.user)
+        self.assertEqual(snapshot.daily_change, Decimal('15'))
+        self.assertFalse(snapshot.statistics_stale)
+        
+        apple.current_price = Decimal('180')
+        apple.save()
+        self.assertTrue(PortfolioSnapshot.objects.get(user=self.user).statistics_stale)
+    
+    def test_portfolio_snapshot_deltas_use_stored_state(self):
+        from .portfolio_snapshot import PortfolioSnapshotService
+        
+        Investment.objects.create(
+            user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
+            quantity=10, average_purchase_price=150, current_price=175
+        )
+        # Two processes load the same holding and both write it
+        first = Investment.objects.get(symbol='AAPL')
+        second = Investment.objects.get(symbol='AAPL')
+        first.current_price = Decimal('200')
+        first.save()
+        second.current_price = Decimal('180')
+        second.save()
+        
+        # The second delta is taken from 200, not from the 175 it loaded, so nothing is counted twice
+        snapshot = PortfolioSnapshotService.get_snapshot(self.user)
+        self.assertEqual(snapshot.total_value, Decimal('1800.00'))
+        rebuilt = PortfolioSnapshotService.rebuild([self.user.id])[self.user.id]
+        self.assertEqual(snapshot.total_value, rebuilt.total_value)
+        
     def test_portfolio_insights(self):
         Investment.objects.create(
             user=self.user, symbol='AAPL', name='Apple', asset_type='stock',
@@ -730,6 +2065,68 @@ class ValidationTest(TestCase):
             AssetValidator.validate_physical_asset(invalid_physical_data)
 
 
+class MarketCalendarTest(TestCase):
+    def utc(self, *args):
+        return datetime(*args, tzinfo=dt_timezone.utc)
+    
+    def test_sessions_holidays_and_early_closes(self):
+        from .market_calendar import get_calendar
+        
+        nse, nyse = get_calendar('NSI'), get_calendar('NYSE')
+        # 09:15-15:30 IST is 03:45-10:00 UTC
+        self.assertFalse(nse.is_open(self.utc(2026, 10, 16, 3, 30)))
+        self.assertTrue(nse.is_open(self.utc(2026, 10, 16, 9, 59)))
+        self.assertFalse(nse.is_open(self.utc(2026, 10, 17, 5, 0)))  # Saturday
+        self.assertFalse(nse.is_open(self.utc(2026, 10, 20, 5, 0)))  # Dussehra
+        self.assertTrue(nyse.is_open(self.utc(2026, 10, 16, 19, 59)))
+        self.assertEqual(nyse.session(datetime(2026, 11, 27).date())[1], self.utc(2026, 11, 27, 18, 0))
+        self.assertIsNone(nyse.session(datetime(2026, 11, 26).date()))  # Thanksgiving
+        self.assertTrue(get_calendar('CRYPTO').is_open(self.utc(2026, 10, 17, 5, 0)))
+        with self.assertRaises(ValueError):
+            get_calendar('LSE')
+    
+    def test_refresh_due_ticks_in_session_and_settles_once(self):
+        from datetime import timedelta
+        from .market_calendar import get_calendar, refresh_due
+        
+        nse = get_calendar('NSE')
+        
+        def due(last_run, now):
+            return refresh_due(nse, self.utc(*last_run), self.utc(*now), timedelta(minutes=1), timedelta(minutes=15))
+        
+        # Open: due once the interval has passed
+        self.assertEqual(due((2026, 10, 16, 5, 0), (2026, 10, 16, 5, 1)), (True, 60.0))
+        self.assertEqual(due((2026, 10, 16, 5, 0), (2026, 10, 16, 5, 0, 30)), (False, 30.0))
+        # Closed before the settle time: sleep until it
+        self.assertEqual(due((2026, 10, 16, 9, 59), (2026, 10, 16, 10, 5)), (False, 600.0))
+        # The settle runs once, then nothing until Monday's open
+        settled, wait = due((2026, 10, 16, 9, 59), (2026, 10, 16, 10, 15))
+        self.assertTrue(settled)
+        self.assertEqual(wait, (self.utc(2026, 10, 19, 3, 45) - self.utc(2026, 10, 16, 10, 15)).total_seconds())
+        self.assertFalse(due((2026, 10, 16, 10, 15), (2026, 10, 17, 6, 0))[0])
+        # A holiday (Dussehra) has neither ticks nor a settle
+        self.assertFalse(due((2026, 10, 19, 10, 15), (2026, 10, 20, 6, 0))[0])
+        self.assertFalse(due((2026, 10, 19, 10, 15), (2026, 10, 20, 10, 30))[0])
+    
+    def test_holdings_grouped_by_exchange(self):
+        from .market_calendar import exchange_for, symbols_on_exchange
+        
+        self.assertEqual(exchange_for('RELIANCE.NS'), 'NSE')
+        self.assertEqual(exchange_for('TCS.BO'), 'BSE')
+        self.assertEqual(exchange_for('AAPL', 'stock', 'NMS'), 'NASDAQ')
+        self.assertEqual(exchange_for('BTC', 'crypto'), 'CRYPTO')
+        self.assertIsNone(exchange_for('', 'gold'))
+        
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        for symbol, exchange in (('INFY.NS', ''), ('AAPL', 'NASDAQ'), ('MSFT', 'NASDAQ')):
+            Investment.objects.create(
+                user=user, symbol=symbol, name=symbol, asset_type='stock', exchange=exchange,
+                quantity=1, average_purchase_price=100, current_price=100
+            )
+        self.assertEqual(symbols_on_exchange('NASDAQ'), ['AAPL', 'MSFT'])
+        self.assertEqual(symbols_on_exchange('NSE'), ['INFY.NS'])
+
+
 class CeleryTaskTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -738,6 +2135,56 @@ class CeleryTaskTest(TestCase):
             password='testpass123'
         )
         
+    def test_portfolio_snapshot_reconciliation_is_scheduled(self):
+        from C8V2.celery_app import app
+        from .tasks import rebuild_portfolio_snapshots_task
+        
+        scheduled = {entry['task'] for entry in app.conf.beat_schedule.values()}
+        self.assertIn(rebuild_portfolio_snapshots_task.name, scheduled)
+    
+    def test_daily_update_runs_after_each_exchange_close(self):
+        from C8V2.celery_app import app
+        from .market_schedule import MarketSessionSchedule
+        from .tasks import daily_price_and_data_update
+        
+        daily = {
+            entry['args'][0]: entry['schedule']
+            for entry in app.conf.beat_schedule.values() if entry['task'] == daily_price_and_data_update.name
+        }
+        self.assertEqual(set(daily), {'NSE', 'BSE', 'NYSE', 'NASDAQ', 'CRYPTO'})
+        for exchange in ('NSE', 'BSE', 'NYSE', 'NASDAQ'):
+            self.assertEqual(daily[exchange], MarketSessionSchedule(exchange, intraday=False))
+    
+    def test_daily_update_refreshes_only_the_closed_exchange(self):
+        from .quote_service import SymbolQuoteService
+        from .tasks import daily_price_and_data_update
+        
+        for symbol in ('RELIANCE.NS', 'AAPL'):
+            Investment.objects.create(
+                user=self.user, symbol=symbol, name=symbol, asset_type='stock',
+                quantity=1, average_purchase_price=100, current_price=100
+            )
+        
+        with patch.object(SymbolQuoteService, 'refresh_quotes', return_value={}) as mock_refresh:
+            daily_price_and_data_update('NSE')
+        
+        mock_refresh.assert_called_once_with([('RELIANCE.NS', 'stock')])
+    
+    @patch('investments.tasks.rebuild_portfolio_snapshots_task.delay')
+    @patch('investments.tasks.check_price_alerts.delay')
+    @patch('investments.tasks.generate_ai_analysis_for_all_investments.delay')
+    @patch('investments.tasks.update_chart_data_for_all_investments.delay')
+    @patch('investments.tasks.refresh_all_investment_prices.delay')
+    def test_daily_maintenance_leaves_reconciliation_to_beat(self, *mocks):
+        from .tasks import daily_investment_maintenance
+        
+        daily_investment_maintenance()
+        
+        mock_rebuild = mocks[-1]
+        mock_rebuild.assert_not_called()
+        for mock_task in mocks[:-1]:
+            mock_task.assert_called_once()
+    
     @patch('investments.data_enrichment_service.DataEnrichmentService.enrich_investment_data')
     def test_enrich_investment_data_task(self, mock_enrich):
         from .tasks import enrich_investment_data_task
@@ -763,4 +2210,43 @@ class CeleryTaskTest(TestCase):
         result = daily_price_update_task()
         
         mock_refresh.assert_called_once()
-        self.assertIn('Daily price update completed', result)
\ No newline at end of file
+        self.assertIn('Daily price update completed', result)
+    
+    @patch('investments.services.MarketDataService.get_historical_data_batch', return_value={})
+    @patch('investments.services.MarketDataService.get_current_price')
+    def test_market_hours_refresh_writes_only_tick_columns(self, mock_price, mock_bars):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .market_calendar import ExchangeCalendar
+        from .portfolio_snapshot import PortfolioSnapshotService
+        from .tasks import market_hours_price_refresh
+        
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        for user in (self.user, other):
+            Investment.objects.create(
+                user=user, symbol='AAPL', name='Apple', asset_type='stock',
+                quantity=10, average_purchase_price=150, current_price=175
+            )
+        Investment.objects.create(
+            user=self.user, symbol='RELIANCE.NS', name='Reliance', asset_type='stock',
+            quantity=5, average_purchase_price=2500, current_price=2600
+        )
+        long_ago = timezone.now() - timedelta(days=2)
+        Investment.objects.update(last_updated=long_ago, updated_at=long_ago)
+        
+        mock_price.return_value = Decimal('180')
+        with patch.object(ExchangeCalendar, 'is_open', lambda calendar, at: calendar.code != 'NSE'):
+            result = market_hours_price_refresh()
+        
+        # One fetch per held symbol on an open exchange, including never-ticked holdings
+        mock_price.assert_called_once_with('AAPL')
+        self.assertIn('updated 2 investments', result)
+        for investment in Investment.objects.filter(symbol='AAPL'):
+            self.assertEqual(investment.current_price, Decimal('180'))
+            self.assertEqual(investment.daily_change, Decimal('5'))
+            self.assertEqual(investment.total_value, Decimal('1800'))
+            self.assertEqual(investment.last_updated, long_ago)
+            self.assertEqual(investment.updated_at, long_ago)
+            self.assertGreater(investment.price_updated_at, long_ago)
+        self.assertIsNone(Investment.objects.get(symbol='RELIANCE.NS').price_updated_at)
+        self.assertEqual(PortfolioSnapshotService.get_snapshot(self.user).total_value, Decimal('14800'))
\ No newline at end of file
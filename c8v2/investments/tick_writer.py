@@ -0,0 +1,126 @@
+"""
+Delta-only price tick writes.
+
+Intraday refreshes fetch each distinct symbol once and write changed prices
+back with one bulk UPDATE of just the tick columns: the price, the daily
+change fields (against the symbol's previous close, see session_state.py),
+the totals derived from them and ``price_updated_at``. Unlike
+``save()`` this leaves every other column, ``last_updated`` and
+``updated_at`` alone, so a tick no longer looks like an edit of the holding.
+By default every held symbol whose exchange is in session is ticked (see
+market_calendar.py), so quiet symbols and new holdings are not skipped.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+from django.conf import settings
+from django.utils import timezone
+from .alert_engine import PriceAlertEngine
+from .market_calendar import symbols_on_open_exchanges
+from .models import Investment
+from .portfolio_snapshot import PortfolioSnapshotService
+from .session_state import SymbolSessionService
+
+logger = logging.getLogger(__name__)
+
+
+class PriceTickWriter:
+    """Fetch prices per symbol and write only the columns a tick changes"""
+
+    DEFAULT_MAX_WORKERS = 8
+
+    TICK_FIELDS = [
+        'current_price', 'daily_change', 'daily_change_percent',
+        'total_value', 'total_gain_loss', 'total_gain_loss_percent',
+        'price_updated_at',
+    ]
+
+    # Loaded per holding: the tick fields, what derives them and the snapshot inputs
+    LOAD_FIELDS = [
+        'id', 'user', 'symbol', 'name', 'sector', 'asset_type', 'quantity', 'average_purchase_price',
+        'risk_level', 'created_at', *TICK_FIELDS,
+    ]
+
+    def __init__(self, fetch: Callable[[str], Optional[Decimal]] = None, max_workers: int = None):
+        if fetch is None:
+            from .services import MarketDataService
+            fetch = MarketDataService.get_current_price
+        self.fetch = fetch
+        self.max_workers = max_workers or getattr(
+            settings, 'PRICE_REFRESH_MAX_WORKERS', self.DEFAULT_MAX_WORKERS
+        )
+
+    @staticmethod
+    def open_symbols() -> List[str]:
+        """Held symbols whose exchange is open now"""
+        return symbols_on_open_exchanges(timezone.now())
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, Decimal]:
+        """Current price per symbol, fetched once each; failures are left out"""
+        symbols = list(set(symbols))
+        prices = {}
+        if not symbols:
+            return prices
+
+        workers = max(1, min(self.max_workers, len(symbols)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='price-ticks') as executor:
+            futures = {executor.submit(self.fetch, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    price = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching price for {symbol}: {e}")
+                    continue
+                if price:
+                    prices[symbol] = price
+        return prices
+
+    @classmethod
+    def write(cls, prices: Dict[str, Decimal]) -> List[Investment]:
+        """Apply {symbol: price} to every holding whose price or daily change moved; returns the updated holdings"""
+        if not prices:
+            return []
+
+        sessions = SymbolSessionService.get_sessions(prices)
+        SymbolSessionService.record_ticks(sessions, prices)
+
+        now = timezone.now()
+        updated = []
+        for investment in Investment.objects.filter(symbol__in=list(prices)).only(*cls.LOAD_FIELDS):
+            price = prices[investment.symbol]
+            before = (investment.current_price, investment.daily_change, investment.daily_change_percent)
+            SymbolSessionService.apply_price(investment, price, sessions.get(investment.symbol))
+            # A new session moves the previous close, so the change can move while the price does not
+            if (investment.current_price, investment.daily_change, investment.daily_change_percent) == before:
+                continue
+            investment.calculate_derived_fields()
+            if price != before[0]:
+                investment.price_updated_at = now
+            updated.append(investment)
+
+        if not updated:
+            return updated
+
+        PortfolioSnapshotService.bulk_update(updated, cls.TICK_FIELDS)
+
+        from .services import CacheService
+        CacheService.invalidate_users(investment.user_id for investment in updated)
+        # Resolve crossed thresholds in memory; only candidates reach the database
+        PriceAlertEngine.evaluate_ticks({
+            investment.symbol: (investment.current_price, investment.daily_change_percent)
+            for investment in updated
+        })
+        return updated
+
+    def refresh(self, symbols: Iterable[str] = None) -> List[Investment]:
+        """Fetch and write one round of ticks (the symbols on open exchanges by default)"""
+        symbols = self.open_symbols() if symbols is None else symbols
+        prices = self.fetch_prices(symbols)
+        updated = self.write(prices)
+        logger.info(
+            f"Price ticks: {len(prices)} symbols fetched, {len(updated)} holdings updated"
+        )
+        return updated
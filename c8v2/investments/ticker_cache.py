@@ -0,0 +1,118 @@
+"""
+Two-tier cache for MoneyControl ticker lookups.
+
+Tier 1 is a bounded in-process TTL/LRU cache, tier 2 is the configured Django
+cache (Redis), which is shared by every gunicorn worker and Celery process.
+Unknown symbols are cached negatively so they are not looked up again on
+every refresh.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TickerResult = Tuple[Optional[str], Optional[List]]
+
+
+class TickerCache:
+    """Bounded local LRU in front of the shared cache, with negative caching and metrics"""
+
+    NEGATIVE = '__not_found__'
+
+    DEFAULT_TTL = 60 * 60 * 24 * 7      # Ticker-to-URL mappings almost never change
+    DEFAULT_NEGATIVE_TTL = 60 * 60      # Retry unknown symbols after an hour
+    DEFAULT_LOCAL_TTL = 60 * 60
+    DEFAULT_LOCAL_SIZE = 2048
+
+    def __init__(self, loader: Callable[[str], TickerResult], key_prefix: str = 'mc_ticker'):
+        self.loader = loader
+        self.key_prefix = key_prefix
+        self.ttl = getattr(settings, 'TICKER_CACHE_TTL', self.DEFAULT_TTL)
+        self.negative_ttl = getattr(settings, 'TICKER_CACHE_NEGATIVE_TTL', self.DEFAULT_NEGATIVE_TTL)
+        self._local = TTLCache(
+            maxsize=getattr(settings, 'TICKER_CACHE_LOCAL_SIZE', self.DEFAULT_LOCAL_SIZE),
+            ttl=getattr(settings, 'TICKER_CACHE_LOCAL_TTL', self.DEFAULT_LOCAL_TTL),
+        )
+        self._lock = threading.Lock()
+        self.metrics = {'local_hits': 0, 'shared_hits': 0, 'negative_hits': 0, 'misses': 0, 'errors': 0}
+
+    def _key(self, symbol: str) -> str:
+        return f"{self.key_prefix}_{symbol.upper()}"
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def _unpack(self, value) -> TickerResult:
+        if value == self.NEGATIVE:
+            self._count('negative_hits')
+            return None, None
+        return value[0], value[1]
+
+    def get(self, symbol: str) -> TickerResult:
+        """Return (ticker_id, ticker_raw) for a symbol, loading it on a miss"""
+        key = self._key(symbol)
+
+        with self._lock:
+            value = self._local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return self._unpack(value)
+
+        try:
+            value = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Shared ticker cache unavailable: {e}")
+            value = None
+        if value is not None:
+            self._count('shared_hits')
+            with self._lock:
+                self._local[key] = value
+            return self._unpack(value)
+
+        self._count('misses')
+        try:
+            ticker_result, ticker_raw = self.loader(symbol)
+        except Exception as e:
+            # Transient failures are not cached
+            self._count('errors')
+            logger.error(f"Error fetching ticker for {symbol}: {e}")
+            return None, None
+
+        if ticker_result and ticker_raw:
+            value, timeout = [ticker_result, ticker_raw], self.ttl
+        else:
+            value, timeout = self.NEGATIVE, self.negative_ttl
+
+        with self._lock:
+            self._local[key] = value
+        try:
+            cache.set(key, value, timeout)
+        except Exception as e:
+            logger.warning(f"Failed to store ticker for {symbol} in shared cache: {e}")
+
+        if value == self.NEGATIVE:
+            return None, None
+        return ticker_result, ticker_raw
+
+    def invalidate(self, symbol: str):
+        """Remove a symbol from both tiers"""
+        key = self._key(symbol)
+        with self._lock:
+            self._local.pop(key, None)
+        cache.delete(key)
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters plus the overall hit rate"""
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['local_size'] = len(self._local)
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0
+        return stats
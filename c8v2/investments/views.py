@@ -4,15 +4,23 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from django.utils import timezone
-from datetime import timedelta
-from .models import Investment, ChartData, PriceAlert
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from asgiref.sync import async_to_sync
+import hashlib
+import json
+from .models import Investment, PriceAlert
 from .serializers import (
     InvestmentSerializer, CreateInvestmentSerializer, UpdateInvestmentSerializer,
-    ChartDataSerializer, PriceAlertSerializer, PortfolioSummarySerializer,
+    PriceAlertSerializer, PortfolioSummarySerializer,
     AssetSuggestionSerializer, AssetTypeStatsSerializer
 )
-from .services import InvestmentService, MarketDataService, AIInsightsService
+from .services import InvestmentService, AIInsightsService, PriceHistoryService
+from .price_aggregator import AsyncPriceAggregator
+from .alert_engine import PriceAlertEngine
+from .chart_resampling import ChartResampler
+from .portfolio_snapshot import PortfolioSnapshotService
+from .portfolio_history import PortfolioHistoryService, RANGES as PORTFOLIO_HISTORY_RANGES
 from .data_enrichment_service import DataEnrichmentService
 from .bharatsm_service import final_bharatsm_service, get_bharatsm_basic_info
 try:
@@ -51,14 +59,11 @@ class InvestmentViewSet(viewsets.ModelViewSet):
         """Optimized queryset with prefetching to avoid N+1 queries"""
         from django.db.models import Prefetch
 
+        # chart_data JSON is served from the shared price history instead
         queryset = Investment.objects.filter(user=self.request.user)\
+            .defer('chart_data')\
             .select_related('user')\
             .prefetch_related(
-                Prefetch(
-                    'historical_data',
-                    queryset=ChartData.objects.order_by('-date')[:30],
-                    to_attr='recent_chart_data'
-                ),
                 Prefetch(
                     'alerts',
                     queryset=PriceAlert.objects.filter(is_active=True),
@@ -159,32 +164,44 @@ class InvestmentViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def chart_data(self, request, pk=None):
-        """Get chart data for a specific investment"""
+        """Get chart data for a specific investment.
+        
+        Serves the stored series without waiting on the network. Responses
+        carry an ETag of the served points for conditional requests (no
+        Last-Modified: the latest bar is rewritten in place during its
+        session); a series missing the latest session is flagged with
+        X-Chart-Data-Stale and refreshed in the background.
+        """
         investment = self.get_object()
         timeframe = request.query_params.get('timeframe', 'daily')
+        points = request.query_params.get('points')
+        if points is not None and not points.isdigit():
+            return Response(
+                {'error': 'points must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
-            # Update chart data if needed
-            InvestmentService.update_chart_data(investment)
+            last_date = PriceHistoryService.get_last_date(investment.symbol)
+            stale = PriceHistoryService.is_stale(last_date, investment.asset_type)
+            if stale:
+                PriceHistoryService.request_refresh(investment.symbol, investment.asset_type)
             
-            chart_data = investment.historical_data.all()
+            # True weekly/monthly candles, cached per symbol and timeframe
+            chart_data = ChartResampler.get_series(investment.symbol, timeframe)
             
-            # Filter based on timeframe
-            if timeframe == 'weekly':
-                chart_data = chart_data.filter(
-                    date__gte=timezone.now().date() - timedelta(weeks=12)
-                )[::7]  # Every 7th day
-            elif timeframe == 'monthly':
-                chart_data = chart_data.filter(
-                    date__gte=timezone.now().date() - timedelta(days=365)
-                )[::30]  # Every 30th day
-            else:  # daily
-                chart_data = chart_data.filter(
-                    date__gte=timezone.now().date() - timedelta(days=30)
-                )
+            # Optional point budget for sparklines
+            if points:
+                chart_data = ChartResampler.downsample(chart_data, int(points))
             
-            serializer = ChartDataSerializer(chart_data, many=True)
-            return Response(serializer.data)
+            etag = quote_etag(hashlib.md5(json.dumps(chart_data).encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = Response(chart_data)
+            
+            response['ETag'] = etag
+            response['X-Chart-Data-Stale'] = 'true' if stale else 'false'
+            return response
             
         except Exception as e:
             logger.error(f"Error fetching chart data: {e}")
@@ -205,27 +222,7 @@ class InvestmentViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            price_updates = []
-            for symbol in symbols:
-                current_price = MarketDataService.get_current_price(symbol)
-                if current_price:
-                    # Get previous price for change calculation
-                    investment = Investment.objects.filter(
-                        user=request.user, symbol=symbol
-                    ).first()
-                    
-                    previous_price = investment.current_price if investment else current_price
-                    change = current_price - previous_price
-                    change_percent = (change / previous_price * 100) if previous_price > 0 else 0
-                    
-                    price_updates.append({
-                        'symbol': symbol,
-                        'price': float(current_price),
-                        'change': float(change),
-                        'changePercent': float(change_percent),
-                        'timestamp': timezone.now().isoformat()
-                    })
-            
+            price_updates = async_to_sync(AsyncPriceAggregator().get_price_updates)(request.user, symbols)
             return Response(price_updates)
             
         except Exception as e:
@@ -250,6 +247,33 @@ class InvestmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def portfolio_history(self, request):
+        """Daily portfolio value over 1M/6M/1Y/ALL, downsampled to a point budget"""
+        range_key = request.query_params.get('range', '1Y').upper()
+        points = request.query_params.get('points')
+        if range_key not in PORTFOLIO_HISTORY_RANGES:
+            return Response(
+                {'error': f"range must be one of {', '.join(PORTFOLIO_HISTORY_RANGES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if points is not None and not points.isdigit():
+            return Response(
+                {'error': 'points must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            series = PortfolioHistoryService.get_series(request.user, range_key, int(points) if points else None)
+            return Response({'range': range_key, 'points': series})
+            
+        except Exception as e:
+            logger.error(f"Error fetching portfolio history: {e}")
+            return Response(
+                {'error': 'Failed to fetch portfolio history'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=True, methods=['post'])
     @handle_api_errors
     def enrich_data(self, request, pk=None):
@@ -291,36 +315,7 @@ class InvestmentViewSet(viewsets.ModelViewSet):
     def asset_type_stats(self, request):
         """Get statistics by asset type"""
         try:
-            investments = Investment.objects.filter(user=request.user)
-            stats = {}
-            
-            for investment in investments:
-                asset_type = investment.asset_type
-                if asset_type not in stats:
-                    stats[asset_type] = {
-                        'count': 0,
-                        'total_value': 0,
-                        'total_gain_loss': 0
-                    }
-                
-                stats[asset_type]['count'] += 1
-                stats[asset_type]['total_value'] += float(investment.total_value)
-                stats[asset_type]['total_gain_loss'] += float(investment.total_gain_loss)
-            
-            # Calculate percentages
-            total_portfolio_value = sum(stat['total_value'] for stat in stats.values())
-            
-            result = []
-            for asset_type, data in stats.items():
-                percentage = (data['total_value'] / total_portfolio_value * 100) if total_portfolio_value > 0 else 0
-                result.append({
-                    'asset_type': asset_type,
-                    'count': data['count'],
-                    'total_value': data['total_value'],
-                    'total_gain_loss': data['total_gain_loss'],
-                    'percentage_of_portfolio': round(percentage, 2)
-                })
-            
+            result = PortfolioSnapshotService.get_analytics(request.user).asset_type_stats()
             return Response(result)
             
         except Exception as e:
@@ -389,29 +384,7 @@ class PriceAlertViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def check_alerts(self, request):
         """Check and trigger price alerts"""
-        alerts = self.get_queryset().filter(is_active=True, triggered_at__isnull=True)
-        triggered_alerts = []
-        
-        for alert in alerts:
-            investment = alert.investment
-            current_price = investment.current_price
-            
-            should_trigger = False
-            
-            if alert.alert_type == 'above' and current_price >= alert.target_value:
-                should_trigger = True
-            elif alert.alert_type == 'below' and current_price <= alert.target_value:
-                should_trigger = True
-            elif alert.alert_type == 'change_percent':
-                change_percent = abs(investment.daily_change_percent)
-                if change_percent >= alert.target_value:
-                    should_trigger = True
-            
-            if should_trigger:
-                alert.triggered_at = timezone.now()
-                alert.is_active = False
-                alert.save()
-                triggered_alerts.append(alert)
+        triggered_alerts = PriceAlertEngine.evaluate(self.get_queryset())
         
         serializer = PriceAlertSerializer(triggered_alerts, many=True)
         return Response({
@@ -8,12 +8,12 @@ Gemini 2.5 Flash Service for NLP Processing
 """
 
 import os
-import requests
 import logging
 import json
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from C8V2.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -74,11 +74,11 @@ class GeminiFlashService:
                 }
             }
             
-            response = requests.post(
+            response = http_clients.post(
+                'gemini',
                 f"{url}?key={self.api_key}",
                 headers=headers,
-                json=data,
-                timeout=10
+                json=data
             )
             
             if response.status_code == 200:
@@ -237,7 +237,8 @@ class GeminiFlashService:
                 }
             }
             
-            response = requests.post(
+            response = http_clients.post(
+                'gemini',
                 f"{url}?key={self.api_key}",
                 headers=headers,
                 json=data,
@@ -383,7 +384,8 @@ Score:"""
                 }
             }
             
-            response = requests.post(
+            response = http_clients.post(
+                'gemini',
                 f"{url}?key={self.api_key}",
                 headers=headers,
                 json=data,
@@ -7,7 +7,6 @@ Fetches real opportunities from the web using Serper API:
 """
 
 import os
-import requests
 import logging
 import re
 import hashlib
@@ -15,6 +14,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from django.utils import timezone
 from decimal import Decimal
+from C8V2.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -436,11 +436,11 @@ class SerperOpportunityFetcher:
         }
         
         try:
-            response = requests.post(
+            response = http_clients.post(
+                'serper',
                 self.base_url,
                 json=payload,
-                headers=self.headers,
-                timeout=10
+                headers=self.headers
             )
             
             if response.status_code == 200:
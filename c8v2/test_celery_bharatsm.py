@@ -116,11 +116,13 @@ def test_task_scheduling():
         
         beat_schedule = current_app.conf.beat_schedule
         
-        if 'daily-price-and-data-update' in beat_schedule:
-            task_config = beat_schedule['daily-price-and-data-update']
+        daily_updates = [name for name in beat_schedule if name.startswith('daily-price-and-data-update')]
+        if daily_updates:
             print("✅ Daily price and data update task is scheduled")
-            print(f"   Task: {task_config['task']}")
-            print(f"   Schedule: Every {task_config['schedule']} seconds")
+            for name in daily_updates:
+                task_config = beat_schedule[name]
+                print(f"   Task: {task_config['task']} {task_config.get('args', ())}")
+                print(f"   Schedule: {task_config['schedule']}")
         else:
             print("❌ Daily price and data update task is not scheduled")
         